@@ -1,3 +1,21 @@
+# backend/core/admin.py
+
 from django.contrib import admin
+from django.utils import timezone
+from .models import Trabajo
+
+@admin.register(Trabajo)
+class TrabajoAdmin(admin.ModelAdmin):
+    list_display = ['id', 'nombre', 'estado', 'intentos', 'max_intentos', 'ejecutar_desde', 'fecha_creacion']
+    list_filter = ['estado', 'nombre']
+    search_fields = ['nombre', 'clave_idempotencia']
+    readonly_fields = ['fecha_creacion', 'ultima_actualizacion', 'tomado_en']
+    actions = ['reintentar']
 
-# Register your models here.
+    @admin.action(description="Reintentar los trabajos fallidos seleccionados")
+    def reintentar(self, request, queryset):
+        ahora = timezone.now()
+        reintentados = queryset.filter(estado=Trabajo.ESTADO_FALLIDO).update(
+            estado=Trabajo.ESTADO_PENDIENTE, intentos=0, ejecutar_desde=ahora, ultima_actualizacion=ahora
+        )
+        self.message_user(request, f"{reintentados} trabajo(s) pendientes de nuevo")
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Registrar los trabajos en segundo plano de cada app (módulos trabajos.py)
+        autodiscover_modules('trabajos')
+
+        # Contar y cronometrar las consultas de las peticiones medidas (ver core.medicion)
+        from .medicion import instalar_en_conexion
+        connection_created.connect(instalar_en_conexion)
@@ -0,0 +1,89 @@
+# backend/core/asincrono.py
+
+"""
+Vistas de lectura asíncronas para despliegues ASGI.
+
+Las vistas de DRF son síncronas: bajo ASGI cada petición ocupa un hilo de
+principio a fin. Las vistas decoradas con `vista_api_async` son corrutinas
+de Django que:
+
+- autentican con el mismo JWT que la API (ClaimsJWTAuthentication.aauthenticate)
+  y verifican los mismos permisos que su versión DRF,
+- consultan con el ORM async,
+- responden el mismo JSON que su versión DRF (JSONRapidoRenderer).
+
+Lo que se resuelve en memoria (autenticación por claims, catálogo, índice
+del ranking) no sale del event loop. Las consultas del ORM async de Django
+aún se ejecutan en un hilo, pero solo mientras dura cada consulta.
+"""
+
+import functools
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from usuarios.authentication import ClaimsJWTAuthentication
+from .renderers import JSONRapidoRenderer
+
+METODOS_PERMITIDOS = ('GET', 'HEAD')
+
+
+def respuesta_json(datos, status=status.HTTP_200_OK, headers=None):
+    """
+    HttpResponse con el mismo cuerpo que daría un Response de DRF.
+    """
+    contenido = b'' if datos is None else JSONRapidoRenderer().render(datos)
+    return HttpResponse(
+        contenido, status=status, headers=headers,
+        content_type=JSONRapidoRenderer.media_type
+    )
+
+
+def _respuesta_error(exc, headers=None):
+    # Mismo formato que el exception_handler de DRF
+    datos = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    return respuesta_json(datos, status=exc.status_code, headers=headers)
+
+
+def vista_api_async(vista=None, *, permisos=(IsAuthenticated,), autenticacion=ClaimsJWTAuthentication):
+    """
+    Decorador para vistas async de solo lectura. Autentica al usuario (con
+    `autenticacion`, que debe tener `aauthenticate`) y verifica los permisos
+    de DRF indicados (por defecto, IsAuthenticated).
+    La vista recibe un Request de DRF (query_params, build_absolute_uri)
+    con `user` y `auth` asignados.
+    """
+    if vista is None:
+        return functools.partial(vista_api_async, permisos=permisos, autenticacion=autenticacion)
+
+    @functools.wraps(vista)
+    async def envoltura(request, *args, **kwargs):
+        if request.method not in METODOS_PERMITIDOS:
+            return _respuesta_error(
+                exceptions.MethodNotAllowed(request.method),
+                headers={'Allow': ', '.join(METODOS_PERMITIDOS)}
+            )
+
+        autenticador = autenticacion()
+        encabezado = {'WWW-Authenticate': autenticador.authenticate_header(request)}
+        try:
+            resultado = await autenticador.aauthenticate(request)
+        except exceptions.APIException as exc:
+            return _respuesta_error(exc, headers=encabezado)
+
+        peticion = Request(request)
+        if resultado is None:
+            peticion.user, peticion.auth = AnonymousUser(), None
+        else:
+            peticion.user, peticion.auth = resultado
+        for permiso in permisos:
+            if not permiso().has_permission(peticion, None):
+                if resultado is None:
+                    return _respuesta_error(exceptions.NotAuthenticated(), headers=encabezado)
+                return _respuesta_error(exceptions.PermissionDenied())
+
+        return await vista(peticion, *args, **kwargs)
+
+    return envoltura
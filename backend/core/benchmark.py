@@ -0,0 +1,79 @@
+# backend/core/benchmark.py
+
+"""
+Utilidades compartidas por los comandos benchmark_*.
+
+Los benchmarks nunca tocan la base de datos configurada: crean una base de
+pruebas temporal (igual que `manage.py test`), la llenan con datos
+sintéticos y la destruyen al terminar.
+"""
+
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def base_de_datos_temporal():
+    """
+    Crear una base de datos de pruebas vacía (con migraciones) y
+    eliminarla al salir.
+    """
+    setup_test_environment()
+    nombre_original = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        teardown_test_environment()
+
+
+def medir(funcion, repeticiones=20, calentamiento=2):
+    """
+    Ejecutar `funcion` varias veces y retornar un dict con la mediana y el
+    p95 de latencia en milisegundos y la cantidad de consultas SQL de la
+    última ejecución.
+    """
+    for _ in range(calentamiento):
+        funcion()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    tiempos.sort()
+    return {
+        'mediana_ms': statistics.median(tiempos),
+        'p95_ms': tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))],
+        'consultas': len(consultas),
+    }
+
+
+def tabla(filas, columnas):
+    """
+    Formatear una lista de dicts como tabla de texto alineada.
+    """
+    textos = [[_formatear(fila[columna]) for columna in columnas] for fila in filas]
+    anchos = [
+        max([len(columna)] + [len(texto[i]) for texto in textos])
+        for i, columna in enumerate(columnas)
+    ]
+    lineas = [
+        '  '.join(columna.ljust(ancho) for columna, ancho in zip(columnas, anchos)),
+        '  '.join('-' * ancho for ancho in anchos),
+    ]
+    for texto in textos:
+        lineas.append('  '.join(valor.ljust(ancho) for valor, ancho in zip(texto, anchos)))
+    return '\n'.join(lineas)
+
+
+def _formatear(valor):
+    if isinstance(valor, float):
+        return f'{valor:.2f}'
+    return str(valor)
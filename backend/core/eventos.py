@@ -0,0 +1,231 @@
+# backend/core/eventos.py
+
+"""
+Publicación de eventos para los streams en vivo (Server-Sent Events).
+
+Cada evento tiene un tema ('usuario:15', 'ranking'), un tipo y datos JSON.
+Se publica al confirmarse la transacción que lo origina y se entrega a las
+suscripciones del tema en cada proceso:
+
+- 'local': solo a las suscripciones del mismo proceso. Basta con un único
+  proceso (desarrollo, o un solo worker ASGI que también ejecuta los trabajos).
+- 'postgres': con NOTIFY/LISTEN, a todos los procesos conectados a la misma
+  base de datos (p. ej. varios workers y `trabajos_worker`). Cada proceso
+  con oyentes (`escuchar`) o suscripciones mantiene un hilo con una
+  conexión en LISTEN, que se inicia con el primero de ellos.
+
+Cada suscripción guarda como máximo un evento pendiente por `clave`: si el
+cliente es lento, los estados intermedios (p. ej. los puntos) se reemplazan
+por el último. Si acumula más de EVENTOS_PENDIENTES_MAXIMO claves distintas
+queda desbordada y el stream debe cerrarse para que el cliente se reconecte.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CANAL_POSTGRES = 'ecopoints_eventos'
+
+
+class ConexionesAgotadas(Exception):
+    """
+    Se alcanzó el máximo de streams abiertos en el proceso o para el usuario.
+    """
+
+    def __init__(self, por_usuario):
+        super().__init__('por usuario' if por_usuario else 'en el proceso')
+        self.por_usuario = por_usuario
+
+
+class Suscripcion:
+    """
+    Eventos pendientes de un stream. `entregar` se puede llamar desde
+    cualquier hilo; `esperar` solo desde el event loop del stream.
+    """
+
+    def __init__(self, usuario_id, temas, loop):
+        self.usuario_id = usuario_id
+        self.temas = tuple(temas)
+        self.desbordada = False
+        self._loop = loop
+        self._pendientes = {}
+        self._despertar = asyncio.Event()
+
+    def entregar(self, evento):
+        try:
+            self._loop.call_soon_threadsafe(self._recibir, evento)
+        except RuntimeError:
+            # El event loop del stream ya terminó
+            pass
+
+    def _recibir(self, evento):
+        clave = (evento['tema'], evento['clave'])
+        # Reemplazar el pendiente de la misma clave, dejándolo al final
+        self._pendientes.pop(clave, None)
+        if len(self._pendientes) >= settings.EVENTOS_PENDIENTES_MAXIMO:
+            self.desbordada = True
+        else:
+            self._pendientes[clave] = evento
+        self._despertar.set()
+
+    async def esperar(self, segundos):
+        """
+        Retorna los eventos pendientes, esperando como máximo `segundos` a
+        que llegue alguno (lista vacía si no llegó ninguno).
+        """
+        if not self._pendientes and not self.desbordada:
+            try:
+                await asyncio.wait_for(self._despertar.wait(), max(segundos, 0))
+            except asyncio.TimeoutError:
+                return []
+        self._despertar.clear()
+        eventos = list(self._pendientes.values())
+        self._pendientes.clear()
+        return eventos
+
+
+class CanalEventos:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._suscripciones = defaultdict(set)
+        self._por_usuario = defaultdict(int)
+        self._total = 0
+        self._oyentes = defaultdict(list)
+        self._escucha = None
+
+    def _backend(self):
+        return settings.EVENTOS_BACKEND if connection.vendor == 'postgresql' else 'local'
+
+    def publicar(self, tema, tipo, datos, clave=None):
+        """
+        Publicar un evento cuando se confirme la transacción actual.
+        Los eventos con la misma `clave` se reemplazan entre sí mientras
+        esperan a ser enviados (por defecto, la clave es el tipo).
+        """
+        evento = {'tema': tema, 'tipo': tipo, 'clave': clave or tipo, 'datos': datos}
+        if self._backend() == 'postgres':
+            # NOTIFY es transaccional: se entrega (también a este proceso) al confirmar
+            contenido = json.dumps(evento, cls=DjangoJSONEncoder)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)', [CANAL_POSTGRES, contenido])
+        else:
+            evento = json.loads(json.dumps(evento, cls=DjangoJSONEncoder))
+            transaction.on_commit(lambda: self.difundir(evento))
+
+    def escuchar(self, tema, funcion):
+        """
+        Registrar `funcion(evento)`, que se llama en cada proceso una vez
+        por evento del tema (aunque no haya suscripciones). Con 'postgres'
+        inicia aquí la escucha, para recibir también los eventos publicados
+        por otros procesos.
+        """
+        self._oyentes[tema].append(funcion)
+        if self._backend() == 'postgres':
+            self._iniciar_escucha()
+
+    def difundir(self, evento):
+        """
+        Entregar un evento a los oyentes y suscripciones de este proceso.
+        """
+        for funcion in self._oyentes.get(evento['tema'], ()):
+            try:
+                funcion(evento)
+            except Exception:
+                logger.exception("Falló un oyente de eventos de %s", evento['tema'])
+        with self._lock:
+            suscripciones = list(self._suscripciones.get(evento['tema'], ()))
+        for suscripcion in suscripciones:
+            suscripcion.entregar(evento)
+
+    def verificar_cupo(self, usuario_id):
+        """
+        Lanza ConexionesAgotadas si ahora no hay cupo para otra suscripción
+        del usuario. No reserva el cupo: `suscribir` lo vuelve a verificar.
+        """
+        with self._lock:
+            self._verificar_cupo(usuario_id)
+
+    def _verificar_cupo(self, usuario_id):
+        # Llamar con el lock tomado
+        if self._total >= settings.EVENTOS_CONEXIONES_MAXIMAS:
+            raise ConexionesAgotadas(por_usuario=False)
+        if self._por_usuario.get(usuario_id, 0) >= settings.EVENTOS_CONEXIONES_POR_USUARIO:
+            raise ConexionesAgotadas(por_usuario=True)
+
+    def suscribir(self, usuario_id, temas):
+        """
+        Crear una suscripción para el event loop actual, respetando los
+        límites de conexiones. Lanza ConexionesAgotadas si no hay cupo.
+        """
+        suscripcion = Suscripcion(usuario_id, temas, asyncio.get_running_loop())
+        with self._lock:
+            self._verificar_cupo(usuario_id)
+            self._total += 1
+            self._por_usuario[usuario_id] += 1
+            for tema in suscripcion.temas:
+                self._suscripciones[tema].add(suscripcion)
+        if self._backend() == 'postgres':
+            self._iniciar_escucha()
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            for tema in suscripcion.temas:
+                self._suscripciones[tema].discard(suscripcion)
+                if not self._suscripciones[tema]:
+                    del self._suscripciones[tema]
+            self._total -= 1
+            self._por_usuario[suscripcion.usuario_id] -= 1
+            if not self._por_usuario[suscripcion.usuario_id]:
+                del self._por_usuario[suscripcion.usuario_id]
+
+    def conexiones(self):
+        return self._total
+
+    def _iniciar_escucha(self):
+        with self._lock:
+            if self._escucha is not None:
+                return
+            self._escucha = threading.Thread(
+                target=self._escuchar_postgres, name='eventos-listen', daemon=True
+            )
+        self._escucha.start()
+
+    def _escuchar_postgres(self):
+        """
+        Hilo que recibe los NOTIFY de todos los procesos y los difunde aquí.
+        Se reconecta si la conexión se pierde.
+        """
+        while True:
+            conexion = None
+            try:
+                conexion = connection.get_new_connection(connection.get_connection_params())
+                conexion.autocommit = True
+                with conexion.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CANAL_POSTGRES}')
+                while True:
+                    if select.select([conexion], [], [], 30) == ([], [], []):
+                        continue
+                    conexion.poll()
+                    while conexion.notifies:
+                        notificacion = conexion.notifies.pop(0)
+                        self.difundir(json.loads(notificacion.payload))
+            except Exception:
+                logger.exception("Se perdió la conexión LISTEN de eventos; reintentando")
+                if conexion is not None:
+                    conexion.close()
+                time.sleep(5)
+
+
+canal_eventos = CanalEventos()
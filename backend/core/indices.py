@@ -0,0 +1,69 @@
+# backend/core/indices.py
+
+"""
+Verificación de planes de ejecución de las consultas críticas de la API.
+
+Cada consulta se pasa por EXPLAIN con la sintaxis del motor en uso
+(SQLite: EXPLAIN QUERY PLAN, PostgreSQL: EXPLAIN) y se considera fallida si
+el plan recorre la tabla completa en lugar de usar un índice.
+"""
+
+import re
+
+from django.core.management.base import CommandError
+from django.db import connection
+
+
+def consultas_criticas():
+    """
+    Retorna [(nombre, queryset), ...] con las formas de consulta de los
+    endpoints más usados. Se construyen aquí para no importar modelos al
+    cargar el módulo.
+    """
+    from gamificacion.models import Grupo
+    from tareas.models import TipoTarea, TareaRegistrada
+    from usuarios.backends import consulta_login
+    from usuarios.models import Usuario
+
+    return [
+        ('usuarios.ranking', Usuario.objects.filter(activo=True).order_by('-puntos_totales')[:100]),
+        ('usuarios.login', consulta_login('usuario@ecopoints.cl')),
+        ('tipos-tarea.list', TipoTarea.objects.filter(activa=True)),
+        ('tipos-tarea.list?categoria', TipoTarea.objects.filter(activa=True, categoria='reciclaje')),
+        ('tareas.list', TareaRegistrada.objects.filter(usuario_id=1)[:10]),
+        ('tareas.validadas', TareaRegistrada.objects.filter(usuario_id=1, validada=True).order_by()),
+        ('grupos.list', Grupo.objects.filter(activo=True)[:10]),
+    ]
+
+
+# Recorridos secuenciales por motor. En SQLite "SCAN tabla USING INDEX"
+# es un recorrido de índice y se acepta; "SCAN tabla" a secas no.
+PATRONES_RECORRIDO = {
+    'sqlite': re.compile(r'\bSCAN (?!.*\bUSING\b)(?!CONSTANT ROW)'),
+    'postgresql': re.compile(r'\bSeq Scan\b'),
+}
+
+
+def verificar_planes():
+    """
+    Ejecuta EXPLAIN sobre cada consulta crítica.
+    Retorna [(nombre, plan, usa_indices), ...]. Lanza CommandError si el
+    motor en uso no tiene patrón de recorrido.
+    """
+    patron = PATRONES_RECORRIDO.get(connection.vendor)
+    if patron is None:
+        raise CommandError(
+            f"Motor no soportado: {connection.vendor} "
+            f"(soportados: {', '.join(sorted(PATRONES_RECORRIDO))})"
+        )
+
+    resultados = []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Con tablas pequeñas PostgreSQL prefiere recorrerlas enteras;
+            # desactivarlo muestra si existe un índice utilizable.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for nombre, queryset in consultas_criticas():
+            plan = queryset.explain()
+            resultados.append((nombre, plan, not patron.search(plan)))
+    return resultados
@@ -0,0 +1,168 @@
+# backend/core/management/commands/benchmark_asgi.py
+
+import asyncio
+import datetime
+import queue
+import statistics
+import threading
+import time
+from decimal import Decimal
+
+from asgiref.sync import ThreadSensitiveContext
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.core.management.base import BaseCommand
+from core.benchmark import base_de_datos_temporal, tabla
+from gamificacion.models import Logro, LogroUsuario
+from tareas.models import ResumenDiario, TareaRegistrada, TipoTarea
+from usuarios.authentication import TokenUsuario
+from usuarios.models import Usuario
+
+# (nombre, ruta DRF, ruta async, requiere administrador)
+ENDPOINTS = [
+    ('perfil', '/api/usuarios/perfil/', '/api/usuarios/perfil-async/', False),
+    ('ranking', '/api/usuarios/ranking/?limite=50', '/api/usuarios/ranking-async/?limite=50', True),
+    ('estadisticas', '/api/tareas/estadisticas/', '/api/tareas/estadisticas-async/', False),
+    ('mis-logros', '/api/logros/mis-logros/', '/api/logros/mis-logros-async/', False),
+    ('catalogo', '/api/tipos-tarea/', '/api/tipos-tarea-async/', False),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de las lecturas principales: vistas DRF atendidas por "
+        "workers síncronos (como gunicorn con WSGI), las mismas vistas bajo ASGI "
+        "(un hilo por petición) y sus versiones async bajo ASGI. Ejecuta la "
+        "aplicación en el mismo proceso, sin servidor HTTP. Usa una base de "
+        "datos temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=200, help="Peticiones por endpoint y ruta")
+        parser.add_argument('--workers', type=int, default=4, help="Workers síncronos simulados (WSGI)")
+        parser.add_argument('--concurrencia', type=int, default=50, help="Peticiones simultáneas bajo ASGI")
+        parser.add_argument('--usuarios', type=int, default=500)
+
+    def handle(self, *args, **options):
+        filas = []
+        with base_de_datos_temporal():
+            usuario, admin = self.poblar(options['usuarios'])
+            tokens = {False: self.encabezado(usuario), True: self.encabezado(admin)}
+            for nombre, ruta_drf, ruta_async, requiere_admin in ENDPOINTS:
+                encabezados = tokens[requiere_admin]
+                rutas = [ruta_drf] * options['peticiones']
+                filas.append(self.resumir(
+                    nombre, 'wsgi-drf', options['workers'],
+                    *self.carga_wsgi(rutas, encabezados, options['workers'])
+                ))
+                filas.append(self.resumir(
+                    nombre, 'asgi-drf', options['concurrencia'],
+                    *self.carga_asgi(rutas, encabezados, options['concurrencia'])
+                ))
+                filas.append(self.resumir(
+                    nombre, 'asgi-async', options['concurrencia'],
+                    *self.carga_asgi([ruta_async] * options['peticiones'], encabezados, options['concurrencia'])
+                ))
+
+        self.stdout.write(tabla(filas, [
+            'endpoint', 'ruta', 'concurrencia', 'exitosas', 'peticiones_s', 'mediana_ms', 'p95_ms'
+        ]))
+
+    def poblar(self, cantidad):
+        Usuario.objects.bulk_create([
+            Usuario(
+                username=f'usuario{i}', email=f'usuario{i}@ecopoints.cl',
+                puntos_totales=i * 7, nivel=i * 7 // 100 + 1, co2_total_evitado=Decimal(i) / 4
+            )
+            for i in range(cantidad)
+        ])
+        usuario = Usuario.objects.order_by('pk').first()
+        admin = Usuario.objects.create(username='admin', email='admin@ecopoints.cl', is_staff=True)
+
+        tipos = TipoTarea.objects.bulk_create([
+            TipoTarea(
+                nombre=f'Tarea {i}', descripcion='Descripción de la tarea',
+                categoria=TipoTarea.CATEGORIAS[i % len(TipoTarea.CATEGORIAS)][0],
+                co2_evitado_por_accion=Decimal('1.25'), puntos_otorgados=10
+            )
+            for i in range(10)
+        ])
+        hoy = datetime.date.today()
+        TareaRegistrada.objects.bulk_create([
+            TareaRegistrada(
+                usuario=usuario, tipo_tarea=tipos[i % len(tipos)],
+                fecha_realizacion=hoy - datetime.timedelta(days=i % 365),
+                co2_evitado=Decimal('1.25'), puntos_ganados=10
+            )
+            for i in range(1000)
+        ])
+        ResumenDiario.objects.reconstruir()
+        logros = Logro.objects.bulk_create([
+            Logro(nombre=f'Logro {i}', descripcion='Descripción del logro', puntos_requeridos=i * 10)
+            for i in range(20)
+        ])
+        LogroUsuario.objects.bulk_create([LogroUsuario(usuario=usuario, logro=logro) for logro in logros])
+        return usuario, admin
+
+    def encabezado(self, usuario):
+        return {'Authorization': f'Bearer {TokenUsuario.for_user(usuario).access_token}'}
+
+    def carga_wsgi(self, rutas, encabezados, workers):
+        pendientes = queue.Queue()
+        for ruta in rutas:
+            pendientes.put(ruta)
+        resultados = []
+        inicio = time.perf_counter()
+
+        def worker():
+            cliente = Client(headers=encabezados)
+            try:
+                while True:
+                    try:
+                        ruta = pendientes.get_nowait()
+                    except queue.Empty:
+                        return
+                    t0 = time.perf_counter()
+                    response = cliente.get(ruta)
+                    resultados.append((response.status_code, time.perf_counter() - t0))
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=worker) for _ in range(workers)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados, time.perf_counter() - inicio
+
+    def carga_asgi(self, rutas, encabezados, concurrencia):
+        async def carga():
+            cliente = AsyncClient()
+            limite = asyncio.Semaphore(concurrencia)
+            inicio = time.perf_counter()
+
+            async def pedir(ruta):
+                async with limite:
+                    # Como ASGIHandler: el código síncrono de cada petición en su propio hilo
+                    async with ThreadSensitiveContext():
+                        t0 = time.perf_counter()
+                        response = await cliente.get(ruta, headers=encabezados)
+                        return response.status_code, time.perf_counter() - t0
+
+            resultados = await asyncio.gather(*(pedir(ruta) for ruta in rutas))
+            return resultados, time.perf_counter() - inicio
+
+        return asyncio.run(carga())
+
+    def resumir(self, endpoint, ruta, concurrencia, resultados, duracion):
+        latencias = sorted(t * 1000 for codigo, t in resultados if codigo in (200, 304))
+        exitosas = len(latencias)
+        return {
+            'endpoint': endpoint,
+            'ruta': ruta,
+            'concurrencia': concurrencia,
+            'exitosas': f'{exitosas}/{len(resultados)}',
+            'peticiones_s': exitosas / duracion if duracion else 0.0,
+            'mediana_ms': statistics.median(latencias) if latencias else 0.0,
+            'p95_ms': latencias[min(exitosas - 1, int(exitosas * 0.95))] if latencias else 0.0,
+        }
@@ -0,0 +1,114 @@
+# backend/core/management/commands/benchmark_escalas.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from core.benchmark import base_de_datos_temporal, medir, tabla
+from core.sinteticos import generar_datos
+from usuarios.authentication import TokenUsuario
+from usuarios.models import Usuario
+
+# (nombre, ruta, requiere administrador)
+ENDPOINTS = [
+    ('ranking', '/api/usuarios/ranking/?limite=50', True),
+    ('estadisticas', '/api/tareas/estadisticas/', False),
+    ('serie', '/api/tareas/serie/?agrupacion=mes', False),
+    ('tareas', '/api/tareas/', False),
+    ('tareas-cursor', '/api/tareas/?paginacion=cursor', False),
+    ('tareas-admin', '/api/tareas/', True),
+    ('grupos', '/api/grupos/', False),
+    ('mis-logros', '/api/logros/mis-logros/', False),
+]
+
+COLUMNAS = ['tareas', 'usuarios', 'endpoint', 'mediana_ms', 'p95_ms', 'consultas']
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia y la cantidad de consultas de los endpoints "
+        "principales con el cliente de pruebas de Django a varias escalas de "
+        "datos sintéticos (ver generar_datos), en una base de datos temporal "
+        "que crece de una escala a la siguiente. Con --salida guarda los "
+        "resultados en JSON y con --comparar los contrasta con los de una "
+        "ejecución anterior."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escalas', default='10000,100000',
+                            help="Cantidades de tareas separadas por coma (p. ej. 10000,100000,1000000)")
+        parser.add_argument('--tareas-por-usuario', type=int, default=20)
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados")
+        parser.add_argument('--comparar', help="Archivo JSON de una ejecución anterior")
+
+    def handle(self, *args, **options):
+        try:
+            escalas = [int(escala) for escala in options['escalas'].split(',')]
+        except ValueError:
+            raise CommandError("--escalas debe ser una lista de números separados por coma")
+
+        anteriores = {}
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as archivo:
+                anteriores = {(fila['tareas'], fila['endpoint']): fila for fila in json.load(archivo)}
+
+        resultados = []
+        with base_de_datos_temporal():
+            admin = Usuario.objects.create(username='admin', email='admin@ecopoints.cl', is_staff=True)
+            generadas = {'tareas': 0, 'usuarios': 0}
+            for tareas in sorted(escalas):
+                usuarios = max(100, tareas // options['tareas_por_usuario'])
+                self.stdout.write(f"Escala: {tareas} tareas, {usuarios} usuarios")
+                # Agregar solo lo que falta para llegar a la escala
+                faltantes = {
+                    'tareas': tareas - generadas['tareas'],
+                    'usuarios': usuarios - generadas['usuarios'],
+                }
+                generar_datos(
+                    usuarios=faltantes['usuarios'], tareas=faltantes['tareas'],
+                    grupos=max(10, faltantes['usuarios'] // 50),
+                    logros=0 if generadas['tareas'] else 20,
+                    semilla=options['semilla'] + tareas
+                )
+                generadas = {'tareas': tareas, 'usuarios': usuarios}
+                resultados += self.medir_escala(tareas, usuarios, admin, options['repeticiones'])
+
+        columnas = COLUMNAS
+        if anteriores:
+            columnas = COLUMNAS + ['anterior_ms', 'cambio']
+            for fila in resultados:
+                anterior = anteriores.get((fila['tareas'], fila['endpoint']))
+                fila['anterior_ms'] = anterior['mediana_ms'] if anterior else '-'
+                fila['cambio'] = (
+                    f"{fila['mediana_ms'] / anterior['mediana_ms']:.2f}x"
+                    if anterior and anterior['mediana_ms'] else '-'
+                )
+        self.stdout.write(tabla(resultados, columnas))
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump([{columna: fila[columna] for columna in COLUMNAS} for fila in resultados], archivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+
+    def medir_escala(self, tareas, usuarios, admin, repeticiones):
+        # El usuario con más tareas: el peor caso de su historial y estadísticas
+        usuario = Usuario.objects.annotate(
+            cantidad=Count('tareas_registradas')
+        ).order_by('-cantidad').first()
+        clientes = {
+            False: Client(headers={'Authorization': f'Bearer {TokenUsuario.for_user(usuario).access_token}'}),
+            True: Client(headers={'Authorization': f'Bearer {TokenUsuario.for_user(admin).access_token}'}),
+        }
+
+        filas = []
+        for nombre, ruta, requiere_admin in ENDPOINTS:
+            cliente = clientes[requiere_admin]
+            response = cliente.get(ruta)
+            if response.status_code != 200:
+                raise CommandError(f"{nombre}: {ruta} respondió {response.status_code}")
+            medida = medir(lambda: cliente.get(ruta), repeticiones=repeticiones)
+            filas.append({'tareas': tareas, 'usuarios': usuarios, 'endpoint': nombre, **medida})
+        return filas
@@ -0,0 +1,87 @@
+# backend/core/management/commands/benchmark_json.py
+
+import datetime
+import io
+import json
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from core.benchmark import base_de_datos_temporal, medir, tabla
+from core.parsers import JSONRapidoParser
+from core.renderers import JSONRapidoRenderer, orjson
+from core.serializacion import compilado
+from tareas.models import TipoTarea, TareaRegistrada
+from tareas.serializers import TareaRegistradaSerializer
+from usuarios.models import Usuario
+from usuarios.serializers import UsuarioSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el JSONRenderer/JSONParser de DRF con los de core (orjson) "
+        "sobre las respuestas del ranking y del historial de tareas y el "
+        "cuerpo de un registro por lote. Usa una base de datos temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=500, help="Filas por respuesta")
+        parser.add_argument('--repeticiones', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson no está instalado: ambos renderers serían el mismo")
+
+        with base_de_datos_temporal():
+            ranking, historial = self.poblar(options['filas'])
+        lote = json.dumps({'tareas': [
+            {'tipo_tarea': 1, 'fecha_realizacion': '2025-03-01', 'notas': 'Reciclé botellas'}
+        ] * options['filas']}).encode()
+
+        filas = []
+        for nombre, datos in (('ranking', ranking), ('historial', historial)):
+            for etiqueta, renderer in (('drf', JSONRenderer()), ('rapido', JSONRapidoRenderer())):
+                medida = medir(lambda: renderer.render(datos), repeticiones=options['repeticiones'])
+                filas.append({
+                    'operacion': f'render {nombre}', 'implementacion': etiqueta,
+                    'bytes': len(renderer.render(datos)),
+                    'mediana_ms': medida['mediana_ms'], 'p95_ms': medida['p95_ms'],
+                })
+        for etiqueta, parser in (('drf', JSONParser()), ('rapido', JSONRapidoParser())):
+            medida = medir(lambda: parser.parse(io.BytesIO(lote)), repeticiones=options['repeticiones'])
+            filas.append({
+                'operacion': 'parse lote', 'implementacion': etiqueta, 'bytes': len(lote),
+                'mediana_ms': medida['mediana_ms'], 'p95_ms': medida['p95_ms'],
+            })
+
+        self.stdout.write(tabla(filas, ['operacion', 'implementacion', 'bytes', 'mediana_ms', 'p95_ms']))
+
+    def poblar(self, cantidad):
+        """
+        Retorna los datos (ya serializados) de ambas respuestas.
+        """
+        Usuario.objects.bulk_create([
+            Usuario(
+                username=f'usuario{i}', email=f'usuario{i}@ecopoints.cl',
+                puntos_totales=i * 7, co2_total_evitado=Decimal(i) / 4
+            )
+            for i in range(cantidad)
+        ])
+        usuario = Usuario.objects.order_by('pk').first()
+        tipo = TipoTarea.objects.create(nombre='Reciclar', descripcion='Reciclar botellas')
+        hoy = datetime.date.today()
+        TareaRegistrada.objects.bulk_create([
+            TareaRegistrada(
+                usuario=usuario, tipo_tarea=tipo,
+                fecha_realizacion=hoy - datetime.timedelta(days=i % 365),
+                co2_evitado=Decimal('1.25'), puntos_ganados=10, notas='Botellas de la semana'
+            )
+            for i in range(cantidad)
+        ])
+
+        ranking = compilado(UsuarioSerializer).serializar(Usuario.objects.order_by('-puntos_totales'))
+        historial = TareaRegistradaSerializer(
+            TareaRegistrada.objects.select_related('usuario', 'tipo_tarea'), many=True
+        ).data
+        return ranking, historial
@@ -0,0 +1,108 @@
+# backend/core/management/commands/benchmark_serializacion.py
+
+import datetime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from core.benchmark import base_de_datos_temporal, medir, tabla
+from core.serializacion import SerializadorCompilado
+from core.serializers import optimizar_queryset
+from gamificacion.models import Logro, LogroUsuario
+from gamificacion.serializers import LogroUsuarioSerializer
+from tareas.models import TipoTarea
+from tareas.serializers import TipoTareaSerializer
+from usuarios.models import Usuario
+from usuarios.serializers import UsuarioSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara filas por segundo de los ModelSerializer de DRF y de la "
+        "serialización compilada desde .values() para el ranking, mis-logros "
+        "y el catálogo de tipos de tarea, y verifica que el JSON sea idéntico. "
+        "Usa una base de datos temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=500, help="Filas por listado")
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        with base_de_datos_temporal():
+            usuario = self.poblar(filas)
+            request = Request(APIRequestFactory().get('/api/logros/mis-logros/'))
+            contexto = {'request': request}
+
+            casos = [
+                ('UsuarioSerializer', UsuarioSerializer, {}, Usuario.objects.all()),
+                ('LogroUsuarioSerializer', LogroUsuarioSerializer, contexto,
+                 LogroUsuario.objects.filter(usuario=usuario)),
+                ('TipoTareaSerializer', TipoTareaSerializer, {}, TipoTarea.objects.all()),
+            ]
+            resultados = []
+            for nombre, clase, contexto_caso, queryset in casos:
+                compilado = SerializadorCompilado(clase(context=contexto_caso))
+                # El camino DRF con sus select_related, como en las vistas
+                optimizado = optimizar_queryset(queryset, clase(context=contexto_caso))
+                caminos = {
+                    'drf': lambda: clase(optimizado.all(), many=True, context=contexto_caso).data,
+                    'compilado': lambda: compilado.serializar(queryset.all()),
+                }
+                renderizado = {camino: JSONRenderer().render(f()) for camino, f in caminos.items()}
+                identico = renderizado['drf'] == renderizado['compilado']
+                cantidad = queryset.count()
+                for camino, funcion in caminos.items():
+                    medida = medir(funcion, repeticiones=options['repeticiones'])
+                    resultados.append({
+                        'serializer': nombre,
+                        'camino': camino,
+                        'filas': cantidad,
+                        'mediana_ms': medida['mediana_ms'],
+                        'filas_s': cantidad / medida['mediana_ms'] * 1000 if medida['mediana_ms'] else 0.0,
+                        'consultas': medida['consultas'],
+                        'identico': 'si' if identico else 'NO',
+                    })
+
+        self.stdout.write(tabla(resultados, [
+            'serializer', 'camino', 'filas', 'mediana_ms', 'filas_s', 'consultas', 'identico'
+        ]))
+
+    def poblar(self, cantidad):
+        ahora = timezone.now()
+        Usuario.objects.bulk_create([
+            Usuario(
+                username=f'usuario{i}', email=f'usuario{i}@ecopoints.cl',
+                first_name='Nombre', last_name='Apellido',
+                fecha_nacimiento=datetime.date(2000, 1, 1) if i % 2 else None,
+                avatar=f'avatars/{i}.png' if i % 3 else '',
+                puntos_totales=i * 7, nivel=i * 7 // 100 + 1,
+                co2_total_evitado=Decimal(i) / 4
+            )
+            for i in range(cantidad)
+        ])
+        usuario = Usuario.objects.order_by('pk').first()
+        logros = Logro.objects.bulk_create([
+            Logro(
+                nombre=f'Logro {i}', descripcion='Descripción del logro',
+                icono=f'logros/{i}.png' if i % 2 else '',
+                puntos_requeridos=i * 10, co2_requerido=Decimal(i)
+            )
+            for i in range(cantidad)
+        ])
+        LogroUsuario.objects.bulk_create([
+            LogroUsuario(usuario=usuario, logro=logro, fecha_obtencion=ahora)
+            for logro in logros
+        ])
+        TipoTarea.objects.bulk_create([
+            TipoTarea(
+                nombre=f'Tarea {i}', descripcion='Descripción de la tarea',
+                co2_evitado_por_accion=Decimal('1.25'), puntos_otorgados=10
+            )
+            for i in range(cantidad)
+        ])
+        return usuario
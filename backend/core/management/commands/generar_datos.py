@@ -0,0 +1,44 @@
+# backend/core/management/commands/generar_datos.py
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.sinteticos import generar_datos
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera usuarios, tipos de tarea, tareas registradas, grupos y logros "
+        "sintéticos con bulk_create, y recalcula los datos derivados. Con la "
+        "misma --semilla se generan los mismos datos. Escribe en la base de "
+        "datos configurada: solo con DEBUG activo, salvo que se use --forzar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=1000)
+        parser.add_argument('--tareas', type=int, default=20000)
+        parser.add_argument('--grupos', type=int, default=50)
+        parser.add_argument('--logros', type=int, default=20)
+        parser.add_argument('--dias', type=int, default=365, help="Antigüedad máxima de las tareas")
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--password', default='ecopoints', help="Contraseña de todos los usuarios generados")
+        parser.add_argument('--tamano-lote', type=int, default=5000)
+        parser.add_argument('--forzar', action='store_true', help="Generar aunque DEBUG esté desactivado")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['forzar']:
+            raise CommandError("DEBUG está desactivado; usa --forzar para generar datos en esta base de datos")
+
+        inicio = time.perf_counter()
+
+        def progreso(mensaje):
+            self.stdout.write(f"  {time.perf_counter() - inicio:7.1f}s  {mensaje}")
+
+        totales = generar_datos(
+            usuarios=options['usuarios'], tareas=options['tareas'], grupos=options['grupos'],
+            logros=options['logros'], dias=options['dias'], semilla=options['semilla'],
+            password=options['password'], tamano_lote=options['tamano_lote'], progreso=progreso
+        )
+        resumen = ', '.join(f"{cantidad} {modelo}" for modelo, cantidad in totales.items())
+        self.stdout.write(self.style.SUCCESS(f"Generados: {resumen}"))
@@ -0,0 +1,41 @@
+# backend/core/management/commands/trabajos_worker.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from core.trabajos import Trabajador, pendientes
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta los trabajos en segundo plano pendientes (ver core.trabajos) "
+        "en un pool de hilos, consultando la tabla de trabajos periódicamente. "
+        "Se pueden iniciar varios: cada trabajo lo toma uno solo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=4)
+        parser.add_argument('--intervalo', type=float, default=1.0,
+                            help="Segundos de espera cuando no hay trabajos pendientes")
+        parser.add_argument('--una-vez', action='store_true',
+                            help="Ejecutar los trabajos pendientes y terminar")
+
+    def handle(self, *args, **options):
+        # Los reintentos los vuelve a encontrar la siguiente consulta
+        trabajador = Trabajador(hilos=options['hilos'], reprogramar=False)
+        ejecutados = 0
+        try:
+            while True:
+                lote = pendientes(limite=options['hilos'] * 4)
+                for futuro in [trabajador.despachar(trabajo_id) for trabajo_id in lote]:
+                    futuro.result()
+                ejecutados += len(lote)
+                if not lote:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            trabajador.cerrar()
+        self.stdout.write(self.style.SUCCESS(f"{ejecutados} trabajos procesados"))
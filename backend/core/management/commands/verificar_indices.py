@@ -0,0 +1,33 @@
+# backend/core/management/commands/verificar_indices.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from core.indices import verificar_planes
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta EXPLAIN sobre las consultas críticas de la API y falla si "
+        "alguna recorre una tabla completa en lugar de usar un índice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--planes', action='store_true', help="Mostrar el plan de cada consulta")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            resultados = verificar_planes()
+
+        fallidas = []
+        for nombre, plan, usa_indices in resultados:
+            if usa_indices:
+                self.stdout.write(self.style.SUCCESS(f"OK     {nombre}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"SCAN   {nombre}"))
+                fallidas.append(nombre)
+            if options['planes'] or not usa_indices:
+                for linea in plan.splitlines():
+                    self.stdout.write(f"         {linea}")
+
+        if fallidas:
+            raise CommandError(f"Consultas sin índice: {', '.join(fallidas)}")
@@ -0,0 +1,214 @@
+# backend/core/medicion.py
+
+"""
+Medición por petición: cuántas consultas hace, cuánto tiempo pasa en la
+base de datos, en la serialización y en la autenticación.
+
+`MedicionMiddleware` mide una fracción de las peticiones (MEDICION_MUESTREO)
+y en ellas:
+
+- responde el encabezado `Server-Timing`, que las herramientas del
+  navegador muestran junto a cada petición, p. ej.
+  `db;dur=4.1;desc="3 consultas", serializacion;dur=1.2, autenticacion;dur=0.1, total;dur=9.8`
+- escribe una línea en el logger `core.medicion` con la vista, la acción
+  del ViewSet y los mismos tiempos (también en `record.medicion`, para
+  formateadores JSON).
+
+Las consultas se miden con un execute_wrapper que se instala en cada
+conexión (ver CoreConfig.ready). La serialización la miden
+CamposDinamicosMixin y SerializadorCompilado, y la autenticación
+ClaimsJWTAuthentication, con `tramo(...)`. La medición en curso viaja en
+una ContextVar, por lo que también sigue a las vistas async y a las
+consultas que estas ejecutan en un hilo. Fuera de una petición medida
+todo se reduce a leer esa ContextVar.
+
+Con METRICAS_ACTIVAS el middleware además mide la duración y las consultas
+de todas las peticiones para las métricas de core.metricas; los tramos de
+serialización y autenticación solo se miden en las muestreadas.
+
+Las consultas que hace una respuesta streaming mientras se transmite
+quedan fuera: ocurren después de responder el encabezado.
+"""
+
+import contextlib
+import logging
+import random
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from .metricas import registrar_peticion
+
+logger = logging.getLogger(__name__)
+
+TRAMOS = ('serializacion', 'autenticacion')
+
+_medicion_actual = ContextVar('medicion', default=None)
+_sin_medicion = contextlib.nullcontext()
+
+
+class Medicion:
+    """
+    Tiempos acumulados (en segundos) y consultas de una petición. Los
+    tramos solo se miden si es `detallada` (muestreada).
+    """
+
+    def __init__(self, detallada):
+        self.detallada = detallada
+        self.inicio = perf_counter()
+        self.consultas = 0
+        self.db = 0.0
+        self.tiempos = dict.fromkeys(TRAMOS, 0.0)
+        self._abiertos = set()
+
+    @contextlib.contextmanager
+    def tramo(self, nombre):
+        # Un tramo anidado en otro del mismo nombre (un serializer dentro
+        # de otro) ya está contado en el externo
+        if nombre in self._abiertos:
+            yield
+            return
+        self._abiertos.add(nombre)
+        inicio = perf_counter()
+        try:
+            yield
+        finally:
+            self.tiempos[nombre] += perf_counter() - inicio
+            self._abiertos.discard(nombre)
+
+
+def tramo(nombre):
+    """
+    Context manager que suma su duración al tramo `nombre` de la petición
+    medida en curso; si no hay una, no hace nada.
+    """
+    medicion = _medicion_actual.get()
+    if medicion is None or not medicion.detallada:
+        return _sin_medicion
+    return medicion.tramo(nombre)
+
+
+def registrar_consulta(execute, sql, params, many, context):
+    """
+    execute_wrapper que cuenta y cronometra las consultas de la petición
+    medida en curso.
+    """
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.consultas += 1
+        medicion.db += perf_counter() - inicio
+
+
+def instalar_en_conexion(sender, connection, **kwargs):
+    """
+    Receptor de `connection_created`: agrega `registrar_consulta` a la conexión.
+    """
+    if registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(registrar_consulta)
+
+
+def nombre_de_vista(request):
+    """
+    (vista, acción) de la petición: el ViewSet y su acción para las vistas
+    del router, o el nombre de la función para las demás.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None, None
+    vista = getattr(match.func, 'cls', match.func)
+    acciones = getattr(match.func, 'actions', None) or {}
+    return vista.__name__, acciones.get(request.method.lower())
+
+
+class MedicionMiddleware:
+    """
+    Mide una de cada 1/MEDICION_MUESTREO peticiones y agrega a su respuesta
+    el encabezado Server-Timing; con METRICAS_ACTIVAS registra además las
+    métricas de todas. Funciona tanto con WSGI como con ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        medicion = _iniciar()
+        if medicion is None:
+            return self.get_response(request)
+        token = _medicion_actual.set(medicion)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        return _terminar(request, response, medicion)
+
+    async def __acall__(self, request):
+        medicion = _iniciar()
+        if medicion is None:
+            return await self.get_response(request)
+        token = _medicion_actual.set(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        return _terminar(request, response, medicion)
+
+
+def _iniciar():
+    muestreo = settings.MEDICION_MUESTREO
+    detallada = muestreo >= 1 or (muestreo > 0 and random.random() < muestreo)
+    if not detallada and not settings.METRICAS_ACTIVAS:
+        return None
+    return Medicion(detallada)
+
+
+def _terminar(request, response, medicion):
+    total = perf_counter() - medicion.inicio
+    if settings.METRICAS_ACTIVAS:
+        registrar_peticion(request, response.status_code, total, medicion.consultas)
+    if medicion.detallada:
+        _informar(request, response, medicion, total)
+    return response
+
+
+def _informar(request, response, medicion, total):
+    vista, accion = nombre_de_vista(request)
+    datos = {
+        'metodo': request.method,
+        'ruta': request.path,
+        'vista': vista,
+        'accion': accion,
+        'status': response.status_code,
+        'consultas': medicion.consultas,
+        'db_ms': round(medicion.db * 1000, 2),
+        **{f'{nombre}_ms': round(segundos * 1000, 2) for nombre, segundos in medicion.tiempos.items()},
+        'total_ms': round(total * 1000, 2),
+    }
+
+    metricas = [f'db;dur={datos["db_ms"]};desc="{medicion.consultas} consultas"']
+    metricas += [f'{nombre};dur={datos[f"{nombre}_ms"]}' for nombre in TRAMOS]
+    metricas.append(f'total;dur={datos["total_ms"]}')
+    if response.has_header('Server-Timing'):
+        metricas.insert(0, response['Server-Timing'])
+    response['Server-Timing'] = ', '.join(metricas)
+
+    logger.info(
+        'medicion metodo=%s ruta=%s vista=%s accion=%s status=%s consultas=%s db_ms=%s '
+        'serializacion_ms=%s autenticacion_ms=%s total_ms=%s',
+        datos['metodo'], datos['ruta'], datos['vista'], datos['accion'], datos['status'],
+        datos['consultas'], datos['db_ms'], datos['serializacion_ms'],
+        datos['autenticacion_ms'], datos['total_ms'],
+        extra={'medicion': datos}
+    )
@@ -0,0 +1,372 @@
+# backend/core/metricas.py
+
+"""
+Métricas de la API en el formato de texto de Prometheus (GET /api/metricas/).
+
+Por cada acción (`usuario-ranking`, `tarea-create`, `grupo-unirse`, ...)
+MedicionMiddleware registra la latencia en un histograma, las peticiones
+por clase de estado HTTP, los errores del servidor y las consultas a la base
+de datos. Los contadores de negocio (tareas registradas, puntos y logros
+otorgados) se suman con `sumar_al_confirmar`, solo si la transacción que
+los origina se confirma.
+
+Cada proceso acumula sus métricas en memoria. Con METRICAS_DIRECTORIO, cada
+METRICAS_ESCRITURA_SEGUNDOS (y al terminar) las guarda en un archivo propio
+de ese directorio, y el endpoint suma los archivos de todos los procesos
+del host: así los workers de gunicorn se reportan como uno solo, sin
+servicios externos. Como solo hay contadores e histogramas, sumar es
+siempre correcto, también con los archivos de procesos que ya terminaron
+(sus contadores no deben retroceder). El proceso que responde el endpoint
+suma a los suyos los archivos de los procesos que ya terminaron (workers
+reciclados) y los borra, así que el directorio tiene a lo más un archivo
+por proceso vivo más los terminados desde la última consulta. El
+directorio se vacía al (re)iniciar el servicio y no se debe compartir entre
+hosts o contenedores: los procesos se reconocen por su pid. Sin
+METRICAS_DIRECTORIO el endpoint solo ve el proceso que responde.
+"""
+
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# nombre -> (tipo, ayuda)
+METRICAS = {
+    'ecopoints_peticiones_total': ('counter', 'Peticiones atendidas por acción y clase de estado HTTP.'),
+    'ecopoints_errores_total': ('counter', 'Peticiones que terminaron en un error del servidor (5xx).'),
+    'ecopoints_consultas_db_total': ('counter', 'Consultas a la base de datos por acción.'),
+    'ecopoints_latencia_segundos': ('histogram', 'Duración de las peticiones por acción.'),
+    'ecopoints_tareas_registradas_total': ('counter', 'Tareas registradas (HU04).'),
+    'ecopoints_puntos_otorgados_total': ('counter', 'Puntos otorgados al registrar tareas.'),
+    'ecopoints_logros_otorgados_total': ('counter', 'Logros otorgados a usuarios (HU08).'),
+}
+
+# Límites superiores (segundos) de los buckets del histograma de latencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RegistroMetricas:
+    """
+    Contadores e histogramas de este proceso, con su archivo en
+    METRICAS_DIRECTORIO. Si el proceso se bifurca (gunicorn --preload), el
+    hijo empieza de cero con su propio archivo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Serializa las escrituras del archivo (hilo escritor, endpoint, atexit)
+        self._lock_archivo = threading.Lock()
+        self._pid = None
+        self._proceso_actual()
+
+    def _proceso_actual(self):
+        # Llamar con el lock tomado
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._nombre_archivo = f'metricas-{self._pid}-{uuid.uuid4().hex[:8]}.json'
+        # (nombre, etiquetas) -> valor
+        self._contadores = defaultdict(float)
+        # (nombre, etiquetas) -> [cantidad por bucket..., +Inf, suma]
+        self._histogramas = {}
+        self._pendiente = False
+        self._escritor = None
+
+    def sumar(self, nombre, valor=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._proceso_actual()
+            self._contadores[clave] += valor
+            self._marcar()
+
+    def observar(self, nombre, valor, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._proceso_actual()
+            buckets = self._histogramas.get(clave)
+            if buckets is None:
+                buckets = self._histogramas[clave] = [0] * (len(BUCKETS_LATENCIA) + 1) + [0.0]
+            buckets[bisect.bisect_left(BUCKETS_LATENCIA, valor)] += 1
+            buckets[-1] += valor
+            self._marcar()
+
+    def _marcar(self):
+        self._pendiente = True
+        if settings.METRICAS_DIRECTORIO and self._escritor is None:
+            self._escritor = threading.Thread(target=self._escribir_periodicamente, daemon=True)
+            self._escritor.start()
+
+    def _escribir_periodicamente(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(settings.METRICAS_ESCRITURA_SEGUNDOS)
+            try:
+                self.guardar()
+            except Exception:
+                # Un error de disco no debe detener el hilo: se reintenta en
+                # la siguiente vuelta
+                logger.exception("No se pudieron guardar las métricas")
+
+    def instantanea(self):
+        """
+        Las métricas del proceso en un dict que se puede guardar como JSON.
+        """
+        with self._lock:
+            self._proceso_actual()
+            return {
+                'contadores': [[nombre, etiquetas, valor] for (nombre, etiquetas), valor in self._contadores.items()],
+                'histogramas': [[nombre, etiquetas, list(buckets)] for (nombre, etiquetas), buckets in self._histogramas.items()],
+            }
+
+    def heredar(self, datos):
+        """
+        Sumar a las de este proceso las métricas (una instantánea) de un
+        proceso que ya terminó.
+        """
+        with self._lock:
+            self._proceso_actual()
+            for nombre, etiquetas, valor in datos['contadores']:
+                self._contadores[nombre, _etiquetas(etiquetas)] += valor
+            for nombre, etiquetas, buckets in datos['histogramas']:
+                clave = (nombre, _etiquetas(etiquetas))
+                actuales = self._histogramas.get(clave)
+                if actuales is None:
+                    self._histogramas[clave] = list(buckets)
+                else:
+                    self._histogramas[clave] = [a + b for a, b in zip(actuales, buckets)]
+            self._marcar()
+
+    def guardar(self):
+        """
+        Escribir las métricas del proceso en su archivo, si cambiaron. El
+        archivo se reemplaza de una vez, para que nunca se lea a medias.
+        """
+        directorio = settings.METRICAS_DIRECTORIO
+        if not directorio:
+            return
+        with self._lock_archivo:
+            if not self._pendiente:
+                return
+            self._pendiente = False
+            datos = self.instantanea()
+            destino = Path(directorio) / self._nombre_archivo
+            temporal = destino.with_name(f'{destino.name}.{uuid.uuid4().hex[:8]}.tmp')
+            try:
+                temporal.write_text(json.dumps(datos), encoding='utf-8')
+                os.replace(temporal, destino)
+            except BaseException:
+                self._pendiente = True
+                temporal.unlink(missing_ok=True)
+                raise
+
+
+registro_metricas = RegistroMetricas()
+atexit.register(registro_metricas.guardar)
+
+
+def sumar_al_confirmar(nombre, valor=1, **etiquetas):
+    """
+    Sumar `valor` al contador `nombre` cuando se confirme la transacción en
+    curso (de inmediato, fuera de una transacción).
+    """
+    transaction.on_commit(lambda: registro_metricas.sumar(nombre, valor, **etiquetas))
+
+
+def accion_de_peticion(request):
+    """
+    Nombre de la acción de la petición: `basename-acción` para las vistas del
+    router, el nombre de la URL para las demás.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'sin_ruta'
+    initkwargs = getattr(match.func, 'initkwargs', {})
+    accion = (getattr(match.func, 'actions', None) or {}).get(request.method.lower())
+    if 'basename' in initkwargs and accion:
+        return f"{initkwargs['basename']}-{accion}"
+    return match.url_name or 'sin_nombre'
+
+
+def registrar_peticion(request, status, duracion, consultas):
+    """
+    Registrar la latencia, el estado y las consultas de una petición.
+    """
+    accion = accion_de_peticion(request)
+    registro_metricas.observar('ecopoints_latencia_segundos', duracion, accion=accion)
+    registro_metricas.sumar('ecopoints_peticiones_total', accion=accion, estado=f'{status // 100}xx')
+    if status >= 500:
+        registro_metricas.sumar('ecopoints_errores_total', accion=accion)
+    if consultas:
+        registro_metricas.sumar('ecopoints_consultas_db_total', consultas, accion=accion)
+
+
+def combinar(instantaneas):
+    """
+    Sumar las métricas de varios procesos.
+    """
+    contadores = defaultdict(float)
+    histogramas = {}
+    for datos in instantaneas:
+        for nombre, etiquetas, valor in datos['contadores']:
+            contadores[nombre, _etiquetas(etiquetas)] += valor
+        for nombre, etiquetas, buckets in datos['histogramas']:
+            clave = (nombre, _etiquetas(etiquetas))
+            if clave in histogramas:
+                histogramas[clave] = [a + b for a, b in zip(histogramas[clave], buckets)]
+            else:
+                histogramas[clave] = list(buckets)
+    return contadores, histogramas
+
+
+def _etiquetas(etiquetas):
+    # En JSON las tuplas de pares llegan como listas
+    return tuple(tuple(par) for par in etiquetas)
+
+
+def instantaneas_del_host():
+    """
+    Las métricas de este proceso y las de los archivos de los demás.
+    """
+    directorio = settings.METRICAS_DIRECTORIO
+    if not directorio:
+        return [registro_metricas.instantanea()]
+    heredados = heredar_terminados(Path(directorio))
+    try:
+        registro_metricas.guardar()
+    except OSError:
+        logger.exception("No se pudieron guardar las métricas")
+    for archivo in heredados:
+        archivo.unlink(missing_ok=True)
+    instantaneas = [registro_metricas.instantanea()]
+    propio = registro_metricas._nombre_archivo
+    for archivo in Path(directorio).glob('metricas-*.json'):
+        if archivo.name == propio:
+            continue
+        try:
+            instantaneas.append(json.loads(archivo.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            # Un archivo borrado o ilegible no impide reportar los demás
+            continue
+    return instantaneas
+
+
+def heredar_terminados(directorio):
+    """
+    Sumar a este proceso los archivos de los procesos que ya terminaron.
+    Cada archivo se reclama renombrándolo, así solo lo suma un proceso.
+    Retorna los archivos reclamados, para borrarlos una vez guardado el
+    archivo propio.
+    """
+    reclamados = []
+    for archivo in directorio.glob('metricas-*'):
+        if archivo.name.startswith(registro_metricas._nombre_archivo) or not _proceso_terminado(archivo):
+            continue
+        if archivo.suffix == '.tmp':
+            # Escritura interrumpida de un proceso terminado
+            archivo.unlink(missing_ok=True)
+            continue
+        if archivo.suffix != '.json':
+            continue
+        reclamado = archivo.with_name(f'{archivo.name}.{os.getpid()}.heredado')
+        try:
+            os.rename(archivo, reclamado)
+        except OSError:
+            # Otro proceso lo reclamó primero
+            continue
+        try:
+            registro_metricas.heredar(json.loads(reclamado.read_text(encoding='utf-8')))
+        except (OSError, ValueError, KeyError):
+            logger.warning("Se descartó el archivo de métricas ilegible %s", archivo.name)
+        reclamados.append(reclamado)
+    return reclamados
+
+
+def _proceso_terminado(archivo):
+    # metricas-<pid>-<sufijo>.json; solo se puede saber en POSIX (en Windows
+    # os.kill termina el proceso)
+    if os.name != 'posix':
+        return False
+    try:
+        pid = int(archivo.name.split('-')[1])
+    except (IndexError, ValueError):
+        return False
+    if pid == os.getpid():
+        # Un proceso anterior con el mismo pid
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        # Existe, pero es de otro usuario
+        return False
+    return False
+
+
+def texto_prometheus(instantaneas):
+    """
+    Las métricas combinadas en el formato de texto de Prometheus (0.0.4).
+    """
+    contadores, histogramas = combinar(instantaneas)
+    por_metrica = defaultdict(list)
+    for (nombre, etiquetas), valor in contadores.items():
+        por_metrica[nombre].append((etiquetas, valor))
+    for (nombre, etiquetas), buckets in histogramas.items():
+        por_metrica[nombre].append((etiquetas, buckets))
+
+    lineas = []
+    for nombre, (tipo, ayuda) in METRICAS.items():
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        for etiquetas, valor in sorted(por_metrica.get(nombre, [])):
+            if tipo == 'histogram':
+                acumulado = 0
+                for limite, cantidad in zip(BUCKETS_LATENCIA + ('+Inf',), valor):
+                    acumulado += cantidad
+                    lineas.append(f'{nombre}_bucket{_formatear(etiquetas + (("le", str(limite)),))} {acumulado}')
+                lineas.append(f'{nombre}_sum{_formatear(etiquetas)} {valor[-1]!r}')
+                lineas.append(f'{nombre}_count{_formatear(etiquetas)} {acumulado}')
+            else:
+                lineas.append(f'{nombre}{_formatear(etiquetas)} {float(valor)!r}')
+    return '\n'.join(lineas) + '\n'
+
+
+def _formatear(etiquetas):
+    if not etiquetas:
+        return ''
+    pares = ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in etiquetas)
+    return '{' + pares + '}'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def metricas_vista(request):
+    """
+    GET /api/metricas/ - Métricas de todos los procesos del host.
+    Con METRICAS_TOKEN se exige `Authorization: Bearer <token>`; sin él,
+    solo responde en desarrollo (DEBUG).
+    """
+    token = settings.METRICAS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseNotFound()
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(texto_prometheus(instantaneas_del_host()), content_type=CONTENT_TYPE)
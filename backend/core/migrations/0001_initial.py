@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:25
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trabajo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(help_text='Nombre con que se registró la función del trabajo', max_length=100)),
+                ('argumentos', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Argumentos con nombre de la función')),
+                ('clave_idempotencia', models.CharField(blank=True, help_text='Si se indica, el trabajo se encola una sola vez por clave', max_length=200, null=True, unique=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('completado', 'Completado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('max_intentos', models.PositiveIntegerField(default=5)),
+                ('ejecutar_desde', models.DateTimeField(default=django.utils.timezone.now, help_text='No se ejecuta antes de esta fecha (reintentos con espera)')),
+                ('tomado_en', models.DateTimeField(blank=True, help_text='Cuándo lo tomó un trabajador por última vez', null=True)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('ultima_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Trabajo',
+                'verbose_name_plural': 'Trabajos',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('estado__in', ['pendiente', 'en_curso'])), fields=['ejecutar_desde', 'id'], name='trabajo_por_ejecutar_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,85 @@
+# backend/core/models.py
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
+
+
+class Trabajo(models.Model):
+    """
+    Trabajo en segundo plano encolado por una petición (ver core.trabajos).
+    Se inserta en la misma transacción que los datos que lo originan, por
+    lo que no se pierde aunque el proceso termine antes de ejecutarlo.
+    """
+
+    ESTADO_PENDIENTE = 'pendiente'
+    ESTADO_EN_CURSO = 'en_curso'
+    ESTADO_COMPLETADO = 'completado'
+    ESTADO_FALLIDO = 'fallido'
+
+    ESTADOS = [
+        (ESTADO_PENDIENTE, 'Pendiente'),
+        (ESTADO_EN_CURSO, 'En curso'),
+        (ESTADO_COMPLETADO, 'Completado'),
+        (ESTADO_FALLIDO, 'Fallido'),
+    ]
+
+    nombre = models.CharField(
+        max_length=100,
+        help_text="Nombre con que se registró la función del trabajo"
+    )
+
+    argumentos = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        help_text="Argumentos con nombre de la función"
+    )
+
+    clave_idempotencia = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        unique=True,
+        help_text="Si se indica, el trabajo se encola una sola vez por clave"
+    )
+
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADOS,
+        default=ESTADO_PENDIENTE
+    )
+
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=5)
+
+    ejecutar_desde = models.DateTimeField(
+        default=timezone.now,
+        help_text="No se ejecuta antes de esta fecha (reintentos con espera)"
+    )
+
+    tomado_en = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Cuándo lo tomó un trabajador por última vez"
+    )
+
+    error = models.TextField(blank=True)
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    ultima_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Trabajo"
+        verbose_name_plural = "Trabajos"
+        ordering = ['id']
+        indexes = [
+            # Búsqueda de trabajos por ejecutar de los trabajadores
+            models.Index(
+                fields=['ejecutar_desde', 'id'],
+                condition=models.Q(estado__in=['pendiente', 'en_curso']),
+                name='trabajo_por_ejecutar_idx'
+            ),
+        ]
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.nombre} #{self.pk} ({self.get_estado_display()})"
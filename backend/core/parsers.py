@@ -0,0 +1,30 @@
+# backend/core/parsers.py
+
+"""
+Parser JSON rápido para la API (ver core.renderers).
+"""
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import JSONRapidoRenderer, orjson
+
+
+class JSONRapidoParser(JSONParser):
+    """
+    Usa orjson para cuerpos UTF-8 con STRICT_JSON activado (orjson siempre
+    rechaza NaN e Infinity). En cualquier otro caso delega en JSONParser.
+    """
+    renderer_class = JSONRapidoRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
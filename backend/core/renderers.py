@@ -0,0 +1,47 @@
+# backend/core/renderers.py
+
+"""
+Renderer JSON rápido para la API.
+
+Si `orjson` está instalado se usa para serializar las respuestas: maneja
+de forma nativa date, datetime, UUID y los dict/list de DRF, y solo recurre
+al encoder de DRF para lo demás (Decimal, lazy strings, querysets...). Sin
+orjson, o si el cliente pide la salida indentada, se comporta exactamente
+como `rest_framework.renderers.JSONRenderer`.
+"""
+
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+_codificador = encoders.JSONEncoder()
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    """
+    Misma salida que JSONRenderer con UNICODE_JSON, COMPACT_JSON y
+    STRICT_JSON activados (los valores por defecto de DRF). Con ellos
+    desactivados se usa el renderer estándar. Con orjson, un float NaN o
+    infinito se emite como null en lugar de lanzar ValueError.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data, default=_codificador.default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        )
+        # Igual que DRF: escapar U+2028 y U+2029 para que sea un subconjunto de JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
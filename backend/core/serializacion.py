@@ -0,0 +1,148 @@
+# backend/core/serializacion.py
+
+"""
+Serialización rápida de solo lectura para listados grandes.
+
+`SerializadorCompilado` recorre una vez los campos de un ModelSerializer
+(ya recortado por ?fields= / ?expand= si corresponde) y arma un plan: qué
+columnas pedir con `.values_list()` y cómo convertir cada una. Luego cada
+fila se construye directamente desde la tupla, sin instanciar modelos ni
+pasar por `get_attribute` de DRF. Las conversiones usan el mismo
+`to_representation` de cada campo, por lo que la salida es idéntica a la
+del serializer original.
+
+Solo admite campos que leen una columna del modelo (o de un modelo
+relacionado por FK, en serializers anidados); con cualquier otro se lanza
+`NoCompilable` al compilar.
+"""
+
+import functools
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import FileField
+from rest_framework import serializers
+from .medicion import tramo
+
+
+class NoCompilable(Exception):
+    """
+    El serializer tiene campos que no se pueden leer desde `.values()`.
+    """
+
+
+# Campos cuyo to_representation no cambia el valor que entrega la base de datos
+_SIN_CONVERSION = (serializers.CharField, serializers.IntegerField)
+
+
+class SerializadorCompilado:
+
+    def __init__(self, serializer):
+        serializer = getattr(serializer, 'child', serializer)
+        self.modelo = serializer.Meta.model
+        self.columnas = []
+        self._operaciones = self._compilar(serializer, self.modelo, '')
+
+    def _columna(self, ruta):
+        self.columnas.append(ruta)
+        return len(self.columnas) - 1
+
+    def _compilar(self, serializer, modelo, prefijo):
+        operaciones = []
+        for campo in serializer._readable_fields:
+            if len(campo.source_attrs) != 1:
+                raise NoCompilable(f"{campo.field_name}: source '{campo.source}' no es una columna")
+            try:
+                campo_modelo = modelo._meta.get_field(campo.source_attrs[0])
+            except FieldDoesNotExist:
+                raise NoCompilable(f"{campo.field_name}: '{campo.source}' no es un campo de {modelo.__name__}")
+            if not campo_modelo.concrete or campo_modelo.many_to_many:
+                raise NoCompilable(f"{campo.field_name}: '{campo.source}' no es una columna")
+
+            ruta = prefijo + campo_modelo.name
+            if isinstance(campo, serializers.BaseSerializer):
+                if isinstance(campo, serializers.ListSerializer) or not campo_modelo.many_to_one:
+                    raise NoCompilable(f"{campo.field_name}: solo se admiten anidados por FK")
+                indice = self._columna(ruta)
+                anidado = self._compilar(campo, campo_modelo.related_model, ruta + '__')
+                operaciones.append((campo.field_name, indice, anidado, True))
+                continue
+
+            if isinstance(campo, serializers.PrimaryKeyRelatedField):
+                convertir = None if campo.pk_field is None else campo.pk_field.to_representation
+            elif isinstance(campo_modelo, FileField):
+                convertir = _convertir_archivo(campo, campo_modelo)
+            elif isinstance(campo, _SIN_CONVERSION):
+                convertir = None
+            else:
+                convertir = campo.to_representation
+            operaciones.append((campo.field_name, self._columna(ruta), convertir, False))
+        return operaciones
+
+    def _fila(self, operaciones, fila):
+        ret = {}
+        for nombre, indice, convertir, anidado in operaciones:
+            valor = fila[indice]
+            if valor is None:
+                ret[nombre] = None
+            elif anidado:
+                ret[nombre] = self._fila(convertir, fila)
+            elif convertir is None:
+                ret[nombre] = valor
+            else:
+                ret[nombre] = convertir(valor)
+        return ret
+
+    def serializar(self, queryset):
+        """
+        Lista de dicts equivalente a `Serializer(queryset, many=True).data`.
+        """
+        operaciones = self._operaciones
+        filas = list(queryset.values_list(*self.columnas))
+        with tramo('serializacion'):
+            return [self._fila(operaciones, fila) for fila in filas]
+
+    def serializar_por_pk(self, queryset):
+        """
+        Como `serializar`, pero retorna {pk: dict} para reordenar los resultados.
+        """
+        operaciones = self._operaciones
+        filas = list(queryset.values_list(*self.columnas, 'pk'))
+        with tramo('serializacion'):
+            return {fila[-1]: self._fila(operaciones, fila) for fila in filas}
+
+    async def aserializar(self, queryset):
+        """
+        `serializar` con el ORM async.
+        """
+        operaciones = self._operaciones
+        filas = [fila async for fila in queryset.values_list(*self.columnas)]
+        with tramo('serializacion'):
+            return [self._fila(operaciones, fila) for fila in filas]
+
+    async def aserializar_por_pk(self, queryset):
+        """
+        `serializar_por_pk` con el ORM async.
+        """
+        operaciones = self._operaciones
+        filas = [fila async for fila in queryset.values_list(*self.columnas, 'pk')]
+        with tramo('serializacion'):
+            return {fila[-1]: self._fila(operaciones, fila) for fila in filas}
+
+
+def _convertir_archivo(campo, campo_modelo):
+    """
+    `.values()` entrega el nombre del archivo; DRF espera un FieldFile para armar la URL.
+    """
+    def convertir(nombre):
+        return campo.to_representation(campo_modelo.attr_class(None, campo_modelo, nombre))
+    return convertir
+
+
+@functools.lru_cache(maxsize=None)
+def compilado(serializer_class):
+    """
+    Plan compilado y reutilizable para `serializer_class` sin contexto
+    (sin petición no hay ?fields= ni URLs absolutas que dependan de ella).
+    """
+    return SerializadorCompilado(serializer_class())
+
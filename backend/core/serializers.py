@@ -0,0 +1,178 @@
+# backend/core/serializers.py
+
+"""
+Selección de campos en las respuestas de la API: ?fields= y ?expand=.
+
+- ?fields=id,fecha_realizacion,tipo_tarea_info.nombre
+  Solo incluye esos campos. Con un punto se eligen campos de un anidado.
+- ?expand=tipo_tarea_info,grupo_info.creador_info
+  De los campos anidados (los declarados en `Meta.expandibles`) solo
+  incluye los indicados; ?expand= vacío no incluye ninguno.
+
+Sin parámetros la respuesta no cambia. Solo se aplica en peticiones de
+lectura. `optimizar_queryset` agrega los select_related / prefetch_related
+que necesitan los anidados que efectivamente se van a serializar.
+"""
+
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from .medicion import tramo
+
+
+class Seleccion:
+    """
+    Campos pedidos para un serializer y, por nombre de campo, para sus anidados.
+    `campos` y `expandir` son None cuando el cliente no los restringe.
+    """
+
+    def __init__(self, campos=None, expandir=None):
+        self.campos = campos
+        self.expandir = expandir
+        self.anidados = {}
+
+    def anidado(self, nombre):
+        hijo = self.anidados.get(nombre)
+        if hijo is None:
+            # Si el padre restringe la expansión, sus anidados tampoco expanden nada más
+            hijo = Seleccion(expandir=None if self.expandir is None else set())
+            self.anidados[nombre] = hijo
+        return hijo
+
+    @classmethod
+    def desde_parametros(cls, fields=None, expand=None):
+        seleccion = cls(
+            campos=None if fields is None else set(),
+            expandir=None if expand is None else set()
+        )
+        for ruta in _separar(fields):
+            nodo = seleccion
+            *padres, campo = ruta.split('.')
+            for padre in padres:
+                nodo.campos.add(padre)
+                nodo = nodo.anidado(padre)
+                if nodo.campos is None:
+                    nodo.campos = set()
+            nodo.campos.add(campo)
+        for ruta in _separar(expand):
+            nodo = seleccion
+            for nombre in ruta.split('.'):
+                nodo.expandir.add(nombre)
+                nodo = nodo.anidado(nombre)
+                if nodo.expandir is None:
+                    nodo.expandir = set()
+        return seleccion
+
+
+def _separar(valor):
+    return [parte.strip() for parte in (valor or '').split(',') if parte.strip()]
+
+
+def seleccion_de_peticion(request):
+    """
+    Seleccion pedida en la petición, o None si no restringe nada.
+    Se calcula una vez por petición.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    if not hasattr(request, '_seleccion_campos'):
+        params = request.query_params
+        fields, expand = params.get('fields'), params.get('expand')
+        request._seleccion_campos = (
+            None if fields is None and expand is None
+            else Seleccion.desde_parametros(fields, expand)
+        )
+    return request._seleccion_campos
+
+
+class CamposDinamicosMixin:
+    """
+    Mixin para ModelSerializer que aplica ?fields= y ?expand=.
+
+    `Meta.expandibles` relaciona cada campo anidado con la relación del
+    modelo que recorre, p. ej. {'usuario_info': 'usuario'}.
+    """
+
+    def _seleccion(self):
+        nodo = self
+        if isinstance(nodo.parent, serializers.ListSerializer):
+            nodo = nodo.parent
+        padre = nodo.parent
+        if padre is None:
+            return seleccion_de_peticion(self.context.get('request'))
+        if isinstance(padre, serializers.ListSerializer):
+            padre = padre.child
+        if not isinstance(padre, CamposDinamicosMixin):
+            return None
+        seleccion_padre = padre._seleccion()
+        if seleccion_padre is None:
+            return None
+        return seleccion_padre.anidado(nodo.field_name)
+
+    def get_fields(self):
+        campos = super().get_fields()
+        seleccion = self._seleccion()
+        if seleccion is None:
+            return campos
+
+        expandibles = getattr(self.Meta, 'expandibles', {})
+        for nombre in list(campos):
+            if seleccion.campos is not None:
+                incluido = nombre in seleccion.campos or (
+                    nombre in expandibles and nombre in (seleccion.expandir or ())
+                )
+            else:
+                incluido = nombre not in expandibles or seleccion.expandir is None or nombre in seleccion.expandir
+            if not incluido:
+                del campos[nombre]
+        return campos
+
+    def to_representation(self, instance):
+        # Tiempo de serialización de la petición (ver core.medicion)
+        with tramo('serializacion'):
+            return super().to_representation(instance)
+
+    def relaciones(self):
+        """
+        Retorna (select_related, prefetch_related) para los anidados incluidos.
+        """
+        seleccionar, precargar = [], []
+        for nombre, ruta in getattr(self.Meta, 'expandibles', {}).items():
+            if nombre not in self.fields:
+                continue
+            campo = self.fields[nombre]
+            muchos = isinstance(campo, serializers.ListSerializer)
+            (precargar if muchos else seleccionar).append(ruta)
+
+            anidado = campo.child if muchos else campo
+            if isinstance(anidado, CamposDinamicosMixin):
+                sub_seleccionar, sub_precargar = anidado.relaciones()
+                destino = precargar if muchos else seleccionar
+                destino.extend(f'{ruta}__{sub}' for sub in sub_seleccionar)
+                precargar.extend(f'{ruta}__{sub}' for sub in sub_precargar)
+        return seleccionar, precargar
+
+
+def optimizar_queryset(queryset, serializer):
+    """
+    Agregar a `queryset` los select_related / prefetch_related que usará `serializer`.
+    """
+    serializer = getattr(serializer, 'child', serializer)
+    if not isinstance(serializer, CamposDinamicosMixin):
+        return queryset
+    seleccionar, precargar = serializer.relaciones()
+    if seleccionar:
+        queryset = queryset.select_related(*seleccionar)
+    if precargar:
+        queryset = queryset.prefetch_related(*precargar)
+    return queryset
+
+
+class CamposDinamicosViewSetMixin:
+    """
+    Mixin para ViewSets cuyos serializers usan CamposDinamicosMixin:
+    optimiza el queryset de list/retrieve según los campos pedidos.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return optimizar_queryset(queryset, self.get_serializer())
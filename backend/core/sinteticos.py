@@ -0,0 +1,187 @@
+# backend/core/sinteticos.py
+
+"""
+Generación de datos sintéticos realistas para medir la API a escala (ver
+los comandos generar_datos y benchmark_escalas).
+
+Todo se inserta con bulk_create por lotes y los datos derivados (totales
+de los usuarios, resúmenes diarios, libro de puntos, agregados de los
+grupos, logros obtenidos e índice del ranking) se calculan después con
+las mismas herramientas de reconstrucción que usa la aplicación, en lugar
+de pasar por las señales fila por fila. Con la misma semilla se generan
+los mismos datos.
+"""
+
+import datetime
+import itertools
+import random
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db.models import Sum
+from django.utils import timezone
+from gamificacion.logros import invalidar_logros, otorgar_logro_a_calificados
+from gamificacion.models import Grupo, Logro, MiembroGrupo
+from tareas.catalogo import invalidar_catalogo
+from tareas.models import MovimientoPuntos, ResumenDiario, TareaRegistrada, TipoTarea
+from usuarios.models import Usuario
+from usuarios.ranking import indice_ranking, invalidar_ranking
+
+NOMBRES = ['Ana', 'Benjamín', 'Camila', 'Diego', 'Elena', 'Felipe', 'Gabriela', 'Héctor',
+           'Isidora', 'Joaquín', 'Karla', 'Lucas', 'Martina', 'Nicolás', 'Olivia', 'Pablo']
+APELLIDOS = ['González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva',
+             'Martínez', 'Sepúlveda', 'Morales', 'Rodríguez', 'López', 'Fuentes']
+
+# Acciones por categoría con su CO₂ evitado (kg) y puntos de referencia
+ACCIONES = {
+    TipoTarea.CATEGORIA_RECICLAJE: [('Reciclar botellas', '0.50', 10), ('Reciclar papel', '0.80', 10),
+                                    ('Compostar residuos', '1.20', 20)],
+    TipoTarea.CATEGORIA_TRANSPORTE: [('Ir en bicicleta', '2.50', 30), ('Usar transporte público', '1.80', 20),
+                                     ('Caminar al trabajo', '2.00', 25)],
+    TipoTarea.CATEGORIA_ENERGIA: [('Apagar luces', '0.30', 5), ('Secar ropa al aire', '1.50', 15)],
+    TipoTarea.CATEGORIA_AGUA: [('Ducha corta', '0.40', 10), ('Reutilizar agua', '0.20', 5)],
+    TipoTarea.CATEGORIA_ALIMENTACION: [('Comida vegetariana', '1.70', 20), ('Comprar a granel', '0.60', 10)],
+    TipoTarea.CATEGORIA_OTRO: [('Plantar un árbol', '5.00', 50)],
+}
+
+
+def generar_datos(usuarios=1000, tareas=20000, grupos=50, logros=20, dias=365,
+                  semilla=42, password='ecopoints', tamano_lote=5000, progreso=None):
+    """
+    Crear los datos sintéticos y retornar un dict con la cantidad creada de
+    cada modelo. `progreso(mensaje)` se llama al terminar cada etapa.
+    Los usuarios nuevos tienen todos la misma contraseña, cuyo hash se
+    calcula una sola vez.
+    """
+    rng = random.Random(semilla)
+    avisar = progreso or (lambda mensaje: None)
+    hoy = timezone.localdate()
+    inicio = Usuario.objects.count()
+    hash_password = make_password(password)
+
+    nuevos = []
+    for i in range(inicio, inicio + usuarios):
+        nombre, apellido = rng.choice(NOMBRES), rng.choice(APELLIDOS)
+        nuevos.append(Usuario(
+            username=f'eco{i:07d}', email=f'eco{i:07d}@ecopoints.cl',
+            first_name=nombre, last_name=apellido, password=hash_password,
+            fecha_nacimiento=datetime.date(rng.randint(1960, 2010), rng.randint(1, 12), rng.randint(1, 28)),
+        ))
+    nuevos = Usuario.objects.bulk_create(nuevos, batch_size=tamano_lote)
+    usuario_ids = [usuario.pk for usuario in nuevos]
+    avisar(f"{len(usuario_ids)} usuarios")
+
+    tipos = list(TipoTarea.objects.filter(activa=True).order_by('pk'))
+    if not tipos:
+        tipos = TipoTarea.objects.bulk_create([
+            TipoTarea(
+                nombre=nombre, descripcion=f'{nombre} en lugar de la alternativa habitual',
+                categoria=categoria, co2_evitado_por_accion=Decimal(co2), puntos_otorgados=puntos
+            )
+            for categoria, acciones in ACCIONES.items()
+            for nombre, co2, puntos in acciones
+        ])
+        invalidar_catalogo()
+
+    # Pocos usuarios muy activos y muchos ocasionales (distribución de Pareto)
+    acumulado = list(itertools.accumulate(rng.paretovariate(1.2) for _ in usuario_ids))
+    creadas = 0
+    while creadas < tareas and usuario_ids:
+        lote = []
+        cantidad = min(tamano_lote, tareas - creadas)
+        for usuario_id in rng.choices(usuario_ids, cum_weights=acumulado, k=cantidad):
+            tipo = rng.choice(tipos)
+            lote.append(TareaRegistrada(
+                usuario_id=usuario_id,
+                tipo_tarea=tipo,
+                fecha_realizacion=hoy - datetime.timedelta(days=int(rng.triangular(0, dias, 0))),
+                co2_evitado=tipo.co2_evitado_por_accion,
+                puntos_ganados=tipo.puntos_otorgados,
+                validada=rng.random() < 0.95,
+                notas=rng.choice(['', '', '', 'Con la familia', 'Camino al trabajo']),
+            ))
+        TareaRegistrada.objects.bulk_create(lote)
+        creadas += len(lote)
+    avisar(f"{creadas} tareas")
+
+    # Derivados de las tareas: libro de puntos, totales y resúmenes diarios
+    _abrir_libro(usuario_ids, tamano_lote)
+    call_command('reconciliar_totales', tamano_lote=tamano_lote, stdout=StringIO())
+    ResumenDiario.objects.reconstruir(tamano_lote=tamano_lote)
+    avisar("totales, resúmenes diarios y libro de puntos")
+
+    creados_grupos = _generar_grupos(rng, grupos, usuario_ids, tamano_lote) if usuario_ids else []
+    call_command('reconciliar_grupos', tamano_lote=tamano_lote, stdout=StringIO())
+    miembros = MiembroGrupo.objects.filter(grupo__in=creados_grupos).count()
+    avisar(f"{len(creados_grupos)} grupos con {miembros} miembros")
+
+    creados_logros = Logro.objects.bulk_create([
+        Logro(
+            nombre=f'Logro {indice + 1}', descripcion='Logro generado para pruebas de escala',
+            tipo=Logro.TIPOS[min(indice * len(Logro.TIPOS) // max(logros, 1), len(Logro.TIPOS) - 1)][0],
+            puntos_requeridos=100 * 2 ** (indice // 2) if indice % 2 == 0 else 0,
+            co2_requerido=Decimal(10 * 2 ** (indice // 2)) if indice % 2 else Decimal('0'),
+        )
+        for indice in range(logros)
+    ])
+    invalidar_logros()
+    otorgados = sum(otorgar_logro_a_calificados(logro, tamano_lote=tamano_lote) for logro in creados_logros)
+    avisar(f"{len(creados_logros)} logros, {otorgados} otorgados")
+
+    invalidar_ranking()
+    indice_ranking.reconstruir()
+
+    return {
+        'usuarios': len(usuario_ids),
+        'tareas': creadas,
+        'grupos': len(creados_grupos),
+        'miembros': miembros,
+        'logros': len(creados_logros),
+        'logros_otorgados': otorgados,
+    }
+
+
+def _abrir_libro(usuario_ids, tamano_lote):
+    """
+    Saldo inicial en el libro de puntos de los usuarios generados, igual a
+    la suma de sus tareas (como al crear el libro).
+    """
+    for desde in range(0, len(usuario_ids), tamano_lote):
+        filas = TareaRegistrada.objects.filter(
+            usuario_id__in=usuario_ids[desde:desde + tamano_lote]
+        ).values('usuario_id').annotate(
+            puntos=Sum('puntos_ganados'), co2=Sum('co2_evitado')
+        ).order_by()
+        MovimientoPuntos.objects.registrar(MovimientoPuntos.TIPO_APERTURA, [
+            (fila['usuario_id'], None, fila['puntos'], fila['co2']) for fila in filas
+        ])
+
+
+def _generar_grupos(rng, cantidad, usuario_ids, tamano_lote):
+    inicio = Grupo.objects.count()
+    creadores = [rng.choice(usuario_ids) for _ in range(cantidad)]
+    grupos = Grupo.objects.bulk_create([
+        Grupo(
+            nombre=f'Comunidad verde {inicio + indice + 1}',
+            descripcion='Grupo generado para pruebas de escala',
+            creador_id=creador, publico=rng.random() < 0.8,
+        )
+        for indice, creador in enumerate(creadores)
+    ])
+    if not grupos:
+        return grupos
+
+    miembros = {(creador, grupo.pk): True for creador, grupo in zip(creadores, grupos)}
+    # Cerca de la mitad de los usuarios está en uno a tres grupos; los primeros grupos son más grandes
+    pesos = list(itertools.accumulate(1 / (posicion + 1) for posicion in range(len(grupos))))
+    for usuario_id in usuario_ids:
+        if rng.random() < 0.5:
+            for grupo in rng.choices(grupos, cum_weights=pesos, k=rng.randint(1, 3)):
+                miembros.setdefault((usuario_id, grupo.pk), False)
+    MiembroGrupo.objects.bulk_create([
+        MiembroGrupo(usuario_id=usuario_id, grupo_id=grupo_id, es_admin=es_admin)
+        for (usuario_id, grupo_id), es_admin in miembros.items()
+    ], batch_size=tamano_lote)
+    return grupos
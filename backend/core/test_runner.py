@@ -0,0 +1,16 @@
+# backend/core/test_runner.py
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class EcoPointsTestRunner(DiscoverRunner):
+    """
+    Runner de tests que ejecuta los trabajos en segundo plano al encolarlos
+    (TRABAJOS_INMEDIATOS), para que cada test vea sus efectos sin esperar
+    un trabajador. Los tests de core.trabajos lo desactivan con override_settings.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.TRABAJOS_INMEDIATOS = True
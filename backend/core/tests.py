@@ -1,3 +1,765 @@
-from django.test import TestCase
+# backend/core/tests.py
 
-# Create your tests here.
+import asyncio
+import datetime
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+import uuid
+from collections import Counter
+from zoneinfo import ZoneInfo
+from decimal import Decimal
+
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from gamificacion.logros import invalidar_logros
+from gamificacion.models import Grupo, Logro, LogroUsuario, MiembroGrupo
+from gamificacion.serializers import LogroUsuarioSerializer
+from tareas.models import TareaRegistrada, TipoTarea
+from tareas.serializers import TipoTareaSerializer
+from usuarios.authentication import TokenUsuario
+from usuarios.models import Usuario
+from usuarios.ranking import invalidar_ranking
+from usuarios.serializers import UsuarioPerfilSerializer, UsuarioSerializer
+from .eventos import CanalEventos, ConexionesAgotadas, canal_eventos
+from .models import Trabajo
+from .indices import PATRONES_RECORRIDO, verificar_planes
+from .metricas import combinar, instantaneas_del_host, registro_metricas, texto_prometheus
+from .parsers import JSONRapidoParser
+from .renderers import JSONRapidoRenderer
+from .serializacion import NoCompilable, SerializadorCompilado
+from .sinteticos import generar_datos
+from .trabajos import ejecutar, encolar, pendientes, trabajo
+from .urls import router
+
+
+class IndicesTests(TestCase):
+
+    def test_consultas_criticas_usan_indices(self):
+        fallidas = [
+            f"{nombre}:\n{plan}" for nombre, plan, usa_indices in verificar_planes() if not usa_indices
+        ]
+        self.assertEqual(fallidas, [], "\n\n".join(fallidas))
+
+    def test_detecta_recorridos_completos(self):
+        patron = PATRONES_RECORRIDO[connection.vendor]
+        if connection.vendor == 'sqlite':
+            self.assertTrue(patron.search('2 0 0 SCAN usuarios_usuario'))
+            self.assertFalse(patron.search('2 0 0 SCAN usuarios_usuario USING INDEX usuario_email_idx'))
+        else:
+            self.assertTrue(patron.search('Seq Scan on usuarios_usuario'))
+            self.assertFalse(patron.search('Index Scan using usuario_email_idx on usuarios_usuario'))
+
+
+    def test_motor_no_soportado(self):
+        conexion = connections['default']
+        conexion.vendor = 'oracle'
+        try:
+            with self.assertRaisesMessage(CommandError, 'soportados: postgresql, sqlite'):
+                call_command('verificar_indices', stdout=io.StringIO())
+        finally:
+            del conexion.vendor
+
+class SerializacionCompiladaTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(
+            username='ana', email='ana@test.cl', avatar='avatars/ana.png',
+            fecha_nacimiento=datetime.date(2001, 5, 4), co2_total_evitado=Decimal('3.5')
+        )
+        Usuario.objects.create(username='beto', email='beto@test.cl')
+        for i, icono in enumerate(['logros/hoja.png', '']):
+            logro = Logro.objects.create(nombre=f'Logro {i}', descripcion='-', icono=icono)
+            LogroUsuario.objects.create(usuario=self.usuario, logro=logro)
+        TipoTarea.objects.create(nombre='Reciclar', descripcion='-', co2_evitado_por_accion=Decimal('1.25'))
+
+    def assertJSONIdentico(self, clase, queryset, contexto=None):
+        contexto = contexto or {}
+        esperado = JSONRenderer().render(clase(queryset, many=True, context=contexto).data)
+        obtenido = JSONRenderer().render(SerializadorCompilado(clase(context=contexto)).serializar(queryset))
+        self.assertEqual(obtenido, esperado)
+
+    def test_salida_identica_a_drf(self):
+        request = Request(APIRequestFactory().get('/api/logros/mis-logros/'))
+        self.assertJSONIdentico(UsuarioSerializer, Usuario.objects.all())
+        self.assertJSONIdentico(LogroUsuarioSerializer, LogroUsuario.objects.all())
+        self.assertJSONIdentico(LogroUsuarioSerializer, LogroUsuario.objects.all(), {'request': request})
+        self.assertJSONIdentico(TipoTareaSerializer, TipoTarea.objects.all())
+
+    def test_rechaza_campos_calculados(self):
+        with self.assertRaises(NoCompilable):
+            SerializadorCompilado(UsuarioPerfilSerializer())
+
+
+class JSONRapidoTests(TestCase):
+
+    def test_misma_salida_que_drf(self):
+        datos = {
+            'co2': Decimal('12.50'),
+            'fecha': datetime.date(2025, 3, 1),
+            'utc': datetime.datetime(2025, 3, 1, 12, 30, 5, 120000, tzinfo=datetime.timezone.utc),
+            'santiago': datetime.datetime(2025, 3, 1, 9, 0, tzinfo=ZoneInfo('America/Santiago')),
+            'local': datetime.datetime(2025, 3, 1, 9, 0),
+            'hora': datetime.time(7, 15),
+            'id': uuid.UUID(int=7),
+            'texto': gettext_lazy('Reciclaje ñandú \u2028'),
+            'lista': [1, 2.5, None, True, {'anidado': 'sí'}],
+        }
+        self.assertEqual(JSONRapidoRenderer().render(datos), JSONRenderer().render(datos))
+        self.assertEqual(
+            JSONRapidoRenderer().render(datos, 'application/json; indent=2'),
+            JSONRenderer().render(datos, 'application/json; indent=2')
+        )
+
+    def test_parser(self):
+        cuerpo = '{"tareas": [{"tipo_tarea": 1, "notas": "ñ"}], "co2": 1.5}'.encode()
+        self.assertEqual(
+            JSONRapidoParser().parse(io.BytesIO(cuerpo)),
+            {'tareas': [{'tipo_tarea': 1, 'notas': 'ñ'}], 'co2': 1.5}
+        )
+
+
+ejecutados = []
+
+
+@trabajo('tests.anotar')
+def anotar(valor):
+    ejecutados.append(valor)
+
+
+@trabajo('tests.fallar', max_intentos=2)
+def fallar(username):
+    Usuario.objects.create(username=username, email=f'{username}@test.cl')
+    raise RuntimeError('sin conexión')
+
+
+@override_settings(TRABAJOS_INMEDIATOS=False, TRABAJOS_HILOS=0)
+class TrabajosTests(TestCase):
+
+    def setUp(self):
+        ejecutados.clear()
+
+    def test_encolar_y_ejecutar(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            trabajo_encolado = encolar('tests.anotar', {'valor': Decimal('1.50')})
+        self.assertEqual(len(callbacks), 1)
+        # Sin hilos en el proceso, el trabajo queda para trabajos_worker
+        self.assertEqual(ejecutados, [])
+        self.assertEqual(pendientes(), [trabajo_encolado.pk])
+
+        self.assertIsNone(ejecutar(trabajo_encolado.pk))
+        self.assertEqual(ejecutados, ['1.50'])
+        trabajo_encolado.refresh_from_db()
+        self.assertEqual(trabajo_encolado.estado, Trabajo.ESTADO_COMPLETADO)
+        self.assertEqual(trabajo_encolado.intentos, 1)
+        # Ya no se puede volver a tomar
+        self.assertIsNone(ejecutar(trabajo_encolado.pk))
+        self.assertEqual(len(ejecutados), 1)
+
+    def test_reintentos_sin_efectos_parciales(self):
+        trabajo_encolado = encolar('tests.fallar', {'username': 'fantasma'})
+
+        with self.assertLogs('core.trabajos', 'ERROR'):
+            self.assertEqual(ejecutar(trabajo_encolado.pk), 10)
+        trabajo_encolado.refresh_from_db()
+        self.assertEqual(trabajo_encolado.estado, Trabajo.ESTADO_PENDIENTE)
+        self.assertIn('sin conexión', trabajo_encolado.error)
+        self.assertFalse(Usuario.objects.filter(username='fantasma').exists())
+        # Espera antes del reintento
+        self.assertEqual(pendientes(), [])
+
+        Trabajo.objects.filter(pk=trabajo_encolado.pk).update(ejecutar_desde=trabajo_encolado.fecha_creacion)
+        with self.assertLogs('core.trabajos', 'ERROR'):
+            self.assertIsNone(ejecutar(trabajo_encolado.pk))
+        trabajo_encolado.refresh_from_db()
+        self.assertEqual(trabajo_encolado.estado, Trabajo.ESTADO_FALLIDO)
+        self.assertEqual(trabajo_encolado.intentos, 2)
+
+    def test_clave_de_idempotencia(self):
+        self.assertIsNotNone(encolar('tests.anotar', {'valor': 1}, clave_idempotencia='anotar:1'))
+        self.assertIsNone(encolar('tests.anotar', {'valor': 1}, clave_idempotencia='anotar:1'))
+        self.assertEqual(Trabajo.objects.filter(clave_idempotencia='anotar:1').count(), 1)
+
+        with self.settings(TRABAJOS_INMEDIATOS=True):
+            encolar('tests.anotar', {'valor': 2}, clave_idempotencia='anotar:2')
+            encolar('tests.anotar', {'valor': 2}, clave_idempotencia='anotar:2')
+        self.assertEqual(ejecutados, [2])
+
+    def test_registro_de_tarea_solo_inserta(self):
+        usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        tipo = TipoTarea.objects.create(
+            nombre='Reciclar', descripcion='Reciclar botellas',
+            co2_evitado_por_accion=Decimal('1.25'), puntos_otorgados=30
+        )
+        # SAVEPOINT, INSERT de la tarea, del movimiento y del trabajo, RELEASE
+        with self.assertNumQueries(5):
+            TareaRegistrada.objects.create(
+                usuario=usuario, tipo_tarea=tipo, fecha_realizacion=datetime.date.today()
+            )
+        usuario.refresh_from_db()
+        self.assertEqual(usuario.puntos_totales, 0)
+
+        self.assertIsNone(ejecutar(pendientes()[0]))
+        usuario.refresh_from_db()
+        self.assertEqual(usuario.puntos_totales, 30)
+        self.assertEqual(usuario.co2_total_evitado, Decimal('1.25'))
+
+
+class VistasAsyncTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        Usuario.objects.create(username='beto', email='beto@test.cl', puntos_totales=500)
+        tipo = TipoTarea.objects.create(
+            nombre='Reciclar', descripcion='Reciclar botellas', categoria=TipoTarea.CATEGORIA_RECICLAJE,
+            co2_evitado_por_accion=Decimal('1.25'), puntos_otorgados=30
+        )
+        for _ in range(3):
+            TareaRegistrada.objects.create(
+                usuario=self.usuario, tipo_tarea=tipo, fecha_realizacion=datetime.date.today()
+            )
+        logro = Logro.objects.create(nombre='Primer paso', descripcion='Primera tarea', icono='logros/hoja.png')
+        LogroUsuario.objects.get_or_create(usuario=self.usuario, logro=logro)
+
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {TokenUsuario.for_user(self.usuario).access_token}'
+        )
+
+    def test_misma_respuesta_que_las_vistas_drf(self):
+        pares = [
+            ('/api/usuarios/perfil/', '/api/usuarios/perfil-async/'),
+            ('/api/usuarios/perfil/?fields=id,tareas_completadas', '/api/usuarios/perfil-async/?fields=id,tareas_completadas'),
+            ('/api/tareas/estadisticas/', '/api/tareas/estadisticas-async/'),
+            ('/api/logros/mis-logros/', '/api/logros/mis-logros-async/'),
+            ('/api/tipos-tarea/?categoria=reciclaje', '/api/tipos-tarea-async/?categoria=reciclaje'),
+        ]
+        for sincrona, asincrona in pares:
+            with self.subTest(asincrona):
+                esperado = self.client.get(sincrona)
+                response = self.client.get(asincrona)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), esperado.json())
+        # Los íconos de mis logros mantienen la URL relativa
+        logros = self.client.get('/api/logros/mis-logros/').json()
+        self.assertEqual(logros[0]['logro_info']['icono'], '/media/logros/hoja.png')
+
+    def test_ranking_con_los_permisos_de_la_accion_drf(self):
+        self.assertEqual(self.client.get('/api/usuarios/ranking-async/').status_code, 403)
+
+        admin = Usuario.objects.create(username='admin', email='admin@test.cl', is_staff=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {TokenUsuario.for_user(admin).access_token}')
+        esperado = self.client.get('/api/usuarios/ranking/?limite=2').json()
+        response = self.client.get('/api/usuarios/ranking-async/?limite=2')
+        self.assertEqual(response.json(), esperado)
+        self.assertEqual(response.json()[0]['username'], 'beto')
+
+    def test_catalogo_responde_304(self):
+        response = self.client.get('/api/tipos-tarea-async/')
+        self.assertEqual(response.json()['count'], 1)
+        response = self.client.get('/api/tipos-tarea-async/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_requiere_token_valido(self):
+        self.client.credentials()
+        response = self.client.get('/api/tareas/estadisticas-async/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer basura')
+        response = self.client.get('/api/tareas/estadisticas-async/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'token_not_valid')
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {TokenUsuario.for_user(self.usuario).access_token}'
+        )
+        self.assertEqual(self.client.post('/api/tareas/estadisticas-async/').status_code, 405)
+
+
+class CanalEventosTests(TestCase):
+
+    @override_settings(EVENTOS_PENDIENTES_MAXIMO=3, EVENTOS_CONEXIONES_POR_USUARIO=1)
+    async def test_agrupa_por_clave_y_desborda(self):
+        canal = CanalEventos()
+        suscripcion = canal.suscribir(1, ['usuario:1'])
+        with self.assertRaises(ConexionesAgotadas):
+            canal.suscribir(1, ['usuario:1'])
+
+        for puntos in (10, 20, 30):
+            canal.difundir({'tema': 'usuario:1', 'tipo': 'puntos', 'clave': 'puntos', 'datos': puntos})
+        canal.difundir({'tema': 'usuario:2', 'tipo': 'puntos', 'clave': 'puntos', 'datos': 99})
+        eventos = await suscripcion.esperar(1)
+        self.assertEqual([evento['datos'] for evento in eventos], [30])
+        self.assertEqual(await suscripcion.esperar(0), [])
+
+        for logro_id in range(4):
+            canal.difundir({'tema': 'usuario:1', 'tipo': 'logro', 'clave': f'logro:{logro_id}', 'datos': logro_id})
+        await asyncio.sleep(0)
+        self.assertEqual(len(await suscripcion.esperar(1)), 3)
+        self.assertTrue(suscripcion.desbordada)
+
+        canal.cancelar(suscripcion)
+        self.assertEqual(canal.conexiones(), 0)
+
+    def test_escuchar_inicia_la_escucha_de_postgres(self):
+        iniciadas = []
+
+        class CanalPostgres(CanalEventos):
+            def _backend(self):
+                return 'postgres'
+
+            def _iniciar_escucha(self):
+                iniciadas.append(True)
+
+        # Sin suscripciones: los oyentes también reciben lo de otros procesos
+        CanalPostgres().escuchar('ranking', lambda evento: None)
+        self.assertEqual(iniciadas, [True])
+
+    def test_acumular_publica_puntos_y_ranking(self):
+        usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        recibidos = []
+        canal_eventos.escuchar(f'usuario:{usuario.pk}', recibidos.append)
+        canal_eventos.escuchar('ranking', recibidos.append)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                Usuario.objects.acumular(usuario.pk, puntos=150, co2=Decimal('2.5'))
+        finally:
+            canal_eventos._oyentes.pop(f'usuario:{usuario.pk}')
+            canal_eventos._oyentes['ranking'].remove(recibidos.append)
+
+        self.assertEqual([(evento['tema'], evento['datos']) for evento in recibidos], [
+            (f'usuario:{usuario.pk}', {'puntos_totales': 150, 'nivel': 2, 'co2_total_evitado': '2.50'}),
+            ('ranking', {'usuario_id': usuario.pk, 'puntos_totales': 150, 'activo': True}),
+        ])
+
+
+class DatosSinteticosTests(TestCase):
+
+    def tearDown(self):
+        # El índice en memoria reconstruido aquí tendría usuarios ya revertidos
+        invalidar_ranking()
+
+    def test_genera_datos_coherentes_y_reproducibles(self):
+        totales = generar_datos(usuarios=30, tareas=400, grupos=3, logros=4, tamano_lote=100)
+        self.assertEqual(totales['usuarios'], 30)
+        self.assertEqual(TareaRegistrada.objects.count(), 400)
+        self.assertEqual(Grupo.objects.count(), 3)
+        self.assertGreater(totales['logros_otorgados'], 0)
+        # Una sola contraseña hasheada para todos
+        self.assertEqual(Usuario.objects.values('password').distinct().count(), 1)
+        # Los derivados coinciden con las tareas y los grupos con sus miembros
+        call_command('verificar_saldos', stdout=io.StringIO())
+        salida = io.StringIO()
+        call_command('reconciliar_grupos', '--dry-run', stdout=salida)
+        self.assertIn('0 grupos desviados', salida.getvalue())
+
+        primeras = list(TareaRegistrada.objects.order_by('pk').values_list(
+            'usuario__username', 'tipo_tarea__nombre', 'fecha_realizacion'
+        )[:50])
+        TareaRegistrada.objects.all().delete()
+        Usuario.objects.all().delete()
+        generar_datos(usuarios=30, tareas=400, grupos=0, logros=0, tamano_lote=100)
+        self.assertEqual(list(TareaRegistrada.objects.order_by('pk').values_list(
+            'usuario__username', 'tipo_tarea__nombre', 'fecha_realizacion'
+        )[:50]), primeras)
+
+    def test_comando_requiere_debug(self):
+        with self.assertRaises(CommandError):
+            call_command('generar_datos', '--usuarios', '1', '--tareas', '1', stdout=io.StringIO())
+
+
+@override_settings(MEDICION_MUESTREO=1)
+class MedicionTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        tipo = TipoTarea.objects.create(
+            nombre='Reciclar', descripcion='Reciclar botellas', categoria=TipoTarea.CATEGORIA_RECICLAJE,
+            co2_evitado_por_accion=Decimal('1.25'), puntos_otorgados=30
+        )
+        TareaRegistrada.objects.create(usuario=self.usuario, tipo_tarea=tipo, fecha_realizacion=datetime.date.today())
+        self.encabezado = f'Bearer {TokenUsuario.for_user(self.usuario).access_token}'
+
+    def test_server_timing_y_log_por_accion(self):
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=self.encabezado)
+        with self.assertLogs('core.medicion') as logs, CaptureQueriesContext(connection) as consultas:
+            response = cliente.get('/api/tareas/')
+        self.assertEqual(response.status_code, 200)
+        metricas = [metrica.split(';')[0] for metrica in response['Server-Timing'].split(', ')]
+        self.assertEqual(metricas, ['db', 'serializacion', 'autenticacion', 'total'])
+        self.assertIn(f'desc="{len(consultas)} consultas"', response['Server-Timing'])
+
+        medicion = logs.records[0].medicion
+        self.assertEqual((medicion['vista'], medicion['accion']), ('TareaRegistradaViewSet', 'list'))
+        self.assertEqual(medicion['consultas'], len(consultas))
+        self.assertGreater(medicion['serializacion_ms'], 0)
+        self.assertGreater(medicion['autenticacion_ms'], 0)
+
+    async def test_vistas_async(self):
+        response = await AsyncClient().get('/api/usuarios/perfil-async/', headers={'Authorization': self.encabezado})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('autenticacion;dur=', response['Server-Timing'])
+
+    def test_sin_muestreo(self):
+        with self.settings(MEDICION_MUESTREO=0):
+            response = self.client.get('/api/tipos-tarea/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+def valores_prometheus(texto):
+    """
+    {serie: valor} de un texto en formato Prometheus.
+    """
+    return {
+        serie: float(valor)
+        for serie, valor in (linea.rsplit(' ', 1) for linea in texto.splitlines() if not linea.startswith('#'))
+    }
+
+
+@override_settings(METRICAS_TOKEN='secreto')
+class MetricasTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        self.tipo = TipoTarea.objects.create(
+            nombre='Reciclar', descripcion='Reciclar botellas', categoria=TipoTarea.CATEGORIA_RECICLAJE,
+            co2_evitado_por_accion=Decimal('1.25'), puntos_otorgados=30
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {TokenUsuario.for_user(self.usuario).access_token}')
+
+    def metricas(self):
+        response = APIClient().get('/api/metricas/', headers={'Authorization': 'Bearer secreto'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return valores_prometheus(response.content.decode())
+
+    def test_metricas_por_accion_y_de_negocio(self):
+        antes = self.metricas()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/tareas/', {
+                'tipo_tarea': self.tipo.pk, 'fecha_realizacion': str(datetime.date.today())
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get('/api/usuarios/ranking/').status_code, 403)
+        despues = self.metricas()
+
+        def cambio(serie):
+            return despues.get(serie, 0) - antes.get(serie, 0)
+
+        self.assertEqual(cambio('ecopoints_peticiones_total{accion="tarea-create",estado="2xx"}'), 1)
+        self.assertEqual(cambio('ecopoints_peticiones_total{accion="usuario-ranking",estado="4xx"}'), 1)
+        self.assertEqual(cambio('ecopoints_latencia_segundos_count{accion="tarea-create"}'), 1)
+        self.assertEqual(cambio('ecopoints_latencia_segundos_bucket{accion="tarea-create",le="+Inf"}'), 1)
+        self.assertGreater(cambio('ecopoints_consultas_db_total{accion="tarea-create"}'), 0)
+        self.assertEqual(cambio('ecopoints_tareas_registradas_total{origen="individual"}'), 1)
+        self.assertEqual(cambio('ecopoints_puntos_otorgados_total'), 30)
+
+    def test_requiere_token(self):
+        self.assertEqual(APIClient().get('/api/metricas/').status_code, 403)
+        with self.settings(METRICAS_TOKEN=''):
+            self.assertEqual(APIClient().get('/api/metricas/').status_code, 404)
+
+    def test_suma_los_procesos_del_host(self):
+        serie = ('ecopoints_tareas_registradas_total', (('origen', 'lote'),))
+        with tempfile.TemporaryDirectory() as directorio, self.settings(METRICAS_DIRECTORIO=directorio):
+            registro_metricas.sumar('ecopoints_tareas_registradas_total', 2, origen='lote')
+            propias = combinar([registro_metricas.instantanea()])[0][serie]
+            # Otro worker (vivo), y un archivo ilegible que se ignora
+            otro = os.getppid()
+            with open(f'{directorio}/metricas-{otro}-otro.json', 'w') as archivo:
+                json.dump({
+                    'contadores': [['ecopoints_tareas_registradas_total', [['origen', 'lote']], 3]],
+                    'histogramas': [['ecopoints_latencia_segundos', [['accion', 'otra']], [1] + [0] * 11 + [0.002]]],
+                }, archivo)
+            with open(f'{directorio}/metricas-{otro}-roto.json', 'w') as archivo:
+                archivo.write('{"contadores": [')
+
+            texto = texto_prometheus(instantaneas_del_host())
+            self.assertIn(registro_metricas._nombre_archivo, os.listdir(directorio))
+
+        valores = valores_prometheus(texto)
+        self.assertEqual(valores['ecopoints_tareas_registradas_total{origen="lote"}'], propias + 3)
+        self.assertEqual(valores['ecopoints_latencia_segundos_bucket{accion="otra",le="0.005"}'], 1)
+        self.assertEqual(valores['ecopoints_latencia_segundos_bucket{accion="otra",le="+Inf"}'], 1)
+        self.assertEqual(valores['ecopoints_latencia_segundos_sum{accion="otra"}'], 0.002)
+
+    @unittest.skipUnless(os.name == 'posix', "Los procesos terminados solo se reconocen en POSIX")
+    def test_hereda_los_archivos_de_procesos_terminados(self):
+        serie = 'ecopoints_tareas_registradas_total{origen="reciclado"}'
+        terminado = subprocess.Popen([sys.executable, '-c', ''])
+        terminado.wait()
+        with tempfile.TemporaryDirectory() as directorio, self.settings(METRICAS_DIRECTORIO=directorio):
+            antes = valores_prometheus(texto_prometheus(instantaneas_del_host())).get(serie, 0)
+            with open(f'{directorio}/metricas-{terminado.pid}-viejo.json', 'w') as archivo:
+                json.dump({
+                    'contadores': [['ecopoints_tareas_registradas_total', [['origen', 'reciclado']], 4]],
+                    'histogramas': [],
+                }, archivo)
+            open(f'{directorio}/metricas-{terminado.pid}-viejo.json.a1b2.tmp', 'w').close()
+
+            valores = valores_prometheus(texto_prometheus(instantaneas_del_host()))
+            # Sumado una sola vez, ahora en el archivo de este proceso
+            self.assertEqual(valores[serie], antes + 4)
+            self.assertEqual(os.listdir(directorio), [registro_metricas._nombre_archivo])
+            valores = valores_prometheus(texto_prometheus(instantaneas_del_host()))
+            self.assertEqual(valores[serie], antes + 4)
+
+    def test_escrituras_concurrentes(self):
+        errores = []
+
+        def escribir():
+            try:
+                for _ in range(50):
+                    registro_metricas.sumar('ecopoints_errores_total', accion='concurrente')
+                    registro_metricas.guardar()
+            except Exception as exc:
+                errores.append(exc)
+
+        with tempfile.TemporaryDirectory() as directorio, self.settings(METRICAS_DIRECTORIO=directorio):
+            hilos = [threading.Thread(target=escribir) for _ in range(4)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            self.assertEqual(errores, [])
+            self.assertEqual(os.listdir(directorio), [registro_metricas._nombre_archivo])
+
+
+# Acciones estándar de un ViewSet y su método HTTP
+ACCIONES_ESTANDAR = {
+    'list': 'get', 'create': 'post', 'retrieve': 'get',
+    'update': 'put', 'partial_update': 'patch', 'destroy': 'delete',
+}
+
+# Máximo de consultas por acción del router: (basename, acción, método) ->
+# (presupuesto, como administrador, query string, datos). Los datos son una
+# función del test para usar los ids de sus objetos. Toda acción nueva del
+# router necesita su fila (ver test_todas_las_acciones_tienen_presupuesto).
+PRESUPUESTO_CONSULTAS = {
+    ('usuario', 'list', 'get'): (2, True, '', None),
+    ('usuario', 'create', 'post'): (2, True, '', lambda t: {
+        'username': 'nuevo', 'email': 'nuevo@test.cl'
+    }),
+    ('usuario', 'retrieve', 'get'): (1, True, '', None),
+    ('usuario', 'update', 'put'): (3, True, '', lambda t: {
+        'username': 'otro', 'email': 'otro@test.cl', 'first_name': 'Otro'
+    }),
+    ('usuario', 'partial_update', 'patch'): (2, True, '', lambda t: {'first_name': 'Otro'}),
+    ('usuario', 'destroy', 'delete'): (12, True, '', None),
+    ('usuario', 'registro', 'post'): (4, False, '', lambda t: {
+        'username': 'nueva', 'email': 'nueva@test.cl',
+        'password': 'Ecopoints.2025', 'password2': 'Ecopoints.2025'
+    }),
+    ('usuario', 'login', 'post'): (1, False, '', lambda t: {
+        'email': 'ana@test.cl', 'password': 'Ecopoints.2025'
+    }),
+    ('usuario', 'perfil', 'get'): (3, False, '', None),
+    ('usuario', 'update_perfil', 'put'): (5, False, '', lambda t: {'first_name': 'Ana'}),
+    ('usuario', 'update_perfil', 'patch'): (5, False, '', lambda t: {'telefono': '+56911111111'}),
+    ('usuario', 'ranking', 'get'): (1, True, '?limite=50', None),
+    ('usuario', 'mi_posicion', 'get'): (1, False, '', None),
+    ('tipotarea', 'list', 'get'): (0, False, '', None),
+    ('tipotarea', 'retrieve', 'get'): (1, False, '', None),
+    ('tarea', 'list', 'get'): (2, False, '', None),
+    ('tarea', 'create', 'post'): (10, False, '', lambda t: {
+        'tipo_tarea': t.tipo.pk, 'fecha_realizacion': str(timezone.localdate())
+    }),
+    ('tarea', 'retrieve', 'get'): (1, False, '', None),
+    ('tarea', 'update', 'put'): (7, False, '', lambda t: {
+        'usuario': t.usuario.pk, 'tipo_tarea': t.tipo.pk,
+        'fecha_realizacion': str(timezone.localdate()), 'notas': 'Editada'
+    }),
+    ('tarea', 'partial_update', 'patch'): (5, False, '', lambda t: {'notas': 'Editada'}),
+    ('tarea', 'destroy', 'delete'): (9, False, '', None),
+    ('tarea', 'lote', 'post'): (10, False, '', lambda t: {'tareas': [
+        {'tipo_tarea': t.tipo.pk, 'fecha_realizacion': str(timezone.localdate())}
+        for _ in range(5)
+    ]}),
+    ('tarea', 'estadisticas', 'get'): (3, False, '', None),
+    ('tarea', 'serie', 'get'): (1, False, '?agrupacion=mes', None),
+    ('tarea', 'exportar', 'get'): (1, False, '?formato=csv', None),
+    ('logro', 'list', 'get'): (2, False, '', None),
+    ('logro', 'retrieve', 'get'): (1, False, '', None),
+    ('logro', 'mis_logros', 'get'): (1, False, '', None),
+    ('grupo', 'list', 'get'): (2, False, '', None),
+    ('grupo', 'create', 'post'): (6, False, '', lambda t: {
+        'nombre': 'Bicicleteros', 'descripcion': 'Al trabajo en bicicleta'
+    }),
+    ('grupo', 'retrieve', 'get'): (1, False, '', None),
+    ('grupo', 'update', 'put'): (3, False, '', lambda t: {
+        'nombre': 'Huerto comunitario', 'descripcion': 'Compostaje y huerto'
+    }),
+    ('grupo', 'partial_update', 'patch'): (2, False, '', lambda t: {'publico': False}),
+    ('grupo', 'destroy', 'delete'): (5, False, '', None),
+    ('grupo', 'unirse', 'post'): (4, False, '', None),
+    ('grupo', 'salir', 'post'): (4, False, '', None),
+}
+
+
+def acciones_del_router():
+    """
+    (basename, acción, método) de cada acción registrada en el router,
+    incluidas las @action.
+    """
+    acciones = set()
+    for prefijo, viewset, basename in router.registry:
+        for accion, metodo in ACCIONES_ESTANDAR.items():
+            if hasattr(viewset, accion):
+                acciones.add((basename, accion, metodo))
+        for extra in viewset.get_extra_actions():
+            acciones.update((basename, extra.__name__, metodo) for metodo in extra.mapping)
+    return acciones
+
+
+def normalizar_sql(sql):
+    """
+    La consulta sin sus parámetros, para agrupar las que solo difieren en ellos.
+    """
+    sql = re.sub(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b", '?', sql)
+    return re.sub(r'\((?:\?, )+\?\)', '(...)', sql)
+
+
+class PresupuestoConsultasTests(TestCase):
+    """
+    Cada acción del router con datos chicos y con datos grandes: la cantidad
+    de consultas no puede pasar de su presupuesto ni crecer con las filas.
+    """
+    CANTIDADES = (3, 12)
+
+    def setUp(self):
+        self.admin = Usuario.objects.create(username='admin', email='admin@test.cl', is_staff=True)
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        self.usuario.set_password('Ecopoints.2025')
+        self.usuario.save()
+        self.otro = Usuario.objects.create(username='otro', email='otro@test.cl')
+        self.grupo_propio = Grupo.objects.create(nombre='Huerto', descripcion='Compostaje', creador=self.usuario)
+        MiembroGrupo.objects.create(usuario=self.usuario, grupo=self.grupo_propio, es_admin=True)
+        self.grupo_ajeno = Grupo.objects.create(nombre='Ciclistas', descripcion='En bicicleta', creador=self.otro)
+        self.logros = 0
+
+        self.clientes = {}
+        for es_admin, usuario in ((False, self.usuario), (True, self.admin)):
+            self.clientes[es_admin] = APIClient()
+            self.clientes[es_admin].credentials(
+                HTTP_AUTHORIZATION=f'Bearer {TokenUsuario.for_user(usuario).access_token}'
+            )
+
+    def tearDown(self):
+        invalidar_ranking()
+
+    def crecer(self, cantidad):
+        """
+        Agregar `cantidad` usuarios, grupos y logros (y cinco tareas por
+        usuario) a los datos, con tareas, grupos y logros para ana.
+        """
+        generar_datos(usuarios=cantidad, tareas=cantidad * 5, grupos=cantidad, logros=0, semilla=cantidad)
+        tipos = list(TipoTarea.objects.order_by('pk'))
+        hoy = timezone.localdate()
+        TareaRegistrada.objects.registrar_lote([
+            TareaRegistrada(
+                usuario=self.usuario, tipo_tarea=tipos[i % len(tipos)],
+                fecha_realizacion=hoy - datetime.timedelta(days=i)
+            )
+            for i in range(cantidad * 2)
+        ])
+        for grupo in Grupo.objects.order_by('-pk')[:cantidad]:
+            MiembroGrupo.objects.create(usuario=self.usuario, grupo=grupo)
+        logros = Logro.objects.bulk_create([
+            Logro(nombre=f'Logro {self.logros + i}', descripcion='Logro de prueba')
+            for i in range(cantidad)
+        ])
+        LogroUsuario.objects.bulk_create([LogroUsuario(usuario=self.usuario, logro=logro) for logro in logros])
+        self.logros += cantidad
+        invalidar_logros()
+        invalidar_ranking()
+
+        self.tipo = tipos[0]
+        self.detalle = {
+            'usuario': self.otro.pk,
+            'tipotarea': self.tipo.pk,
+            'tarea': TareaRegistrada.objects.filter(usuario=self.usuario).order_by('pk').first().pk,
+            'logro': Logro.objects.order_by('pk').first().pk,
+            'grupo': self.grupo_propio.pk,
+            ('grupo', 'unirse'): self.grupo_ajeno.pk,
+        }
+
+    def ruta(self, basename, accion):
+        if accion in ('list', 'create'):
+            return reverse(f'{basename}-list')
+        pk = self.detalle.get((basename, accion), self.detalle[basename])
+        if accion in ACCIONES_ESTANDAR:
+            return reverse(f'{basename}-detail', args=[pk])
+        viewset = next(viewset for prefijo, viewset, nombre in router.registry if nombre == basename)
+        extra = next(extra for extra in viewset.get_extra_actions() if extra.__name__ == accion)
+        return reverse(f'{basename}-{extra.url_name}', args=[pk] if extra.detail else [])
+
+    def medir(self, clave):
+        """
+        Consultas de la acción, ya con las cachés llenas. Cada petición se
+        revierte para que las que escriben no cambien los datos.
+        """
+        basename, accion, metodo = clave
+        presupuesto, es_admin, query, datos = PRESUPUESTO_CONSULTAS[clave]
+        ruta = self.ruta(basename, accion) + query
+        for _ in range(2):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as consultas:
+                    response = getattr(self.clientes[es_admin], metodo)(
+                        ruta, datos(self) if datos else None, format='json'
+                    )
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                transaction.set_rollback(True)
+        return ruta, response.status_code, [consulta['sql'] for consulta in consultas.captured_queries]
+
+    def test_todas_las_acciones_tienen_presupuesto(self):
+        self.assertEqual(set(PRESUPUESTO_CONSULTAS), acciones_del_router())
+
+    def test_consultas_dentro_del_presupuesto_y_constantes(self):
+        medidas = {clave: [] for clave in PRESUPUESTO_CONSULTAS}
+        for cantidad in self.CANTIDADES:
+            self.crecer(cantidad)
+            for clave in medidas:
+                medidas[clave].append(self.medir(clave))
+
+        fallas = []
+        for clave, ((ruta, codigo_chico, chicas), (_, codigo, grandes)) in medidas.items():
+            presupuesto = PRESUPUESTO_CONSULTAS[clave][0]
+            if codigo >= 400 or codigo_chico >= 400:
+                fallas.append(f"{' '.join(clave)} {ruta}: respondió {codigo_chico} y {codigo}")
+            elif len(grandes) > presupuesto or len(grandes) > len(chicas):
+                fallas.append(self.reporte(clave, ruta, presupuesto, chicas, grandes))
+        if fallas:
+            self.fail('\n\n' + '\n\n'.join(fallas))
+
+    def reporte(self, clave, ruta, presupuesto, chicas, grandes):
+        """
+        Las consultas de la acción agrupadas por SQL normalizado, con cuántas
+        veces se ejecutó cada una con los datos chicos y con los grandes.
+        """
+        antes, despues = Counter(map(normalizar_sql, chicas)), Counter(map(normalizar_sql, grandes))
+        lineas = [
+            f"{' '.join(clave)} {ruta}: {len(chicas)} consultas con {self.CANTIDADES[0]} filas, "
+            f"{len(grandes)} con {self.CANTIDADES[1]} (presupuesto {presupuesto})"
+        ]
+        for sql, veces in despues.most_common():
+            marca = '+' if veces > antes[sql] else ' '
+            lineas.append(f"  {marca} {antes[sql]:>3} -> {veces:<3} {sql[:300]}")
+        return '\n'.join(lineas)
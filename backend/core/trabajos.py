@@ -0,0 +1,238 @@
+# backend/core/trabajos.py
+
+"""
+Trabajos en segundo plano sin broker externo.
+
+Cada trabajo es una fila de `Trabajo` que se inserta en la misma
+transacción que los datos que lo originan. Cuando la transacción se
+confirma, el trabajo se entrega a un pool de hilos del propio proceso y la
+petición responde sin esperarlo. `manage.py trabajos_worker` ejecuta en
+otro proceso los que queden pendientes (reintentos, procesos que murieron
+o todos, si TRABAJOS_HILOS = 0).
+
+- `@trabajo('app.nombre')` registra una función; sus argumentos con nombre
+  deben poder guardarse como JSON (Decimal y date llegan como texto).
+- `encolar('app.nombre', {...}, clave_idempotencia=None)` la encola. Con
+  una clave, encolar dos veces crea un solo trabajo.
+- Si la función lanza una excepción, el trabajo vuelve a quedar pendiente
+  con una espera exponencial, hasta `max_intentos`; luego queda fallido.
+- Con TRABAJOS_INMEDIATOS (activo en los tests) la función se ejecuta al
+  encolar, dentro de la transacción actual.
+
+La función y la marca de completado van en la misma transacción: un
+trabajo que falla no deja efectos a medias y uno completado no se repite.
+Un trabajo en curso por más de TRABAJOS_TIEMPO_MAXIMO segundos (p. ej. si
+su proceso terminó) puede tomarlo otro trabajador.
+"""
+
+import json
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# nombre -> (función, max_intentos)
+_registro = {}
+
+
+class TrabajoDesconocido(Exception):
+    """
+    No hay una función registrada con ese nombre.
+    """
+
+
+class _TrabajoRetomado(Exception):
+    """
+    Otro trabajador retomó el trabajo mientras este lo ejecutaba.
+    """
+
+
+def trabajo(nombre, max_intentos=5):
+    """
+    Decorador que registra una función como trabajo con ese nombre.
+    """
+    def registrar(funcion):
+        _registro[nombre] = (funcion, max_intentos)
+        return funcion
+    return registrar
+
+
+def _como_json(argumentos):
+    # Los mismos tipos que recibirá la función al leerlos de la base de datos
+    return json.loads(json.dumps(argumentos, cls=DjangoJSONEncoder))
+
+
+def encolar(nombre, argumentos=None, clave_idempotencia=None):
+    """
+    Encola el trabajo `nombre` y retorna su Trabajo, o None si ya existía
+    uno con la misma clave de idempotencia.
+    """
+    from .models import Trabajo
+
+    if nombre not in _registro:
+        raise TrabajoDesconocido(nombre)
+    funcion, max_intentos = _registro[nombre]
+    trabajo = Trabajo(
+        nombre=nombre, argumentos=argumentos or {},
+        clave_idempotencia=clave_idempotencia, max_intentos=max_intentos
+    )
+
+    if settings.TRABAJOS_INMEDIATOS:
+        trabajo.estado = Trabajo.ESTADO_COMPLETADO
+        trabajo.intentos = 1
+        # Sin clave no hace falta recordar el trabajo
+        if clave_idempotencia is not None and not _insertar(trabajo):
+            return None
+        funcion(**_como_json(trabajo.argumentos))
+        return trabajo
+
+    if not _insertar(trabajo):
+        return None
+    transaction.on_commit(lambda: trabajador.despachar(trabajo.pk))
+    return trabajo
+
+
+def _insertar(trabajo):
+    if trabajo.clave_idempotencia is None:
+        trabajo.save()
+        return True
+    try:
+        with transaction.atomic():
+            trabajo.save()
+    except IntegrityError:
+        return False
+    return True
+
+
+def _por_ejecutar(ahora):
+    from .models import Trabajo
+
+    vencido = ahora - timedelta(seconds=settings.TRABAJOS_TIEMPO_MAXIMO)
+    return Q(ejecutar_desde__lte=ahora) & (
+        Q(estado=Trabajo.ESTADO_PENDIENTE)
+        | Q(estado=Trabajo.ESTADO_EN_CURSO, tomado_en__lt=vencido)
+    )
+
+
+def pendientes(limite=100):
+    """
+    Ids de los trabajos que ya se pueden ejecutar, en orden de llegada.
+    """
+    from .models import Trabajo
+
+    return list(
+        Trabajo.objects.filter(_por_ejecutar(timezone.now()))
+        .order_by('ejecutar_desde', 'id')
+        .values_list('id', flat=True)[:limite]
+    )
+
+
+def ejecutar(trabajo_id):
+    """
+    Toma el trabajo (si nadie más lo tiene) y lo ejecuta. Retorna los
+    segundos de espera antes de reintentarlo, o None si no hay que hacerlo.
+    """
+    from .models import Trabajo
+
+    ahora = timezone.now()
+    # Tomarlo con un UPDATE condicional: solo un trabajador lo consigue
+    tomado = Trabajo.objects.filter(_por_ejecutar(ahora), pk=trabajo_id).update(
+        estado=Trabajo.ESTADO_EN_CURSO, tomado_en=ahora,
+        intentos=F('intentos') + 1, ultima_actualizacion=ahora
+    )
+    if not tomado:
+        return None
+
+    trabajo = Trabajo.objects.get(pk=trabajo_id)
+    propio = Trabajo.objects.filter(pk=trabajo_id, estado=Trabajo.ESTADO_EN_CURSO, tomado_en=ahora)
+    try:
+        if trabajo.nombre not in _registro:
+            raise TrabajoDesconocido(trabajo.nombre)
+        funcion, _ = _registro[trabajo.nombre]
+        with transaction.atomic():
+            funcion(**trabajo.argumentos)
+            if not propio.update(
+                estado=Trabajo.ESTADO_COMPLETADO, error='', ultima_actualizacion=timezone.now()
+            ):
+                raise _TrabajoRetomado
+    except _TrabajoRetomado:
+        logger.warning("El trabajo %s fue retomado por otro trabajador", trabajo)
+        return None
+    except Exception:
+        logger.exception("Falló el trabajo %s (intento %s)", trabajo, trabajo.intentos)
+        error = traceback.format_exc()
+        if trabajo.intentos >= trabajo.max_intentos:
+            propio.update(
+                estado=Trabajo.ESTADO_FALLIDO, error=error, ultima_actualizacion=timezone.now()
+            )
+            return None
+        espera = settings.TRABAJOS_REINTENTO_SEGUNDOS * 2 ** (trabajo.intentos - 1)
+        propio.update(
+            estado=Trabajo.ESTADO_PENDIENTE, error=error,
+            ejecutar_desde=timezone.now() + timedelta(seconds=espera),
+            ultima_actualizacion=timezone.now()
+        )
+        return espera
+    return None
+
+
+class Trabajador:
+    """
+    Pool de hilos que ejecuta trabajos. Con `reprogramar`, los reintentos
+    se vuelven a despachar en este mismo proceso al cumplirse su espera.
+    """
+
+    def __init__(self, hilos=None, reprogramar=True):
+        self.hilos = hilos
+        self.reprogramar = reprogramar
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _ejecutor(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    hilos = self.hilos if self.hilos is not None else settings.TRABAJOS_HILOS
+                    self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='trabajos')
+        return self._pool
+
+    def despachar(self, trabajo_id, espera=0):
+        """
+        Ejecutar el trabajo en el pool. Sin hilos configurados queda para
+        `trabajos_worker`.
+        """
+        if self.hilos is None and settings.TRABAJOS_HILOS <= 0:
+            return None
+        if espera > 0:
+            temporizador = threading.Timer(espera, self.despachar, [trabajo_id])
+            temporizador.daemon = True
+            temporizador.start()
+            return None
+        return self._ejecutor().submit(self._ejecutar_en_hilo, trabajo_id)
+
+    def _ejecutar_en_hilo(self, trabajo_id):
+        close_old_connections()
+        try:
+            espera = ejecutar(trabajo_id)
+        finally:
+            close_old_connections()
+        if espera is not None and self.reprogramar:
+            self.despachar(trabajo_id, espera)
+
+    def cerrar(self, esperar=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=esperar)
+            self._pool = None
+
+
+# Pool del proceso web (TRABAJOS_HILOS hilos, creado al primer trabajo)
+trabajador = Trabajador()
@@ -2,9 +2,10 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from usuarios.views import UsuarioViewSet
-from tareas.views import TipoTareaViewSet, TareaRegistradaViewSet
-from gamificacion.views import LogroViewSet, GrupoViewSet
+from usuarios.views import UsuarioViewSet, eventos_async, login_async, perfil_async, ranking_async
+from tareas.views import TipoTareaViewSet, TareaRegistradaViewSet, estadisticas_async, tipos_tarea_async
+from gamificacion.views import LogroViewSet, GrupoViewSet, mis_logros_async
+from core.metricas import metricas_vista
 
 # Crear router para registrar ViewSets
 router = DefaultRouter()
@@ -17,5 +18,17 @@ router.register(r'logros', LogroViewSet, basename='logro')
 router.register(r'grupos', GrupoViewSet, basename='grupo')
 
 urlpatterns = [
+    # Login asíncrono (HU02), fuera del router porque no es una vista DRF
+    path('usuarios/login-async/', login_async, name='usuario-login-async'),
+    # Lecturas async para despliegues ASGI (ver core.asincrono)
+    path('usuarios/perfil-async/', perfil_async, name='usuario-perfil-async'),
+    path('usuarios/ranking-async/', ranking_async, name='usuario-ranking-async'),
+    path('tipos-tarea-async/', tipos_tarea_async, name='tipotarea-list-async'),
+    path('tareas/estadisticas-async/', estadisticas_async, name='tarea-estadisticas-async'),
+    path('logros/mis-logros-async/', mis_logros_async, name='logro-mis-logros-async'),
+    # Eventos en vivo (Server-Sent Events, ver core.eventos)
+    path('usuarios/eventos/', eventos_async, name='usuario-eventos'),
+    # Métricas en formato Prometheus (ver core.metricas)
+    path('metricas/', metricas_vista, name='metricas'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que su tiempo total cubra todo lo demás (ver core.medicion)
+    'core.medicion.MedicionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -97,6 +99,19 @@ elif DATABASE_URL.startswith('postgres'):
         )
     }
 
+# Cache con las versiones que invalidan las copias en memoria de cada proceso
+# (catálogo de tipos, logros, ranking, usuarios autenticados). El de memoria
+# local solo invalida el proceso que hace el cambio (los demás recargan al
+# vencer CATALOGO_MAX_EDAD, LOGROS_MAX_EDAD, RANKING_MAX_EDAD, ...). Con varios
+# workers o comandos de manage.py en producción, usar uno compartido, p. ej.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache y CACHE_LOCATION=redis://...
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -134,15 +149,28 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Configuración de REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'usuarios.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # JSON con orjson si está instalado (ver core.renderers)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.JSONRapidoRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.JSONRapidoParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# La API navegable de DRF solo se ofrece en desarrollo, salvo que se pida explícitamente
+if os.getenv('API_NAVEGABLE', str(DEBUG)) == 'True':
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('rest_framework.renderers.BrowsableAPIRenderer')
+
 # Configuración de JWT
 JWT_ACCESS_HOURS = int(os.getenv('JWT_ACCESS_TOKEN_LIFETIME_HOURS', 1))
 JWT_REFRESH_DAYS = int(os.getenv('JWT_REFRESH_TOKEN_LIFETIME_DAYS', 7))
@@ -154,6 +182,81 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Usuarios autenticados por JWT: segundos que cada proceso reutiliza su copia
+# en memoria de un usuario y máximo de usuarios guardados (ver usuarios.authentication)
+JWT_USUARIO_CACHE_SEGUNDOS = int(os.getenv('JWT_USUARIO_CACHE_SEGUNDOS', 30))
+JWT_USUARIOS_EN_MEMORIA = int(os.getenv('JWT_USUARIOS_EN_MEMORIA', 10000))
+
+# Configuración del ranking (HU07)
+# Segundos antes de que cada proceso reconstruya su índice del ranking desde la BD
+RANKING_MAX_EDAD = int(os.getenv('RANKING_MAX_EDAD_SEGUNDOS', 300))
+RANKING_LIMITE_MAXIMO = 500
+RANKING_VECINOS_MAXIMO = 50
+
+# Segundos antes de que cada proceso recargue su catálogo de tipos de tarea
+# aunque no se haya invalidado (ver tareas.catalogo)
+CATALOGO_MAX_EDAD = int(os.getenv('CATALOGO_MAX_EDAD_SEGUNDOS', 60))
+
+# Segundos antes de que cada proceso reconstruya su índice de logros aunque
+# no se haya invalidado (ver gamificacion.logros)
+LOGROS_MAX_EDAD = int(os.getenv('LOGROS_MAX_EDAD_SEGUNDOS', 60))
+
+# Máximo de tareas aceptadas por POST /api/tareas/lote/
+TAREAS_LOTE_MAXIMO = int(os.getenv('TAREAS_LOTE_MAXIMO', 500))
+
+# Filas leídas por consulta (y enviadas por bloque) al exportar el
+# historial en CSV o NDJSON (ver tareas.exportacion)
+EXPORTACION_TAMANO_LOTE = int(os.getenv('EXPORTACION_TAMANO_LOTE', 2000))
+
+# Autenticación por email o username con una sola consulta (HU02)
+AUTHENTICATION_BACKENDS = ['usuarios.backends.EmailOUsuarioBackend']
+
+# Login asíncrono: hilos que verifican contraseñas y máximo de
+# verificaciones en curso o en espera antes de responder 503
+LOGIN_HASH_HILOS = int(os.getenv('LOGIN_HASH_HILOS', os.cpu_count() or 2))
+LOGIN_HASH_COLA_MAXIMA = int(os.getenv('LOGIN_HASH_COLA_MAXIMA', 64))
+
+# Trabajos en segundo plano (ver core.trabajos): hilos del proceso web que
+# los ejecutan (0 = solo `manage.py trabajos_worker`), segundos antes de que
+# otro trabajador retome uno en curso y espera base entre reintentos
+TRABAJOS_HILOS = int(os.getenv('TRABAJOS_HILOS', 2))
+TRABAJOS_TIEMPO_MAXIMO = int(os.getenv('TRABAJOS_TIEMPO_MAXIMO_SEGUNDOS', 300))
+TRABAJOS_REINTENTO_SEGUNDOS = int(os.getenv('TRABAJOS_REINTENTO_SEGUNDOS', 10))
+# Ejecutar los trabajos al encolarlos, dentro de la misma transacción
+# (el runner de tests lo activa)
+TRABAJOS_INMEDIATOS = os.getenv('TRABAJOS_INMEDIATOS', 'False') == 'True'
+TEST_RUNNER = 'core.test_runner.EcoPointsTestRunner'
+
+# Eventos en vivo (GET /api/usuarios/eventos/, ver core.eventos). Con
+# PostgreSQL se reparten entre procesos con NOTIFY/LISTEN ('postgres');
+# con 'local' (o SQLite) solo llegan a los streams del mismo proceso
+EVENTOS_BACKEND = os.getenv('EVENTOS_BACKEND', 'postgres')
+# Streams abiertos por proceso y por usuario, y eventos pendientes por stream
+EVENTOS_CONEXIONES_MAXIMAS = int(os.getenv('EVENTOS_CONEXIONES_MAXIMAS', 1000))
+EVENTOS_CONEXIONES_POR_USUARIO = int(os.getenv('EVENTOS_CONEXIONES_POR_USUARIO', 3))
+EVENTOS_PENDIENTES_MAXIMO = 100
+# Segundos entre latidos, antes de cerrar el stream (el cliente se reconecta)
+# y mínimos entre dos envíos del top del ranking
+EVENTOS_LATIDO_SEGUNDOS = 15
+EVENTOS_DURACION_MAXIMA = int(os.getenv('EVENTOS_DURACION_MAXIMA_SEGUNDOS', 300))
+EVENTOS_RANKING_INTERVALO = float(os.getenv('EVENTOS_RANKING_INTERVALO_SEGUNDOS', 2))
+EVENTOS_RANKING_TOP = 10
+
+# Medición por petición (ver core.medicion): fracción de las peticiones
+# que responden el encabezado Server-Timing y se registran en el logger
+# core.medicion (0 = ninguna, 1 = todas)
+MEDICION_MUESTREO = float(os.getenv('MEDICION_MUESTREO', 0.01))
+
+# Métricas en formato Prometheus (GET /api/metricas/, ver core.metricas).
+# Con un directorio, cada proceso guarda ahí sus métricas cada
+# METRICAS_ESCRITURA_SEGUNDOS y el endpoint suma las de todos los workers
+# del host (vaciarlo al iniciar el servicio; uno por host, no compartido).
+# Sin METRICAS_TOKEN el endpoint solo responde con DEBUG
+METRICAS_ACTIVAS = os.getenv('METRICAS_ACTIVAS', 'True') == 'True'
+METRICAS_DIRECTORIO = os.getenv('METRICAS_DIRECTORIO', '')
+METRICAS_ESCRITURA_SEGUNDOS = float(os.getenv('METRICAS_ESCRITURA_SEGUNDOS', 5))
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
+
 # Configuración de CORS
 CORS_ALLOWED_ORIGINS = os.getenv(
     'CORS_ALLOWED_ORIGINS',
@@ -1,12 +1,24 @@
 # backend/gamificacion/admin.py
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from .logros import otorgar_logro_a_calificados
 from .models import Logro, LogroUsuario, Grupo, MiembroGrupo
 
 @admin.register(Logro)
 class LogroAdmin(admin.ModelAdmin):
     list_display = ['nombre', 'tipo', 'puntos_requeridos', 'tareas_requeridas', 'activo']
     list_filter = ['tipo', 'activo']
+    actions = ['otorgar_a_calificados']
+    
+    @admin.action(description="Otorgar a los usuarios que ya cumplen las condiciones")
+    def otorgar_a_calificados(self, request, queryset):
+        for logro in queryset.filter(activo=True):
+            total = otorgar_logro_a_calificados(logro)
+            self.message_user(
+                request,
+                f'"{logro.nombre}" otorgado a {total} usuarios',
+                messages.SUCCESS
+            )
 
 @admin.register(Grupo)
 class GrupoAdmin(admin.ModelAdmin):
@@ -0,0 +1,199 @@
+# backend/gamificacion/logros.py
+
+"""
+Motor de evaluación incremental de logros (HU08).
+
+Cuando cambian los totales de un usuario solo se revisan los logros cuyo
+umbral (puntos, tareas o CO₂) quedó entre el valor anterior y el nuevo.
+Para ello se mantiene en memoria, por proceso, un índice ordenado de los
+logros activos que se reconstruye cuando cambia la versión compartida en el
+cache (cada vez que se guarda o elimina un Logro) o cuando supera
+LOGROS_MAX_EDAD segundos, por si el cache es local a cada proceso.
+"""
+
+import bisect
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, models, transaction
+from django.utils import timezone
+from core.metricas import sumar_al_confirmar
+
+CACHE_VERSION_KEY = 'logros:version'
+
+# Totales de un usuario en las tres dimensiones que usan los logros
+Totales = namedtuple('Totales', ['puntos', 'tareas', 'co2'])
+
+
+class IndiceLogros:
+    """
+    Logros activos ordenados por cada uno de sus umbrales.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cargado = False
+        self._version = None
+        self._cargado_en = 0
+        # (umbrales por logro, logros ordenados por dimensión): se reemplazan
+        # juntos para que `cruzados` nunca vea uno nuevo con el otro viejo
+        self._indice = ({}, {})
+
+    def _cargar(self):
+        """
+        Retorna el índice vigente, recargándolo si hace falta.
+        """
+        from .models import Logro
+
+        version = cache.get(CACHE_VERSION_KEY)
+        if (
+            self._cargado
+            and version == self._version
+            and time.monotonic() - self._cargado_en <= settings.LOGROS_MAX_EDAD
+        ):
+            return self._indice
+
+        with self._lock:
+            filas = Logro.objects.filter(activo=True).values_list(
+                'id', 'puntos_requeridos', 'tareas_requeridas', 'co2_requerido'
+            )
+            umbrales = {logro_id: Totales(p, t, c) for logro_id, p, t, c in filas}
+            por_dimension = {
+                dimension: sorted(
+                    (getattr(umbral, dimension), logro_id)
+                    for logro_id, umbral in umbrales.items()
+                )
+                for dimension in Totales._fields
+            }
+            self._indice = (umbrales, por_dimension)
+            self._version = version
+            self._cargado_en = time.monotonic()
+            self._cargado = True
+            return self._indice
+
+    def cruzados(self, antes, despues):
+        """
+        Retorna los ids de los logros que `despues` cumple por completo y
+        cuyo umbral en alguna dimensión está en el intervalo (antes, despues].
+        """
+        umbrales, por_dimension = self._cargar()
+        candidatos = set()
+        for dimension in Totales._fields:
+            desde = getattr(antes, dimension)
+            hasta = getattr(despues, dimension)
+            if hasta <= desde:
+                continue
+            ordenados = por_dimension[dimension]
+            # (valor, inf) deja a la izquierda todos los logros con umbral <= valor
+            inicio = bisect.bisect_right(ordenados, (desde, float('inf')))
+            fin = bisect.bisect_right(ordenados, (hasta, float('inf')))
+            candidatos.update(logro_id for _, logro_id in ordenados[inicio:fin])
+
+        return [
+            logro_id for logro_id in candidatos
+            if all(getattr(umbrales[logro_id], d) <= getattr(despues, d) for d in Totales._fields)
+        ]
+
+
+def invalidar_logros():
+    """
+    Forzar a todos los procesos a recargar el índice de logros.
+    """
+    try:
+        cache.incr(CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(CACHE_VERSION_KEY, 1, timeout=None)
+
+
+def otorgar_logros(usuario_id, antes, despues):
+    """
+    Evaluar los logros que cruzó un cambio de totales y otorgar los nuevos
+    con una única inserción masiva. Retorna los ids de los logros otorgados.
+    """
+    from .models import LogroUsuario
+
+    logro_ids = indice_logros.cruzados(antes, despues)
+    if not logro_ids:
+        return []
+
+    ya_obtenidos = set(
+        LogroUsuario.objects.filter(
+            usuario_id=usuario_id, logro_id__in=logro_ids
+        ).order_by().values_list('logro_id', flat=True)
+    )
+    nuevos = [logro_id for logro_id in logro_ids if logro_id not in ya_obtenidos]
+
+    # ignore_conflicts: otra petición concurrente pudo otorgarlo entretanto
+    LogroUsuario.objects.bulk_create(
+        [LogroUsuario(usuario_id=usuario_id, logro_id=logro_id) for logro_id in nuevos],
+        ignore_conflicts=True
+    )
+    if nuevos:
+        sumar_al_confirmar('ecopoints_logros_otorgados_total', len(nuevos))
+    return nuevos
+
+
+def otorgar_logro_a_calificados(logro, tamano_lote=5000, progreso=None):
+    """
+    Otorgar `logro` a todos los usuarios activos que ya cumplen sus
+    condiciones, con un INSERT ... SELECT por cada tramo de ids de usuario.
+    La cantidad de tareas es el contador `tareas_validadas` del usuario,
+    el mismo que usa la evaluación incremental. Es seguro volver a ejecutarlo: los usuarios que ya tienen
+    el logro se omiten.
+    `progreso(hasta_id, max_id, otorgados)` se llama al terminar cada tramo.
+    Retorna la cantidad total de logros otorgados.
+    """
+    from usuarios.models import Usuario
+    from .models import LogroUsuario
+
+    rango = Usuario.objects.aggregate(min_id=models.Min('id'), max_id=models.Max('id'))
+    if rango['min_id'] is None:
+        return 0
+
+    quote = connection.ops.quote_name
+    tabla_logros = quote(LogroUsuario._meta.db_table)
+    tabla_usuarios = quote(Usuario._meta.db_table)
+
+    sql = f"""
+        INSERT INTO {tabla_logros} (usuario_id, logro_id, fecha_obtencion)
+        SELECT u.id, %(logro)s, %(fecha)s
+        FROM {tabla_usuarios} u
+        WHERE u.id >= %(desde)s AND u.id < %(hasta)s
+          AND u.activo = %(verdadero)s
+          AND u.puntos_totales >= %(puntos)s
+          AND u.co2_total_evitado >= %(co2)s
+          AND u.tareas_validadas >= %(tareas)s
+          AND NOT EXISTS (
+              SELECT 1 FROM {tabla_logros} lu
+              WHERE lu.usuario_id = u.id AND lu.logro_id = %(logro)s
+          )
+        ON CONFLICT (usuario_id, logro_id) DO NOTHING
+    """
+    parametros = {
+        'logro': logro.pk,
+        'fecha': connection.ops.adapt_datetimefield_value(timezone.now()),
+        'verdadero': True,
+        'puntos': logro.puntos_requeridos,
+        'co2': connection.ops.adapt_decimalfield_value(logro.co2_requerido),
+        'tareas': logro.tareas_requeridas,
+    }
+
+    total = 0
+    desde = rango['min_id']
+    while desde <= rango['max_id']:
+        hasta = desde + tamano_lote
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, {**parametros, 'desde': desde, 'hasta': hasta})
+            otorgados = max(cursor.rowcount, 0)
+        total += otorgados
+        if progreso is not None:
+            progreso(min(hasta - 1, rango['max_id']), rango['max_id'], otorgados)
+        desde = hasta
+
+    return total
+
+
+indice_logros = IndiceLogros()
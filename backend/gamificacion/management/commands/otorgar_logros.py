@@ -0,0 +1,46 @@
+# backend/gamificacion/management/commands/otorgar_logros.py
+
+from django.core.management.base import BaseCommand, CommandError
+from gamificacion.logros import otorgar_logro_a_calificados
+from gamificacion.models import Logro
+
+
+class Command(BaseCommand):
+    help = (
+        "Otorga uno o más logros a todos los usuarios que ya cumplen sus "
+        "condiciones (por ejemplo, tras crear un logro o bajar sus umbrales). "
+        "Puede ejecutarse varias veces sin duplicar logros."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('logro_ids', nargs='*', type=int, help="Ids de los logros a otorgar")
+        parser.add_argument('--todos', action='store_true', help="Procesar todos los logros activos")
+        parser.add_argument(
+            '--tamano-lote', type=int, default=5000,
+            help="Cantidad de ids de usuario por cada INSERT ... SELECT"
+        )
+
+    def handle(self, *args, **options):
+        if options['todos']:
+            logros = Logro.objects.filter(activo=True)
+        elif options['logro_ids']:
+            logros = Logro.objects.filter(pk__in=options['logro_ids'])
+            faltantes = set(options['logro_ids']) - set(logros.values_list('pk', flat=True))
+            if faltantes:
+                raise CommandError(f"No existen los logros: {sorted(faltantes)}")
+        else:
+            raise CommandError("Indica los ids de los logros o usa --todos")
+
+        for logro in logros:
+            if not logro.activo:
+                self.stdout.write(self.style.WARNING(f"{logro}: inactivo, se omite"))
+                continue
+
+            def progreso(hasta_id, max_id, otorgados):
+                self.stdout.write(f"  usuarios hasta id {hasta_id}/{max_id}: {otorgados} otorgados")
+
+            self.stdout.write(f"Procesando {logro}...")
+            total = otorgar_logro_a_calificados(
+                logro, tamano_lote=options['tamano_lote'], progreso=progreso
+            )
+            self.stdout.write(self.style.SUCCESS(f"{logro}: {total} usuarios obtuvieron el logro"))
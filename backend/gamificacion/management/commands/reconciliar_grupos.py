@@ -0,0 +1,43 @@
+# backend/gamificacion/management/commands/reconciliar_grupos.py
+
+from django.core.management.base import BaseCommand
+from gamificacion.models import Grupo
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula total_miembros y puntos_totales de cada grupo desde "
+        "MiembroGrupo y corrige los que se hayan desviado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Solo reportar las diferencias, sin guardar cambios"
+        )
+        parser.add_argument('--tamano-lote', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        desviados = []
+        grupos = Grupo.objects.con_agregados_reales().only(
+            'id', 'nombre', 'total_miembros', 'puntos_totales'
+        ).order_by('pk')
+
+        for grupo in grupos.iterator(chunk_size=options['tamano_lote']):
+            if (grupo.total_miembros, grupo.puntos_totales) == (grupo.miembros_reales, grupo.puntos_reales):
+                continue
+            self.stdout.write(
+                f"  {grupo.nombre}: miembros {grupo.total_miembros} -> {grupo.miembros_reales}, "
+                f"puntos {grupo.puntos_totales} -> {grupo.puntos_reales}"
+            )
+            grupo.total_miembros = grupo.miembros_reales
+            grupo.puntos_totales = grupo.puntos_reales
+            desviados.append(grupo)
+
+        if not options['dry_run']:
+            Grupo.objects.bulk_update(
+                desviados, ['total_miembros', 'puntos_totales'], batch_size=options['tamano_lote']
+            )
+
+        accion = "encontrados" if options['dry_run'] else "corregidos"
+        self.stdout.write(self.style.SUCCESS(f"{len(desviados)} grupos desviados {accion}"))
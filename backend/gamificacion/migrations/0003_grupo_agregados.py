@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def calcular_agregados(apps, schema_editor):
+    Grupo = apps.get_model('gamificacion', 'Grupo')
+    MiembroGrupo = apps.get_model('gamificacion', 'MiembroGrupo')
+    miembros = MiembroGrupo.objects.filter(grupo=OuterRef('pk')).order_by().values('grupo')
+    Grupo.objects.update(
+        total_miembros=Coalesce(Subquery(miembros.annotate(c=Count('pk')).values('c')), 0),
+        puntos_totales=Coalesce(
+            Subquery(miembros.annotate(s=Sum('usuario__puntos_totales')).values('s')), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamificacion', '0002_initial'),
+        ('usuarios', '0002_alter_usuario_managers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='grupo',
+            name='puntos_totales',
+            field=models.IntegerField(default=0, help_text='Suma de los puntos de todos los miembros'),
+        ),
+        migrations.AddField(
+            model_name='grupo',
+            name='total_miembros',
+            field=models.IntegerField(default=0, help_text='Cantidad de miembros del grupo'),
+        ),
+        migrations.RunPython(calcular_agregados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamificacion', '0003_grupo_agregados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='grupo',
+            index=models.Index(models.OrderBy(models.F('fecha_creacion'), descending=True), condition=models.Q(('activo', True)), name='grupo_activos_idx'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 # gamificacion/models.py
 
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from usuarios.models import Usuario
 
 class Logro(models.Model):
@@ -105,6 +107,24 @@ class LogroUsuario(models.Model):
         return f"{self.usuario.username} - {self.logro.nombre}"
 
 
+class GrupoQuerySet(models.QuerySet):
+    
+    def con_agregados_reales(self):
+        """
+        Anota `miembros_reales` y `puntos_reales` calculados desde
+        MiembroGrupo, para comparar con los agregados mantenidos.
+        """
+        miembros = MiembroGrupo.objects.filter(grupo=OuterRef('pk')).order_by().values('grupo')
+        return self.annotate(
+            miembros_reales=Coalesce(
+                Subquery(miembros.annotate(c=Count('pk')).values('c')), 0
+            ),
+            puntos_reales=Coalesce(
+                Subquery(miembros.annotate(s=Sum('usuario__puntos_totales')).values('s')), 0
+            ),
+        )
+
+
 class Grupo(models.Model):
     """
     Grupos/comunidades ecológicas.
@@ -146,13 +166,35 @@ class Grupo(models.Model):
         help_text="Si es público, cualquiera puede unirse"
     )
     
+    # Agregados mantenidos al agregar/quitar miembros y cuando un miembro
+    # gana puntos (ver gamificacion/signals.py y reconciliar_grupos)
+    total_miembros = models.IntegerField(
+        default=0,
+        help_text="Cantidad de miembros del grupo"
+    )
+    
+    puntos_totales = models.IntegerField(
+        default=0,
+        help_text="Suma de los puntos de todos los miembros"
+    )
+    
     activo = models.BooleanField(default=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     
+    objects = GrupoQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Grupo"
         verbose_name_plural = "Grupos"
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Listado de grupos activos (HU11)
+            models.Index(
+                F('fecha_creacion').desc(),
+                condition=models.Q(activo=True),
+                name='grupo_activos_idx'
+            ),
+        ]
     
     def __str__(self):
         return self.nombre
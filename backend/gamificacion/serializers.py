@@ -1,10 +1,11 @@
 # backend/gamificacion/serializers.py
 
 from rest_framework import serializers
+from core.serializers import CamposDinamicosMixin
 from .models import Logro, LogroUsuario, Grupo, MiembroGrupo
 from usuarios.serializers import UsuarioSerializer
 
-class LogroSerializer(serializers.ModelSerializer):
+class LogroSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializer para logros/insignias (HU08).
     """
@@ -18,7 +19,7 @@ class LogroSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class LogroUsuarioSerializer(serializers.ModelSerializer):
+class LogroUsuarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializer para logros obtenidos por usuarios.
     """
@@ -29,15 +30,15 @@ class LogroUsuarioSerializer(serializers.ModelSerializer):
         model = LogroUsuario
         fields = ['id', 'usuario', 'usuario_info', 'logro', 'logro_info', 'fecha_obtencion']
         read_only_fields = ['id', 'fecha_obtencion', 'usuario_info', 'logro_info']
+        expandibles = {'usuario_info': 'usuario', 'logro_info': 'logro'}
 
 
-class GrupoSerializer(serializers.ModelSerializer):
+class GrupoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializer para grupos/comunidades (HU11).
     """
     creador_info = UsuarioSerializer(source='creador', read_only=True)
-    total_miembros = serializers.SerializerMethodField()
-    puntos_totales_grupo = serializers.SerializerMethodField()
+    puntos_totales_grupo = serializers.IntegerField(source='puntos_totales', read_only=True)
     
     class Meta:
         model = Grupo
@@ -46,22 +47,11 @@ class GrupoSerializer(serializers.ModelSerializer):
             'imagen', 'publico', 'activo', 'fecha_creacion',
             'total_miembros', 'puntos_totales_grupo'
         ]
-        read_only_fields = ['id', 'creador', 'fecha_creacion', 'creador_info']
-    
-    def get_total_miembros(self, obj):
-        """
-        Retorna el número total de miembros del grupo.
-        """
-        return obj.miembros.count()
-    
-    def get_puntos_totales_grupo(self, obj):
-        """
-        Suma los puntos de todos los miembros del grupo.
-        """
-        return sum([m.puntos_totales for m in obj.miembros.all()])
+        read_only_fields = ['id', 'creador', 'fecha_creacion', 'creador_info', 'total_miembros']
+        expandibles = {'creador_info': 'creador'}
 
 
-class MiembroGrupoSerializer(serializers.ModelSerializer):
+class MiembroGrupoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializer para la membresía de usuarios en grupos.
     """
@@ -71,4 +61,5 @@ class MiembroGrupoSerializer(serializers.ModelSerializer):
     class Meta:
         model = MiembroGrupo
         fields = ['id', 'usuario', 'usuario_info', 'grupo', 'grupo_info', 'fecha_union', 'es_admin']
-        read_only_fields = ['id', 'fecha_union', 'usuario_info', 'grupo_info']
\ No newline at end of file
+        read_only_fields = ['id', 'fecha_union', 'usuario_info', 'grupo_info']
+        expandibles = {'usuario_info': 'usuario', 'grupo_info': 'grupo'}
\ No newline at end of file
@@ -0,0 +1,76 @@
+# backend/gamificacion/signals.py
+
+from django.db.models import F, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.eventos import canal_eventos
+from usuarios.models import Usuario
+from usuarios.signals import totales_actualizados
+from .logros import Totales, invalidar_logros, otorgar_logros
+from .models import Logro, Grupo, MiembroGrupo
+
+
+@receiver([post_save, post_delete], sender=Logro)
+def logro_modificado(sender, **kwargs):
+    invalidar_logros()
+
+
+@receiver(totales_actualizados)
+def evaluar_logros(sender, usuario_id, totales, puntos=0, co2=0, tareas=0, **kwargs):
+    """
+    Otorgar los logros que el usuario acaba de alcanzar (HU08).
+    """
+    # El contador de tareas validadas se actualiza en el mismo UPDATE que
+    # los puntos, así que `despues - tareas` es el valor previo a este cambio
+    despues = Totales(totales['puntos_totales'], totales['tareas_validadas'], totales['co2_total_evitado'])
+    antes = Totales(despues.puntos - puntos, despues.tareas - tareas, despues.co2 - co2)
+    nuevos = otorgar_logros(usuario_id, antes, despues)
+    if nuevos:
+        publicar_logros(usuario_id, nuevos)
+
+
+def publicar_logros(usuario_id, logro_ids):
+    """
+    Avisar a los streams en vivo del usuario de sus nuevos logros (ver core.eventos).
+    """
+    for logro in Logro.objects.filter(pk__in=logro_ids).values('id', 'nombre', 'descripcion', 'tipo'):
+        canal_eventos.publicar(f'usuario:{usuario_id}', 'logro', {'logro': logro}, clave=f"logro:{logro['id']}")
+
+
+def _puntos_de(usuario_id):
+    return Coalesce(
+        Subquery(Usuario.objects.filter(pk=usuario_id).order_by().values('puntos_totales')[:1]),
+        0
+    )
+
+
+@receiver(post_save, sender=MiembroGrupo)
+def miembro_agregado(sender, instance, created, **kwargs):
+    """
+    Sumar al nuevo miembro a los agregados del grupo (HU11).
+    """
+    if created:
+        Grupo.objects.filter(pk=instance.grupo_id).update(
+            total_miembros=F('total_miembros') + 1,
+            puntos_totales=F('puntos_totales') + _puntos_de(instance.usuario_id)
+        )
+
+
+@receiver(post_delete, sender=MiembroGrupo)
+def miembro_quitado(sender, instance, **kwargs):
+    Grupo.objects.filter(pk=instance.grupo_id).update(
+        total_miembros=F('total_miembros') - 1,
+        puntos_totales=F('puntos_totales') - _puntos_de(instance.usuario_id)
+    )
+
+
+@receiver(totales_actualizados)
+def actualizar_puntos_grupos(sender, usuario_id, puntos=0, **kwargs):
+    """
+    Propagar los puntos ganados a todos los grupos del usuario con un UPDATE.
+    """
+    if puntos:
+        Grupo.objects.filter(miembrogrupo__usuario_id=usuario_id).update(
+            puntos_totales=F('puntos_totales') + puntos
+        )
@@ -1,3 +1,219 @@
-from django.test import TestCase
+# backend/gamificacion/tests.py
 
-# Create your tests here.
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from core.trabajos import ejecutar, pendientes
+from tareas.models import TipoTarea, TareaRegistrada
+from usuarios.models import Usuario
+from .logros import Totales, indice_logros, invalidar_logros, otorgar_logro_a_calificados
+from .models import Logro, LogroUsuario, Grupo, MiembroGrupo
+
+
+def crear_logro(nombre, puntos=0, tareas=0, co2=0, **kwargs):
+    return Logro.objects.create(
+        nombre=nombre, descripcion=nombre, puntos_requeridos=puntos,
+        tareas_requeridas=tareas, co2_requerido=Decimal(co2), **kwargs
+    )
+
+
+class MotorLogrosTests(TestCase):
+
+    def setUp(self):
+        invalidar_logros()
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        self.tipo = TipoTarea.objects.create(
+            nombre='Reciclar', descripcion='Reciclar',
+            co2_evitado_por_accion=Decimal('2.50'), puntos_otorgados=40
+        )
+
+    def registrar(self, cantidad=1):
+        for _ in range(cantidad):
+            TareaRegistrada.objects.create(
+                usuario=self.usuario, tipo_tarea=self.tipo,
+                fecha_realizacion=datetime.date.today()
+            )
+
+    def obtenidos(self):
+        return set(
+            LogroUsuario.objects.filter(usuario=self.usuario).values_list('logro__nombre', flat=True)
+        )
+
+    def test_solo_revisa_umbrales_cruzados(self):
+        crear_logro('100 puntos', puntos=100)
+        crear_logro('500 puntos', puntos=500)
+        crear_logro('inactivo', puntos=10, activo=False)
+
+        self.assertEqual(
+            indice_logros.cruzados(Totales(90, 0, 0), Totales(130, 0, 0)),
+            [Logro.objects.get(nombre='100 puntos').pk]
+        )
+        self.assertEqual(indice_logros.cruzados(Totales(130, 0, 0), Totales(170, 0, 0)), [])
+
+    def test_otorga_al_cumplir_todas_las_condiciones(self):
+        crear_logro('Primera tarea', tareas=1)
+        crear_logro('Constante', puntos=100, tareas=5)
+        crear_logro('5 kg', co2=5)
+
+        self.registrar()
+        self.assertEqual(self.obtenidos(), {'Primera tarea'})
+
+        # Cruza 100 puntos con solo 3 tareas: "Constante" aún no aplica
+        self.registrar(2)
+        self.assertEqual(self.obtenidos(), {'Primera tarea', '5 kg'})
+
+        # Al llegar a 5 tareas se cruza el umbral faltante
+        self.registrar(2)
+        self.assertEqual(self.obtenidos(), {'Primera tarea', '5 kg', 'Constante'})
+        self.assertEqual(LogroUsuario.objects.filter(usuario=self.usuario).count(), 3)
+
+    @override_settings(TRABAJOS_INMEDIATOS=False, TRABAJOS_HILOS=0)
+    def test_umbral_de_tareas_con_acumulacion_diferida(self):
+        crear_logro('5 tareas', tareas=5)
+
+        # Cada trabajo revisa la ventana (contador - tareas, contador] que
+        # su propio UPDATE dejó, sin contar las tareas de la cola
+        self.registrar(4)
+        self.ejecutar_trabajos()
+        self.registrar(2)
+        self.ejecutar_trabajos()
+        self.assertEqual(self.obtenidos(), {'5 tareas'})
+
+    def test_umbral_de_tareas_sin_contar_filas(self):
+        crear_logro('2 tareas', tareas=2)
+        self.registrar()
+        with CaptureQueriesContext(connection) as consultas:
+            self.registrar()
+        self.assertEqual(self.obtenidos(), {'2 tareas'})
+        self.assertFalse([c['sql'] for c in consultas if 'COUNT(' in c['sql'].upper()])
+
+        TareaRegistrada.objects.filter(usuario=self.usuario).first().delete()
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.tareas_validadas, 1)
+
+    def ejecutar_trabajos(self):
+        for trabajo_id in pendientes():
+            ejecutar(trabajo_id)
+
+    def test_nuevo_logro_invalida_indice(self):
+        self.registrar()
+        crear_logro('80 puntos', puntos=80)
+        self.registrar()
+        self.assertEqual(self.obtenidos(), {'80 puntos'})
+
+    def test_indice_se_reconstruye_al_vencer(self):
+        logro = crear_logro('100 puntos', puntos=100)
+        self.assertEqual(indice_logros.cruzados(Totales(0, 0, 0), Totales(60, 0, 0)), [])
+        # Un cambio que no invalida este proceso (p. ej. hecho en otro worker
+        # con un cache local)
+        Logro.objects.filter(pk=logro.pk).update(puntos_requeridos=50)
+        self.assertEqual(indice_logros.cruzados(Totales(0, 0, 0), Totales(60, 0, 0)), [])
+        with self.settings(LOGROS_MAX_EDAD=-1):
+            self.assertEqual(indice_logros.cruzados(Totales(0, 0, 0), Totales(60, 0, 0)), [logro.pk])
+
+
+class OtorgamientoMasivoTests(TestCase):
+
+    def setUp(self):
+        invalidar_logros()
+        tipo = TipoTarea.objects.create(nombre='Reciclar', descripcion='Reciclar')
+        self.usuarios = []
+        for i in range(10):
+            usuario = Usuario.objects.create(
+                username=f'user{i}', email=f'user{i}@test.cl',
+                puntos_totales=i * 100, co2_total_evitado=Decimal(i), tareas_validadas=i
+            )
+            TareaRegistrada.objects.bulk_create([
+                TareaRegistrada(
+                    usuario=usuario, tipo_tarea=tipo, fecha_realizacion=datetime.date.today(),
+                    co2_evitado=0, puntos_ganados=0
+                )
+                for _ in range(i)
+            ])
+            self.usuarios.append(usuario)
+        self.usuarios[9].activo = False
+        self.usuarios[9].save()
+
+    def test_otorga_por_tramos_y_es_idempotente(self):
+        logro = crear_logro('Veterano', puntos=300, tareas=4, co2='5.00')
+        tramos = []
+
+        total = otorgar_logro_a_calificados(
+            logro, tamano_lote=3, progreso=lambda *args: tramos.append(args)
+        )
+
+        # user5..user8 califican; user9 está inactivo
+        self.assertEqual(total, 4)
+        self.assertEqual(
+            set(logro.usuarios_que_lo_obtuvieron.values_list('usuario__username', flat=True)),
+            {'user5', 'user6', 'user7', 'user8'}
+        )
+        self.assertEqual(len(tramos), 4)
+        self.assertEqual(otorgar_logro_a_calificados(logro, tamano_lote=3), 0)
+
+
+class AgregadosGrupoTests(TestCase):
+
+    def setUp(self):
+        invalidar_logros()
+        self.tipo = TipoTarea.objects.create(
+            nombre='Reciclar', descripcion='Reciclar', puntos_otorgados=25
+        )
+        self.usuarios = [
+            Usuario.objects.create(username=f'user{i}', email=f'user{i}@test.cl', puntos_totales=100)
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuarios[0])
+
+    def test_agregados_se_mantienen(self):
+        response = self.client.post('/api/grupos/', {'nombre': 'Ciclistas', 'descripcion': 'Bici'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_miembros'], 1)
+        self.assertEqual(response.data['puntos_totales_grupo'], 100)
+        grupo = Grupo.objects.get(nombre='Ciclistas')
+
+        for usuario in self.usuarios[1:]:
+            self.client.force_authenticate(usuario)
+            self.client.post(f'/api/grupos/{grupo.pk}/unirse/')
+        TareaRegistrada.objects.create(
+            usuario=self.usuarios[1], tipo_tarea=self.tipo, fecha_realizacion=datetime.date.today()
+        )
+        self.client.post(f'/api/grupos/{grupo.pk}/salir/')
+
+        grupo.refresh_from_db()
+        self.assertEqual(grupo.total_miembros, 2)
+        self.assertEqual(grupo.puntos_totales, 225)
+
+        real = Grupo.objects.con_agregados_reales().get(pk=grupo.pk)
+        self.assertEqual((real.miembros_reales, real.puntos_reales), (2, 225))
+
+    def test_listado_con_consultas_constantes(self):
+        for i in range(5):
+            grupo = Grupo.objects.create(nombre=f'Grupo {i}', descripcion='-', creador=self.usuarios[0])
+            for usuario in self.usuarios:
+                MiembroGrupo.objects.create(usuario=usuario, grupo=grupo)
+
+        # COUNT de la paginación y SELECT con el creador
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/grupos/')
+        self.assertEqual(response.data['results'][0]['total_miembros'], 3)
+        self.assertEqual(response.data['results'][0]['puntos_totales_grupo'], 300)
+
+    def test_reconciliar_corrige_desvios(self):
+        grupo = Grupo.objects.create(nombre='Grupo', descripcion='-')
+        MiembroGrupo.objects.create(usuario=self.usuarios[0], grupo=grupo)
+        Grupo.objects.filter(pk=grupo.pk).update(total_miembros=7, puntos_totales=0)
+
+        salida = StringIO()
+        call_command('reconciliar_grupos', stdout=salida)
+
+        grupo.refresh_from_db()
+        self.assertEqual((grupo.total_miembros, grupo.puntos_totales), (1, 100))
+        self.assertIn('1 grupos desviados corregidos', salida.getvalue())
@@ -3,6 +3,9 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from core.asincrono import respuesta_json, vista_api_async
+from core.serializacion import SerializadorCompilado
+from core.serializers import CamposDinamicosViewSetMixin
 from .models import Logro, LogroUsuario, Grupo, MiembroGrupo
 from .serializers import (
     LogroSerializer,
@@ -11,7 +14,18 @@ from .serializers import (
     MiembroGrupoSerializer
 )
 
-class LogroViewSet(viewsets.ReadOnlyModelViewSet):
+@vista_api_async
+async def mis_logros_async(request):
+    """
+    Versión async de GET /api/logros/mis-logros/ (HU08).
+    GET /api/logros/mis-logros-async/
+    """
+    serializer = LogroUsuarioSerializer()
+    logros_usuario = LogroUsuario.objects.filter(usuario=request.user)
+    return respuesta_json(await SerializadorCompilado(serializer).aserializar(logros_usuario))
+
+
+class LogroViewSet(CamposDinamicosViewSetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para logros/insignias (HU08).
     
@@ -19,6 +33,7 @@ class LogroViewSet(viewsets.ReadOnlyModelViewSet):
     - GET /api/logros/ - Listar todos los logros disponibles
     - GET /api/logros/{id}/ - Ver detalle de un logro
     - GET /api/logros/mis-logros/ - Ver logros obtenidos por el usuario
+    - GET /api/logros/mis-logros-async/ - Mis logros en versión async, para ASGI
     """
     queryset = Logro.objects.filter(activo=True)
     serializer_class = LogroSerializer
@@ -30,15 +45,16 @@ class LogroViewSet(viewsets.ReadOnlyModelViewSet):
         Ver logros obtenidos por el usuario autenticado.
         GET /api/logros/mis-logros/
         """
-        logros_usuario = LogroUsuario.objects.filter(
-            usuario=request.user
-        ).select_related('logro')
+        # Serialización compilada desde .values() (una consulta con JOIN),
+        # con la misma salida que LogroUsuarioSerializer. Sin request en el
+        # contexto, como siempre: los íconos salen como URL relativa.
+        serializer = LogroUsuarioSerializer()
+        logros_usuario = LogroUsuario.objects.filter(usuario=request.user)
         
-        serializer = LogroUsuarioSerializer(logros_usuario, many=True)
-        return Response(serializer.data)
+        return Response(SerializadorCompilado(serializer).serializar(logros_usuario))
 
 
-class GrupoViewSet(viewsets.ModelViewSet):
+class GrupoViewSet(CamposDinamicosViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet para grupos/comunidades ecológicas (HU11).
     
@@ -65,6 +81,7 @@ class GrupoViewSet(viewsets.ModelViewSet):
             grupo=grupo,
             es_admin=True
         )
+        grupo.refresh_from_db(fields=['total_miembros', 'puntos_totales'])
     
     @action(detail=True, methods=['post'], url_path='unirse')
     def unirse(self, request, pk=None):
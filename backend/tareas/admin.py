@@ -1,7 +1,8 @@
 # backend/tareas/admin.py
 
 from django.contrib import admin
-from .models import TipoTarea, TareaRegistrada
+from .exportacion import COLUMNAS_TAREAS, respuesta_exportacion
+from .models import MovimientoPuntos, TipoTarea, TareaRegistrada
 
 @admin.register(TipoTarea)
 class TipoTareaAdmin(admin.ModelAdmin):
@@ -14,4 +15,29 @@ class TareaRegistradaAdmin(admin.ModelAdmin):
     list_display = ['usuario', 'tipo_tarea', 'fecha_realizacion', 'co2_evitado', 'puntos_ganados', 'validada']
     list_filter = ['validada', 'fecha_realizacion', 'tipo_tarea__categoria']
     search_fields = ['usuario__username', 'tipo_tarea__nombre']
-    date_hierarchy = 'fecha_realizacion'
\ No newline at end of file
+    date_hierarchy = 'fecha_realizacion'
+    actions = ['exportar_csv', 'exportar_ndjson']
+    
+    @admin.action(description="Exportar las tareas seleccionadas (CSV)")
+    def exportar_csv(self, request, queryset):
+        return respuesta_exportacion(request, queryset.order_by('id'), COLUMNAS_TAREAS, 'csv', 'ecopoints-tareas')
+    
+    @admin.action(description="Exportar las tareas seleccionadas (NDJSON)")
+    def exportar_ndjson(self, request, queryset):
+        return respuesta_exportacion(request, queryset.order_by('id'), COLUMNAS_TAREAS, 'ndjson', 'ecopoints-tareas')
+
+@admin.register(MovimientoPuntos)
+class MovimientoPuntosAdmin(admin.ModelAdmin):
+    list_display = ['id', 'usuario', 'tipo', 'tarea_id', 'puntos', 'co2_evitado', 'fecha']
+    list_filter = ['tipo']
+    search_fields = ['usuario__username']
+    
+    # El libro solo se escribe al registrar, editar o eliminar tareas
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,134 @@
+# backend/tareas/catalogo.py
+
+"""
+Catálogo en memoria de los tipos de tarea activos (HU15).
+
+El catálogo es pequeño y casi no cambia, pero cada cliente lo pide al abrir
+la aplicación y cada registro de tarea necesita su tipo. Cada proceso
+mantiene una copia de los tipos activos ya serializados y la recarga cuando
+cambia la versión compartida en el cache (cada vez que se guarda o elimina
+un TipoTarea, por ejemplo desde el admin) o cuando supera CATALOGO_MAX_EDAD
+segundos: con un cache local a cada proceso la versión solo cambia en el
+proceso que hizo el cambio.
+
+Además se calcula una huella del contenido para responder a peticiones
+condicionales (ETag / If-None-Match) sin volver a enviar el catálogo.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+CACHE_VERSION_KEY = 'catalogo_tipos:version'
+
+
+class CatalogoTipos:
+    """
+    Tipos de tarea activos, en el orden del modelo (categoría, nombre).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cargado = False
+        self._version = None
+        self._cargado_en = 0
+        self._tipos = {}
+        self._datos = []
+        self._huella = ''
+
+    def _cargar(self):
+        from .models import TipoTarea
+        from .serializers import TipoTareaSerializer
+
+        version = cache.get(CACHE_VERSION_KEY)
+        if self._vigente(version):
+            return
+
+        with self._lock:
+            tipos = list(TipoTarea.objects.filter(activa=True))
+            datos = TipoTareaSerializer(tipos, many=True).data
+            contenido = json.dumps(datos, cls=DjangoJSONEncoder, sort_keys=True)
+            self._tipos = {tipo.pk: tipo for tipo in tipos}
+            self._datos = [dict(fila) for fila in datos]
+            self._huella = hashlib.sha1(contenido.encode()).hexdigest()
+            self._version = version
+            self._cargado_en = time.monotonic()
+            self._cargado = True
+
+    def _vigente(self, version):
+        return (
+            self._cargado
+            and version == self._version
+            and time.monotonic() - self._cargado_en <= settings.CATALOGO_MAX_EDAD
+        )
+
+    async def _acargar(self):
+        # Solo se pasa a un hilo (con el ORM síncrono) si hay que recargar
+        if not self._vigente(cache.get(CACHE_VERSION_KEY)):
+            await sync_to_async(self._cargar)()
+
+    def obtener(self, tipo_id):
+        """
+        Retorna el TipoTarea activo con ese id, o None.
+        Las instancias son compartidas: no deben modificarse.
+        """
+        self._cargar()
+        return self._tipos.get(tipo_id)
+
+    def en_bulk(self, tipo_ids):
+        """
+        Equivalente a `TipoTarea.objects.filter(activa=True).in_bulk(tipo_ids)`.
+        """
+        self._cargar()
+        return {tipo_id: self._tipos[tipo_id] for tipo_id in tipo_ids if tipo_id in self._tipos}
+
+    def listar(self, categoria=None):
+        """
+        Retorna los tipos serializados, opcionalmente de una sola categoría.
+        """
+        self._cargar()
+        if categoria:
+            return [fila for fila in self._datos if fila['categoria'] == categoria]
+        return list(self._datos)
+
+    def huella(self):
+        """
+        Hash del contenido actual del catálogo; cambia solo si cambia algún tipo activo.
+        """
+        self._cargar()
+        return self._huella
+
+    async def alistar(self, categoria=None):
+        """
+        `listar` para vistas async.
+        """
+        await self._acargar()
+        if categoria:
+            return [fila for fila in self._datos if fila['categoria'] == categoria]
+        return list(self._datos)
+
+    async def ahuella(self):
+        """
+        `huella` para vistas async.
+        """
+        await self._acargar()
+        return self._huella
+
+
+def invalidar_catalogo():
+    """
+    Forzar a todos los procesos a recargar el catálogo de tipos de tarea.
+    """
+    try:
+        cache.incr(CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(CACHE_VERSION_KEY, 1, timeout=None)
+
+
+catalogo_tipos = CatalogoTipos()
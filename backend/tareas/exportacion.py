@@ -0,0 +1,140 @@
+# backend/tareas/exportacion.py
+
+"""
+Exportación del historial de tareas (HU12) y de los resúmenes diarios
+(HU09) en CSV o NDJSON (un objeto JSON por línea).
+
+La respuesta se transmite mientras se lee: las filas salen de un
+`values_list().iterator(chunk_size=...)` (con PostgreSQL, un cursor del
+lado del servidor) y se envían por bloques, por lo que la memoria no
+depende del tamaño del historial y la cabecera sale de inmediato.
+
+Bajo ASGI, Django consume un iterador síncrono con sync_to_async(list) y
+arma todo el archivo en memoria antes de enviarlo. Por eso, si la petición
+llegó por ASGI, el contenido se entrega como iterador asíncrono que pide
+cada bloque al generador en el hilo de la petición (donde vive el cursor).
+"""
+
+import csv
+import io
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from core.renderers import JSONRapidoRenderer
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# (columna exportada, campo del queryset)
+COLUMNAS_TAREAS = [
+    ('id', 'id'),
+    ('fecha_realizacion', 'fecha_realizacion'),
+    ('fecha_registro', 'fecha_registro'),
+    ('usuario_id', 'usuario_id'),
+    ('usuario', 'usuario__username'),
+    ('tipo_tarea_id', 'tipo_tarea_id'),
+    ('tipo_tarea', 'tipo_tarea__nombre'),
+    ('categoria', 'tipo_tarea__categoria'),
+    ('co2_evitado', 'co2_evitado'),
+    ('puntos_ganados', 'puntos_ganados'),
+    ('validada', 'validada'),
+    ('notas', 'notas'),
+]
+
+COLUMNAS_RESUMENES = [
+    ('usuario_id', 'usuario_id'),
+    ('fecha', 'fecha'),
+    ('categoria', 'categoria'),
+    ('cantidad_tareas', 'cantidad_tareas'),
+    ('co2_evitado', 'co2_evitado'),
+    ('puntos', 'puntos'),
+]
+
+# Una celda que empieza así se interpreta como fórmula en las planillas
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def respuesta_exportacion(request, queryset, columnas, formato, nombre_archivo):
+    """
+    StreamingHttpResponse con las `columnas` del queryset en el formato
+    pedido ('csv' o 'ndjson'), como archivo adjunto. `request` (de Django o
+    de DRF) indica si el contenido debe ser síncrono (WSGI) o asíncrono (ASGI).
+    """
+    nombres = [nombre for nombre, campo in columnas]
+    filas = queryset.values_list(*[campo for nombre, campo in columnas]).iterator(
+        chunk_size=settings.EXPORTACION_TAMANO_LOTE
+    )
+    contenido = _csv(nombres, filas) if formato == 'csv' else _ndjson(nombres, filas)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        contenido = _asincrono(contenido)
+    return StreamingHttpResponse(
+        contenido,
+        content_type=FORMATOS[formato],
+        headers={
+            'Content-Disposition': f'attachment; filename="{nombre_archivo}.{formato}"',
+            'Cache-Control': 'no-store',
+            # Sin buffer en nginx: cada bloque sale apenas se genera
+            'X-Accel-Buffering': 'no',
+        },
+    )
+
+
+async def _asincrono(contenido):
+    """
+    Iterar `contenido` desde el event loop: cada bloque se genera con
+    sync_to_async en el hilo de la petición, uno a la vez.
+    """
+    siguiente = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (bloque := await siguiente(contenido, None)) is not None:
+            yield bloque
+    finally:
+        await sync_to_async(contenido.close, thread_sensitive=True)()
+
+
+def _bloques(filas, formatear):
+    """
+    Agrupar las líneas formateadas en bloques de EXPORTACION_TAMANO_LOTE
+    filas, para no enviar un fragmento por fila. La primera fila sale sola,
+    apenas llega de la base de datos.
+    """
+    bloque = []
+    tamano = 1
+    for fila in filas:
+        bloque.append(formatear(fila))
+        if len(bloque) >= tamano:
+            yield b''.join(bloque)
+            bloque = []
+            tamano = settings.EXPORTACION_TAMANO_LOTE
+    if bloque:
+        yield b''.join(bloque)
+
+
+def _csv(nombres, filas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    def formatear(fila):
+        escritor.writerow([_celda(valor) for valor in fila])
+        linea = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return linea.encode()
+
+    yield formatear(nombres)
+    yield from _bloques(filas, formatear)
+
+
+def _celda(valor):
+    if isinstance(valor, str) and valor.startswith(_INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def _ndjson(nombres, filas):
+    renderer = JSONRapidoRenderer()
+    yield from _bloques(filas, lambda fila: renderer.render(dict(zip(nombres, fila))) + b'\n')
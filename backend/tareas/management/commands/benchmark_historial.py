@@ -0,0 +1,72 @@
+# backend/tareas/management/commands/benchmark_historial.py
+
+import datetime
+import random
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+from core.benchmark import base_de_datos_temporal, medir, tabla
+from tareas.models import TipoTarea, TareaRegistrada
+from tareas.paginacion import HistorialCursorPagination
+from usuarios.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la latencia de la página 1 y de una página profunda del "
+        "historial de tareas con paginación por número de página y por cursor. "
+        "Usa una base de datos temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tareas', type=int, default=20000, help="Tareas del usuario de prueba")
+        parser.add_argument('--pagina', type=int, default=1000, help="Página profunda a medir")
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with base_de_datos_temporal():
+            usuario = self.poblar(options['tareas'])
+            cliente = APIClient()
+            cliente.force_authenticate(usuario)
+
+            tam_pagina = 10
+            pagina = max(2, min(options['pagina'], options['tareas'] // tam_pagina))
+            cursor = self.cursor_para_pagina(usuario, pagina, tam_pagina)
+
+            casos = [
+                ('numero', 1, '/api/tareas/?page=1'),
+                ('numero', pagina, f'/api/tareas/?page={pagina}'),
+                ('cursor', 1, '/api/tareas/?paginacion=cursor'),
+                ('cursor', pagina, f'/api/tareas/?paginacion=cursor&cursor={cursor}'),
+            ]
+            filas = []
+            for modo, numero, url in casos:
+                resultado = medir(lambda: cliente.get(url), repeticiones=options['repeticiones'])
+                filas.append({'paginacion': modo, 'pagina': numero, **resultado})
+
+        self.stdout.write(f"Historial de {options['tareas']} tareas, {tam_pagina} por página\n")
+        self.stdout.write(tabla(filas, ['paginacion', 'pagina', 'mediana_ms', 'p95_ms', 'consultas']))
+
+    def poblar(self, cantidad):
+        usuario = Usuario.objects.create(username='benchmark', email='benchmark@ecopoints.cl')
+        tipo = TipoTarea.objects.create(nombre='Reciclar', descripcion='Reciclar')
+        aleatorio = random.Random(42)
+        hoy = datetime.date.today()
+        TareaRegistrada.objects.bulk_create([
+            TareaRegistrada(
+                usuario=usuario, tipo_tarea=tipo,
+                fecha_realizacion=hoy - datetime.timedelta(days=aleatorio.randint(0, 730)),
+                co2_evitado=1, puntos_ganados=10
+            )
+            for _ in range(cantidad)
+        ], batch_size=2000)
+        return usuario
+
+    def cursor_para_pagina(self, usuario, pagina, tam_pagina):
+        """
+        Cursor equivalente a haber avanzado hasta `pagina` con "next".
+        """
+        anterior = TareaRegistrada.objects.filter(usuario=usuario).order_by(
+            *HistorialCursorPagination.ordering
+        )[(pagina - 1) * tam_pagina - 1]
+        return HistorialCursorPagination().encode_cursor(anterior)
@@ -0,0 +1,26 @@
+# backend/tareas/management/commands/consolidar_saldos.py
+
+import datetime
+
+from django.core.management.base import BaseCommand
+from tareas.models import SaldoPuntos
+
+
+class Command(BaseCommand):
+    help = (
+        "Actualiza la foto de saldos del libro de puntos con los movimientos "
+        "nuevos, para que recalcular un saldo no recorra todo el historial. "
+        "Pensado para ejecutarse periódicamente (p. ej. con cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--margen', type=int, default=300,
+                            help="Segundos de antigüedad mínima de los movimientos incluidos")
+        parser.add_argument('--tamano-lote', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = SaldoPuntos.objects.consolidar(
+            margen=datetime.timedelta(seconds=options['margen']),
+            tamano_lote=options['tamano_lote']
+        )
+        self.stdout.write(self.style.SUCCESS(f"{total} saldos consolidados"))
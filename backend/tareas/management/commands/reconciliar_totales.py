@@ -0,0 +1,211 @@
+# backend/tareas/management/commands/reconciliar_totales.py
+
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from core.benchmark import tabla
+from core.models import Trabajo
+from tareas.models import TareaRegistrada
+from usuarios.models import Usuario, nivel_para_puntos
+from usuarios.ranking import aviso_cache_local, invalidar_ranking
+from usuarios.signals import totales_actualizados
+
+CAMPOS = ['puntos_totales', 'co2_total_evitado', 'nivel', 'tareas_validadas']
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula puntos_totales, co2_total_evitado, nivel y tareas_validadas "
+        "de cada usuario desde sus tareas registradas. Recorre los usuarios por lotes en orden "
+        "de id, con una agregación agrupada por lote, y guarda con bulk_update "
+        "solo los que cambiaron. Con --workers reparte rangos de ids disjuntos "
+        "entre varios hilos; con --dry-run solo informa las diferencias. "
+        "Cada corrección se notifica como una acumulación (totales_actualizados), "
+        "que actualiza los grupos, los logros y el ranking del usuario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano-lote', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=1, help="Hilos, cada uno con su rango de ids")
+        parser.add_argument('--dry-run', action='store_true', help="Informar las diferencias sin guardarlas")
+        parser.add_argument('--mostrar', type=int, default=50, help="Máximo de diferencias a listar")
+
+    def handle(self, *args, **options):
+        # Las tareas cuya acumulación sigue pendiente se contarían dos veces
+        pendientes = acumulaciones_pendientes().count()
+        if pendientes and not options['dry_run']:
+            raise CommandError(
+                f"Hay {pendientes} trabajos de acumulación pendientes; "
+                "ejecútalos (trabajos_worker --una-vez) antes de reconciliar"
+            )
+
+        limites = Usuario.objects.aggregate(desde=Min('pk'), hasta=Max('pk'))
+        if limites['desde'] is None:
+            self.stdout.write("No hay usuarios")
+            return
+
+        workers = max(1, options['workers'])
+        paso = (limites['hasta'] - limites['desde']) // workers + 1
+        rangos = [
+            (inicio, min(inicio + paso - 1, limites['hasta']))
+            for inicio in range(limites['desde'], limites['hasta'] + 1, paso)
+        ]
+        if len(rangos) == 1:
+            resultados = [self.reconciliar_rango(*rangos[0], options)]
+        else:
+            def en_hilo(rango):
+                try:
+                    return self.reconciliar_rango(*rango, options)
+                finally:
+                    connection.close()
+
+            with ThreadPoolExecutor(max_workers=len(rangos)) as pool:
+                resultados = list(pool.map(en_hilo, rangos))
+
+        revisados = sum(revisados for revisados, diferencias, omitidos in resultados)
+        diferencias = [fila for revisados, filas, omitidos in resultados for fila in filas]
+        omitidos = sum(omitidos for revisados, diferencias, omitidos in resultados)
+
+        if diferencias:
+            self.stdout.write(tabla(diferencias[:options['mostrar']], [
+                'usuario', 'puntos', 'puntos_tareas', 'co2', 'co2_tareas', 'nivel', 'nivel_tareas',
+                'tareas', 'tareas_validadas'
+            ]))
+        if omitidos:
+            self.stdout.write(self.style.WARNING(
+                f"{omitidos} usuarios omitidos: registraron tareas durante la "
+                "reconciliación; vuelve a ejecutarla cuando se acumulen"
+            ))
+        if options['dry_run']:
+            self.stdout.write(f"{len(diferencias)} de {revisados} usuarios difieren de sus tareas")
+            return
+
+        if diferencias:
+            invalidar_ranking()
+            aviso = aviso_cache_local()
+            if aviso:
+                self.stdout.write(self.style.WARNING(aviso))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(diferencias)} de {revisados} usuarios actualizados"
+        ))
+
+    def reconciliar_rango(self, desde, hasta, options):
+        """
+        Reconciliar los usuarios con id entre `desde` y `hasta` por lotes.
+        Retorna (usuarios revisados, diferencias encontradas, usuarios omitidos).
+        """
+        revisados = 0
+        diferencias = []
+        omitidos = 0
+        ultimo = desde - 1
+        while True:
+            with transaction.atomic():
+                usuarios = Usuario.objects.filter(pk__gt=ultimo, pk__lte=hasta).order_by('pk')
+                if not options['dry_run']:
+                    # Bloquear el lote: la acumulación de un trabajo (el UPDATE
+                    # del usuario) espera al bulk_update. Insertar tareas no
+                    # toca al usuario y no se bloquea; ver más abajo.
+                    usuarios = usuarios.select_for_update()
+                filas = list(usuarios.values_list('pk', *CAMPOS, 'activo')[:options['tamano_lote']])
+                if not filas:
+                    break
+                lote = [fila[:-1] for fila in filas]
+                activos = {fila[0]: fila[-1] for fila in filas}
+                revisados += len(lote)
+                cambios = self.comparar_lote(lote)
+                # Una tarea confirmada después de empezar ya está en la suma,
+                # pero su trabajo de acumulación, tomado después de esta
+                # consulta, la volvería a sumar: esos usuarios se omiten.
+                pendientes = usuarios_con_acumulacion_pendiente(lote[0][0], lote[-1][0])
+                omitidos += sum(fila['usuario'] in pendientes for fila in cambios)
+                cambios = [fila for fila in cambios if fila['usuario'] not in pendientes]
+                if cambios and not options['dry_run']:
+                    Usuario.objects.bulk_update([
+                        Usuario(
+                            pk=fila['usuario'], puntos_totales=fila['puntos_tareas'],
+                            co2_total_evitado=fila['co2_tareas'], nivel=fila['nivel_tareas'],
+                            tareas_validadas=fila['tareas_validadas']
+                        )
+                        for fila in cambios
+                    ], CAMPOS)
+                    for fila in cambios:
+                        self.notificar(fila, activos[fila['usuario']])
+                diferencias += cambios
+                ultimo = lote[-1][0]
+        return revisados, diferencias, omitidos
+
+    def notificar(self, fila, activo):
+        """
+        Enviar la corrección como una acumulación más, para que los
+        receptores ajusten los agregados de los grupos, otorguen los logros
+        alcanzados y actualicen el ranking y la copia de la autenticación.
+        """
+        totales_actualizados.send(
+            sender=Usuario,
+            usuario_id=fila['usuario'],
+            totales={
+                'puntos_totales': fila['puntos_tareas'],
+                'co2_total_evitado': fila['co2_tareas'],
+                'nivel': fila['nivel_tareas'],
+                'tareas_validadas': fila['tareas_validadas'],
+                'activo': activo,
+            },
+            puntos=fila['puntos_tareas'] - fila['puntos'],
+            co2=fila['co2_tareas'] - fila['co2'],
+            tareas=fila['tareas_validadas'] - fila['tareas'],
+        )
+
+    def comparar_lote(self, lote):
+        """
+        Totales de las tareas del lote con una sola agregación agrupada por
+        usuario, comparados con los guardados.
+        """
+        totales = {
+            fila['usuario_id']: (fila['puntos'], fila['co2'], fila['validadas'])
+            for fila in TareaRegistrada.objects.filter(
+                usuario_id__gte=lote[0][0], usuario_id__lte=lote[-1][0]
+            ).values('usuario_id').annotate(
+                puntos=Sum('puntos_ganados'), co2=Sum('co2_evitado'),
+                validadas=Count('id', filter=Q(validada=True))
+            ).order_by()
+        }
+        cambios = []
+        for usuario_id, puntos, co2, nivel, tareas in lote:
+            puntos_tareas, co2_tareas, tareas_validadas = totales.get(usuario_id, (0, Decimal('0.00'), 0))
+            nivel_tareas = nivel_para_puntos(puntos_tareas)
+            if (puntos, co2, nivel, tareas) != (puntos_tareas, co2_tareas, nivel_tareas, tareas_validadas):
+                cambios.append({
+                    'usuario': usuario_id,
+                    'puntos': puntos,
+                    'puntos_tareas': puntos_tareas,
+                    'co2': co2,
+                    'co2_tareas': co2_tareas,
+                    'nivel': nivel,
+                    'nivel_tareas': nivel_tareas,
+                    'tareas': tareas,
+                    'tareas_validadas': tareas_validadas,
+                })
+        return cambios
+
+
+def acumulaciones_pendientes():
+    return Trabajo.objects.filter(
+        nombre='tareas.acumular_registros',
+        estado__in=[Trabajo.ESTADO_PENDIENTE, Trabajo.ESTADO_EN_CURSO]
+    )
+
+
+def usuarios_con_acumulacion_pendiente(desde, hasta):
+    """
+    Ids de los usuarios entre `desde` y `hasta` con un trabajo de
+    acumulación aún sin aplicar.
+    """
+    usuarios = set()
+    for argumentos in acumulaciones_pendientes().values_list('argumentos', flat=True):
+        usuarios.update(
+            fila[0] for fila in argumentos['usuarios'] if desde <= fila[0] <= hasta
+        )
+    return usuarios
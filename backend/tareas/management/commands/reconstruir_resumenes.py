@@ -0,0 +1,18 @@
+# backend/tareas/management/commands/reconstruir_resumenes.py
+
+from django.core.management.base import BaseCommand
+from tareas.models import ResumenDiario
+
+
+class Command(BaseCommand):
+    help = "Regenera los resúmenes diarios por usuario y categoría desde el historial de tareas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', type=int, help="Reconstruir solo los resúmenes de este usuario")
+        parser.add_argument('--tamano-lote', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = ResumenDiario.objects.reconstruir(
+            usuario_id=options['usuario'], tamano_lote=options['tamano_lote']
+        )
+        self.stdout.write(self.style.SUCCESS(f"{total} resúmenes diarios generados"))
@@ -0,0 +1,59 @@
+# backend/tareas/management/commands/verificar_saldos.py
+
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmark import tabla
+from tareas.models import MovimientoPuntos
+from usuarios.models import Usuario, nivel_para_puntos
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara los puntos, CO₂ y nivel de cada usuario con su saldo en el "
+        "libro de puntos (última foto más movimientos posteriores) y falla si "
+        "alguno difiere. Los trabajos de acumulación aún pendientes aparecen "
+        "como diferencias hasta que se ejecutan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', type=int, help="Verificar solo este usuario")
+        parser.add_argument('--tamano-lote', type=int, default=1000)
+        parser.add_argument('--mostrar', type=int, default=50, help="Máximo de diferencias a listar")
+
+    def handle(self, *args, **options):
+        usuarios = Usuario.objects.order_by('pk')
+        if options['usuario'] is not None:
+            usuarios = usuarios.filter(pk=options['usuario'])
+
+        diferencias = []
+        verificados = 0
+        ultimo = 0
+        while True:
+            lote = list(usuarios.filter(pk__gt=ultimo).values_list(
+                'pk', 'username', 'puntos_totales', 'co2_total_evitado', 'nivel'
+            )[:options['tamano_lote']])
+            if not lote:
+                break
+            ultimo = lote[-1][0]
+            verificados += len(lote)
+            saldos = MovimientoPuntos.objects.saldos(fila[0] for fila in lote)
+            for usuario_id, username, puntos, co2, nivel in lote:
+                puntos_libro, co2_libro = saldos[usuario_id]
+                nivel_libro = nivel_para_puntos(puntos_libro)
+                if (puntos, co2, nivel) != (puntos_libro, co2_libro, nivel_libro):
+                    diferencias.append({
+                        'usuario': usuario_id,
+                        'username': username,
+                        'puntos': puntos,
+                        'puntos_libro': puntos_libro,
+                        'co2': co2,
+                        'co2_libro': co2_libro,
+                        'nivel': nivel,
+                        'nivel_libro': nivel_libro,
+                    })
+
+        if diferencias:
+            self.stdout.write(tabla(diferencias[:options['mostrar']], [
+                'usuario', 'username', 'puntos', 'puntos_libro', 'co2', 'co2_libro', 'nivel', 'nivel_libro'
+            ]))
+            raise CommandError(f"{len(diferencias)} de {verificados} usuarios difieren del libro de puntos")
+        self.stdout.write(self.style.SUCCESS(f"{verificados} usuarios coinciden con el libro de puntos"))
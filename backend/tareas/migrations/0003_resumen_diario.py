@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def poblar_resumenes(apps, schema_editor):
+    TareaRegistrada = apps.get_model('tareas', 'TareaRegistrada')
+    ResumenDiario = apps.get_model('tareas', 'ResumenDiario')
+    filas = TareaRegistrada.objects.order_by().values(
+        'usuario_id', 'fecha_realizacion', 'tipo_tarea__categoria'
+    ).annotate(cantidad=Count('id'), co2=Sum('co2_evitado'), total_puntos=Sum('puntos_ganados'))
+    ResumenDiario.objects.bulk_create([
+        ResumenDiario(
+            usuario_id=fila['usuario_id'],
+            fecha=fila['fecha_realizacion'],
+            categoria=fila['tipo_tarea__categoria'],
+            cantidad_tareas=fila['cantidad'],
+            co2_evitado=fila['co2'],
+            puntos=fila['total_puntos'],
+        )
+        for fila in filas.iterator(chunk_size=1000)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tareas', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('categoria', models.CharField(choices=[('reciclaje', 'Reciclaje'), ('transporte', 'Transporte Sustentable'), ('energia', 'Ahorro de Energía'), ('agua', 'Ahorro de Agua'), ('alimentacion', 'Alimentación Sustentable'), ('otro', 'Otro')], max_length=20)),
+                ('cantidad_tareas', models.IntegerField(default=0)),
+                ('co2_evitado', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('puntos', models.IntegerField(default=0)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario',
+                'verbose_name_plural': 'Resúmenes Diarios',
+                'ordering': ['-fecha'],
+                'unique_together': {('usuario', 'fecha', 'categoria')},
+            },
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
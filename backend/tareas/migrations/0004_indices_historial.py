@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tareas', '0003_resumen_diario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tarearegistrada',
+            index=models.Index(fields=['usuario', 'fecha_realizacion', 'fecha_registro', 'id'], name='tarea_historial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarearegistrada',
+            index=models.Index(fields=['fecha_realizacion', 'fecha_registro', 'id'], name='tarea_historial_global_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tareas', '0004_indices_historial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tarearegistrada',
+            index=models.Index(condition=models.Q(('validada', True)), fields=['usuario'], name='tarea_validada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tipotarea',
+            index=models.Index(condition=models.Q(('activa', True)), fields=['categoria', 'nombre'], name='tipotarea_activa_idx'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def abrir_libro(apps, schema_editor):
+    # Saldo inicial de cada usuario: la suma de las tareas que ya registró
+    TareaRegistrada = apps.get_model('tareas', 'TareaRegistrada')
+    MovimientoPuntos = apps.get_model('tareas', 'MovimientoPuntos')
+    filas = TareaRegistrada.objects.order_by().values('usuario_id').annotate(
+        total_puntos=Sum('puntos_ganados'), co2=Sum('co2_evitado')
+    )
+    # Insertar por tramos, sin armar en memoria un movimiento por usuario
+    lote = []
+    for fila in filas.iterator(chunk_size=1000):
+        lote.append(MovimientoPuntos(
+            usuario_id=fila['usuario_id'],
+            tipo='apertura',
+            puntos=fila['total_puntos'],
+            co2_evitado=fila['co2'],
+        ))
+        if len(lote) == 1000:
+            MovimientoPuntos.objects.bulk_create(lote)
+            lote = []
+    MovimientoPuntos.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tareas', '0005_indices_consultas'),
+        ('usuarios', '0003_indices_consultas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoPuntos',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='saldo_puntos', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('puntos', models.IntegerField(default=0)),
+                ('co2_evitado', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('hasta_movimiento', models.BigIntegerField(db_index=True, help_text='Último movimiento incluido en la foto')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Saldo de Puntos',
+                'verbose_name_plural': 'Saldos de Puntos',
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoPuntos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tarea_id', models.IntegerField(blank=True, help_text='Tarea que originó el movimiento', null=True)),
+                ('tipo', models.CharField(choices=[('apertura', 'Saldo inicial'), ('creacion', 'Tarea registrada'), ('edicion', 'Tarea editada'), ('eliminacion', 'Tarea eliminada')], max_length=20)),
+                ('puntos', models.IntegerField(default=0)),
+                ('co2_evitado', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('fecha', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos_puntos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Puntos',
+                'verbose_name_plural': 'Movimientos de Puntos',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['usuario', 'id'], name='movimiento_usuario_idx')],
+            },
+        ),
+        migrations.RunPython(abrir_libro, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,15 @@
 # tareas/models.py
 
-from django.db import models
+import datetime
+from decimal import Decimal
+
+from django.db import connection, models, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.utils import timezone
+from core.metricas import sumar_al_confirmar
+from core.trabajos import encolar
 from usuarios.models import Usuario
+from .catalogo import catalogo_tipos
 
 class TipoTarea(models.Model):
     """
@@ -71,11 +79,80 @@ class TipoTarea(models.Model):
         verbose_name = "Tipo de Tarea"
         verbose_name_plural = "Tipos de Tareas"
         ordering = ['categoria', 'nombre']
+        indexes = [
+            # Catálogo (HU15): solo tipos activos, filtrados y ordenados por categoría
+            models.Index(
+                fields=['categoria', 'nombre'],
+                condition=models.Q(activa=True),
+                name='tipotarea_activa_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.nombre} ({self.get_categoria_display()})"
 
 
+class TareaRegistradaManager(models.Manager):
+    
+    def registrar_lote(self, tareas):
+        """
+        Inserta varias tareas (instancias sin guardar) con un solo
+        bulk_create y encola un único trabajo que suma sus totales por
+        usuario y por día. Las tareas deben traer `tipo_tarea` asignado.
+        """
+        for tarea in tareas:
+            if not tarea.co2_evitado:
+                tarea.co2_evitado = tarea.tipo_tarea.co2_evitado_por_accion
+            if not tarea.puntos_ganados:
+                tarea.puntos_ganados = tarea.tipo_tarea.puntos_otorgados
+        
+        with transaction.atomic():
+            creadas = self.bulk_create(tareas)
+            MovimientoPuntos.objects.registrar(MovimientoPuntos.TIPO_CREACION, [
+                (tarea.usuario_id, tarea.pk, tarea.puntos_ganados, tarea.co2_evitado)
+                for tarea in creadas
+            ])
+            encolar('tareas.acumular_registros', totales_de_registros(creadas))
+            contar_registros(creadas, 'lote')
+        
+        return creadas
+
+
+def contar_registros(tareas, origen):
+    """
+    Sumar las tareas registradas y sus puntos a las métricas (ver
+    core.metricas), al confirmarse la transacción.
+    """
+    sumar_al_confirmar('ecopoints_tareas_registradas_total', len(tareas), origen=origen)
+    sumar_al_confirmar('ecopoints_puntos_otorgados_total', sum(tarea.puntos_ganados for tarea in tareas))
+
+
+def totales_de_registros(tareas):
+    """
+    Argumentos del trabajo 'tareas.acumular_registros' para tareas recién
+    creadas: los totales agregados por usuario y por resumen diario, con
+    los valores que tenían al registrarse.
+    """
+    totales_por_usuario = {}
+    resumenes = {}
+    for tarea in tareas:
+        puntos, co2, cantidad = totales_por_usuario.get(tarea.usuario_id, (0, 0, 0))
+        totales_por_usuario[tarea.usuario_id] = (
+            puntos + tarea.puntos_ganados,
+            co2 + tarea.co2_evitado,
+            cantidad + (1 if tarea.validada else 0),
+        )
+        
+        clave = (tarea.usuario_id, tarea.fecha_realizacion, tarea.tipo_tarea.categoria)
+        cantidad, co2, puntos = resumenes.get(clave, (0, 0, 0))
+        resumenes[clave] = (cantidad + 1, co2 + tarea.co2_evitado, puntos + tarea.puntos_ganados)
+    
+    return {
+        'usuarios': [[usuario_id, *totales] for usuario_id, totales in totales_por_usuario.items()],
+        'resumenes': [[*clave, *valores] for clave, valores in resumenes.items()],
+    }
+
+
 class TareaRegistrada(models.Model):
     """
     Registro de tareas ecológicas completadas por los usuarios.
@@ -137,10 +214,30 @@ class TareaRegistrada(models.Model):
     
     ultima_actualizacion = models.DateTimeField(auto_now=True)
     
+    objects = TareaRegistradaManager()
+    
     class Meta:
         verbose_name = "Tarea Registrada"
         verbose_name_plural = "Tareas Registradas"
         ordering = ['-fecha_realizacion', '-fecha_registro']
+        indexes = [
+            # Historial por usuario y paginación por cursor (HU12)
+            models.Index(
+                fields=['usuario', 'fecha_realizacion', 'fecha_registro', 'id'],
+                name='tarea_historial_idx'
+            ),
+            # Historial completo para administradores
+            models.Index(
+                fields=['fecha_realizacion', 'fecha_registro', 'id'],
+                name='tarea_historial_global_idx'
+            ),
+            # Conteo de tareas validadas por usuario (perfil y logros)
+            models.Index(
+                fields=['usuario'],
+                condition=models.Q(validada=True),
+                name='tarea_validada_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.usuario.username} - {self.tipo_tarea.nombre} ({self.fecha_realizacion})"
@@ -151,17 +248,446 @@ class TareaRegistrada(models.Model):
         CO₂ y puntos si no se proporcionan.
         """
         # Si es un nuevo registro y no tiene valores calculados
-        if not self.pk:
+        nuevo = not self.pk
+        anterior = None
+        self.usar_tipo_del_catalogo()
+        if nuevo:
             if not self.co2_evitado:
                 self.co2_evitado = self.tipo_tarea.co2_evitado_por_accion
             
             if not self.puntos_ganados:
                 self.puntos_ganados = self.tipo_tarea.puntos_otorgados
+        
+        with transaction.atomic():
+            if not nuevo:
+                # Edición (HU10): los valores previos, para ajustar el resumen
+                # diario y los totales. Con la fila bloqueada, dos ediciones
+                # concurrentes no parten del mismo estado anterior
+                anterior = TareaRegistrada.objects.select_for_update(of=('self',)).filter(
+                    pk=self.pk
+                ).values(
+                    'usuario_id', 'fecha_realizacion', 'tipo_tarea__categoria',
+                    'co2_evitado', 'puntos_ganados', 'validada'
+                ).first()
+            
+            super().save(*args, **kwargs)
+            
+            if anterior is not None:
+                self._ajustar_resumen(anterior)
+                self._ajustar_totales(anterior)
             
-            # Actualizar estadísticas del usuario
-            self.usuario.puntos_totales += self.puntos_ganados
-            self.usuario.co2_total_evitado += float(self.co2_evitado)
-            self.usuario.calcular_nivel()
-            self.usuario.save()
+            if nuevo:
+                # Resumen diario, totales del usuario, logros y grupos: en
+                # segundo plano, confirmado junto con el INSERT
+                MovimientoPuntos.objects.registrar(MovimientoPuntos.TIPO_CREACION, [
+                    (self.usuario_id, self.pk, self.puntos_ganados, self.co2_evitado)
+                ])
+                encolar('tareas.acumular_registros', totales_de_registros([self]))
+                contar_registros([self], 'individual')
+    
+    def usar_tipo_del_catalogo(self):
+        """
+        Asignar el tipo de tarea desde el catálogo en memoria si aún no está
+        cargado, para no consultarlo de nuevo. Los tipos inactivos no están
+        en el catálogo y se siguen cargando desde la base de datos.
+        """
+        if self.tipo_tarea_id is None or TareaRegistrada.tipo_tarea.is_cached(self):
+            return
+        tipo = catalogo_tipos.obtener(self.tipo_tarea_id)
+        if tipo is not None:
+            self.tipo_tarea = tipo
+    
+    def _ajustar_totales(self, anterior):
+        """
+        Registrar en el libro de puntos la diferencia entre la tarea editada
+        y la anterior, y aplicarla a los totales de los usuarios.
+        """
+        ajustes = [
+            (anterior['usuario_id'], -anterior['puntos_ganados'], -anterior['co2_evitado'],
+             -1 if anterior['validada'] else 0),
+            (self.usuario_id, self.puntos_ganados, self.co2_evitado, 1 if self.validada else 0),
+        ]
+        if self.usuario_id == anterior['usuario_id']:
+            ajustes = [(self.usuario_id, *(a + b for a, b in zip(ajustes[0][1:], ajustes[1][1:])))]
+        ajustar_totales(MovimientoPuntos.TIPO_EDICION, self.pk, ajustes)
+    
+    def _ajustar_resumen(self, anterior):
+        """
+        Mover la tarea editada de su resumen diario anterior al actual.
+        """
+        actual = (
+            self.usuario_id, self.fecha_realizacion, self.tipo_tarea.categoria,
+            self.co2_evitado, self.puntos_ganados
+        )
+        previo = (
+            anterior['usuario_id'], anterior['fecha_realizacion'], anterior['tipo_tarea__categoria'],
+            anterior['co2_evitado'], anterior['puntos_ganados']
+        )
+        if actual == previo:
+            return
+        
+        if actual[:3] == previo[:3]:
+            # Mismo día y categoría: un solo ajuste (un INSERT ... ON CONFLICT
+            # no puede tocar la misma fila dos veces)
+            ResumenDiario.objects.acumular(
+                *actual[:3], 0, actual[3] - previo[3], actual[4] - previo[4]
+            )
+        else:
+            ResumenDiario.objects.acumular_varios([
+                previo[:3] + (-1, -previo[3], -previo[4]),
+                actual[:3] + (1, actual[3], actual[4]),
+            ])
+
+
+def ajustar_totales(tipo, tarea_id, ajustes):
+    """
+    Registrar los ajustes (usuario_id, puntos, co2, tareas) de una tarea
+    editada o eliminada en el libro de puntos y encolar su aplicación a los
+    totales de cada usuario (y con ellos a logros, grupos y ranking).
+    """
+    ajustes = [ajuste for ajuste in ajustes if any(ajuste[1:])]
+    if not ajustes:
+        return
+    MovimientoPuntos.objects.registrar(tipo, [
+        (usuario_id, tarea_id, puntos, co2) for usuario_id, puntos, co2, tareas in ajustes
+    ])
+    encolar('tareas.acumular_registros', {
+        'usuarios': [list(ajuste) for ajuste in ajustes],
+        'resumenes': [],
+    })
+
+
+class ResumenDiarioManager(models.Manager):
+    
+    def acumular(self, usuario_id, fecha, categoria, tareas, co2, puntos):
+        """
+        Suma (o resta, con valores negativos) una actividad al resumen del
+        usuario para ese día y categoría, creándolo si no existe.
+        """
+        self.acumular_varios([(usuario_id, fecha, categoria, tareas, co2, puntos)])
+    
+    def acumular_varios(self, filas):
+        """
+        Aplica varias filas (usuario_id, fecha, categoria, tareas, co2, puntos)
+        con un único INSERT ... ON CONFLICT DO UPDATE que suma a los
+        resúmenes existentes, sin condiciones de carrera entre peticiones.
+        """
+        if not filas:
+            return
+        
+        ops = connection.ops
+        tabla = ops.quote_name(self.model._meta.db_table)
+        valores = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(filas))
+        parametros = []
+        for usuario_id, fecha, categoria, tareas, co2, puntos in filas:
+            parametros += [
+                usuario_id, ops.adapt_datefield_value(fecha), categoria,
+                tareas, ops.adapt_decimalfield_value(Decimal(str(co2))), puntos
+            ]
+        
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {tabla} (usuario_id, fecha, categoria, cantidad_tareas, co2_evitado, puntos)
+                VALUES {valores}
+                ON CONFLICT (usuario_id, fecha, categoria) DO UPDATE SET
+                    cantidad_tareas = {tabla}.cantidad_tareas + excluded.cantidad_tareas,
+                    co2_evitado = {tabla}.co2_evitado + excluded.co2_evitado,
+                    puntos = {tabla}.puntos + excluded.puntos
+            """, parametros)
+    
+    def reconstruir(self, usuario_id=None, tamano_lote=1000):
+        """
+        Regenera los resúmenes desde TareaRegistrada con una agregación
+        agrupada por usuario, día y categoría. Retorna cuántos se crearon.
+        """
+        tareas = TareaRegistrada.objects.order_by()
+        resumenes = self.all()
+        if usuario_id is not None:
+            tareas = tareas.filter(usuario_id=usuario_id)
+            resumenes = resumenes.filter(usuario_id=usuario_id)
+        
+        filas = tareas.values(
+            'usuario_id', 'fecha_realizacion', 'tipo_tarea__categoria'
+        ).annotate(
+            cantidad=Count('id'), co2=Sum('co2_evitado'), total_puntos=Sum('puntos_ganados')
+        )
+        
+        total = 0
+        with transaction.atomic():
+            resumenes.delete()
+            lote = []
+            for fila in filas.iterator(chunk_size=tamano_lote):
+                lote.append(self.model(
+                    usuario_id=fila['usuario_id'],
+                    fecha=fila['fecha_realizacion'],
+                    categoria=fila['tipo_tarea__categoria'],
+                    cantidad_tareas=fila['cantidad'],
+                    co2_evitado=fila['co2'],
+                    puntos=fila['total_puntos']
+                ))
+                if len(lote) >= tamano_lote:
+                    total += len(self.bulk_create(lote))
+                    lote = []
+            total += len(self.bulk_create(lote))
+        return total
+
+
+class ResumenDiario(models.Model):
+    """
+    Resumen diario de actividad por usuario y categoría.
+    Se mantiene al crear, editar o eliminar tareas para servir las
+    estadísticas y gráficos (HU09) sin recorrer todo el historial.
+    """
+    
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='resumenes_diarios'
+    )
+    
+    fecha = models.DateField()
+    
+    categoria = models.CharField(
+        max_length=20,
+        choices=TipoTarea.CATEGORIAS
+    )
+    
+    cantidad_tareas = models.IntegerField(default=0)
+    
+    co2_evitado = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0
+    )
+    
+    puntos = models.IntegerField(default=0)
+    
+    objects = ResumenDiarioManager()
+    
+    class Meta:
+        verbose_name = "Resumen Diario"
+        verbose_name_plural = "Resúmenes Diarios"
+        unique_together = ['usuario', 'fecha', 'categoria']
+        ordering = ['-fecha']
+    
+    def __str__(self):
+        return f"{self.usuario_id} - {self.fecha} - {self.categoria}"
+
+
+class MovimientoPuntosManager(models.Manager):
+    
+    def registrar(self, tipo, filas):
+        """
+        Agrega al libro un movimiento por cada fila (usuario_id, tarea_id,
+        puntos, co2) con diferencias distintas de cero, en un bulk_create.
+        """
+        return self.bulk_create([
+            self.model(usuario_id=usuario_id, tarea_id=tarea_id, tipo=tipo, puntos=puntos, co2_evitado=co2)
+            for usuario_id, tarea_id, puntos, co2 in filas
+            if puntos or co2
+        ])
+    
+    def saldos(self, usuario_ids):
+        """
+        Saldo {usuario_id: (puntos, co2)} de cada usuario: su foto más los
+        movimientos posteriores, con dos consultas que no dependen del largo
+        del historial.
+        """
+        usuario_ids = list(usuario_ids)
+        saldos = {usuario_id: (0, Decimal('0')) for usuario_id in usuario_ids}
+        for usuario_id, puntos, co2 in SaldoPuntos.objects.filter(
+            usuario_id__in=usuario_ids
+        ).values_list('usuario_id', 'puntos', 'co2_evitado'):
+            saldos[usuario_id] = (puntos, co2)
         
-        super().save(*args, **kwargs)
\ No newline at end of file
+        movimientos = self.filter(usuario_id__in=usuario_ids).posteriores_a_foto()
+        for fila in movimientos.values('usuario_id').annotate(
+            total_puntos=Sum('puntos'), total_co2=Sum('co2_evitado')
+        ).order_by():
+            puntos, co2 = saldos[fila['usuario_id']]
+            saldos[fila['usuario_id']] = (puntos + fila['total_puntos'], co2 + fila['total_co2'])
+        return saldos
+    
+    def saldo(self, usuario_id):
+        return self.saldos([usuario_id])[usuario_id]
+
+
+class MovimientoPuntosQuerySet(models.QuerySet):
+    
+    def posteriores_a_foto(self):
+        """
+        Movimientos que aún no están incluidos en la foto de su usuario.
+        """
+        return self.filter(
+            Q(usuario__saldo_puntos__isnull=True)
+            | Q(pk__gt=F('usuario__saldo_puntos__hasta_movimiento'))
+        )
+
+
+class MovimientoPuntos(models.Model):
+    """
+    Libro de puntos y CO₂: un movimiento por cada tarea creada, editada o
+    eliminada (HU04, HU10), con la diferencia que produjo en los totales
+    del usuario. Solo se agregan filas; los totales se pueden recalcular
+    como la última foto (SaldoPuntos) más los movimientos posteriores.
+    """
+    
+    TIPO_APERTURA = 'apertura'
+    TIPO_CREACION = 'creacion'
+    TIPO_EDICION = 'edicion'
+    TIPO_ELIMINACION = 'eliminacion'
+    
+    TIPOS = [
+        (TIPO_APERTURA, 'Saldo inicial'),
+        (TIPO_CREACION, 'Tarea registrada'),
+        (TIPO_EDICION, 'Tarea editada'),
+        (TIPO_ELIMINACION, 'Tarea eliminada'),
+    ]
+    
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='movimientos_puntos'
+    )
+    
+    # Sin clave foránea: el movimiento se conserva al eliminar la tarea
+    tarea_id = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text="Tarea que originó el movimiento"
+    )
+    
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    
+    puntos = models.IntegerField(default=0)
+    
+    co2_evitado = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0
+    )
+    
+    fecha = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    objects = MovimientoPuntosManager.from_queryset(MovimientoPuntosQuerySet)()
+    
+    class Meta:
+        verbose_name = "Movimiento de Puntos"
+        verbose_name_plural = "Movimientos de Puntos"
+        ordering = ['id']
+        indexes = [
+            # Movimientos de un usuario posteriores a su foto
+            models.Index(fields=['usuario', 'id'], name='movimiento_usuario_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.usuario_id} - {self.tipo} ({self.puntos:+d})"
+    
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Los movimientos de puntos no se modifican")
+        super().save(*args, **kwargs)
+
+
+# Clave del bloqueo de Postgres que serializa las consolidaciones
+BLOQUEO_CONSOLIDACION = 7_301_019
+
+
+class SaldoPuntosManager(models.Manager):
+    
+    def consolidar(self, margen=datetime.timedelta(minutes=5), tamano_lote=1000):
+        """
+        Suma a la foto de cada usuario sus movimientos posteriores, hasta el
+        último con más de `margen` de antigüedad (las transacciones aún
+        abiertas pueden confirmar movimientos con un id menor que otros ya
+        visibles). Retorna cuántas fotos se actualizaron.
+        """
+        hasta = MovimientoPuntos.objects.filter(
+            fecha__lte=timezone.now() - margen
+        ).aggregate(hasta=Max('id'))['hasta']
+        
+        total = 0
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Una consolidación a la vez: otra leería las mismas fotos y sumaría dos veces
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_xact_lock(%s)', [BLOQUEO_CONSOLIDACION])
+            # Las consolidaciones anteriores ya incluyeron todo hasta su último movimiento
+            desde = self.aggregate(desde=Max('hasta_movimiento'))['desde'] or 0
+            if hasta is None or hasta <= desde:
+                return 0
+            movimientos = MovimientoPuntos.objects.filter(pk__gt=desde, pk__lte=hasta)
+            ultimo = 0
+            while True:
+                # Por lotes de usuarios, en orden de id
+                usuario_ids = list(
+                    movimientos.filter(usuario_id__gt=ultimo).order_by('usuario_id')
+                    .values_list('usuario_id', flat=True).distinct()[:tamano_lote]
+                )
+                if not usuario_ids:
+                    break
+                ultimo = usuario_ids[-1]
+                total += self._guardar(list(
+                    movimientos.filter(usuario_id__in=usuario_ids).posteriores_a_foto()
+                    .values('usuario_id').annotate(
+                        total_puntos=Sum('puntos'), total_co2=Sum('co2_evitado')
+                    ).order_by()
+                ), hasta)
+        return total
+    
+    def _guardar(self, filas, hasta):
+        fotos = self.in_bulk([fila['usuario_id'] for fila in filas], field_name='usuario_id')
+        ahora = timezone.now()
+        nuevas = []
+        for fila in filas:
+            foto = fotos.get(fila['usuario_id'])
+            nuevas.append(self.model(
+                usuario_id=fila['usuario_id'],
+                puntos=(foto.puntos if foto else 0) + fila['total_puntos'],
+                co2_evitado=(foto.co2_evitado if foto else 0) + fila['total_co2'],
+                hasta_movimiento=hasta,
+                fecha=ahora,
+            ))
+        self.bulk_create(
+            nuevas, update_conflicts=True, unique_fields=['usuario'],
+            update_fields=['puntos', 'co2_evitado', 'hasta_movimiento', 'fecha']
+        )
+        return len(nuevas)
+
+
+class SaldoPuntos(models.Model):
+    """
+    Foto periódica del libro de puntos por usuario: la suma de sus
+    movimientos hasta `hasta_movimiento` (ver consolidar_saldos).
+    """
+    
+    usuario = models.OneToOneField(
+        Usuario,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='saldo_puntos'
+    )
+    
+    puntos = models.IntegerField(default=0)
+    
+    co2_evitado = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0
+    )
+    
+    hasta_movimiento = models.BigIntegerField(
+        db_index=True,
+        help_text="Último movimiento incluido en la foto"
+    )
+    
+    fecha = models.DateTimeField(default=timezone.now)
+    
+    objects = SaldoPuntosManager()
+    
+    class Meta:
+        verbose_name = "Saldo de Puntos"
+        verbose_name_plural = "Saldos de Puntos"
+    
+    def __str__(self):
+        return f"{self.usuario_id} - {self.puntos} puntos"
@@ -0,0 +1,99 @@
+# backend/tareas/paginacion.py
+
+import base64
+import datetime
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class HistorialCursorPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) para el historial de tareas (HU12).
+    
+    Sigue el orden del modelo (-fecha_realizacion, -fecha_registro) con el
+    id como desempate, y el cursor guarda esos tres valores de la última
+    fila entregada. Cada página es un rango sobre el índice compuesto
+    (usuario, fecha_realizacion, fecha_registro, id): no hay COUNT(*) ni
+    OFFSET, por lo que la página 1000 cuesta lo mismo que la primera.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-fecha_realizacion', '-fecha_registro', '-id')
+    invalid_cursor_message = 'Cursor inválido'
+
+    def get_page_size(self, request):
+        page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, page_size))
+        except (TypeError, ValueError):
+            pass
+        return min(max(page_size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            fecha, registro, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(fecha_realizacion__lt=fecha)
+                | Q(fecha_realizacion=fecha, fecha_registro__lt=registro)
+                | Q(fecha_realizacion=fecha, fecha_registro=registro, id__lt=pk),
+                # Cota explícita para que el planificador use el índice como rango
+                fecha_realizacion__lte=fecha,
+            )
+
+        filas = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        self.has_next = len(filas) > self.page_size
+        self.page = filas[:self.page_size]
+        return self.page
+
+    def encode_cursor(self, tarea):
+        valor = f'{tarea.fecha_realizacion.isoformat()}|{tarea.fecha_registro.isoformat()}|{tarea.pk}'
+        return base64.urlsafe_b64encode(valor.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            fecha, registro, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            registro = parse_datetime(registro)
+            if registro is None:
+                raise ValueError
+            return datetime.date.fromisoformat(fecha), registro, int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('first', self.get_first_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'first': {'type': 'string', 'format': 'uri'},
+                'results': schema,
+            },
+        }
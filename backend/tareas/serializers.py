@@ -1,10 +1,12 @@
 # backend/tareas/serializers.py
 
 from rest_framework import serializers
+from core.serializers import CamposDinamicosMixin
+from .catalogo import catalogo_tipos
 from .models import TipoTarea, TareaRegistrada
 from usuarios.serializers import UsuarioSerializer
 
-class TipoTareaSerializer(serializers.ModelSerializer):
+class TipoTareaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializer para el catálogo de tipos de tareas ecológicas (HU15).
     """
@@ -18,7 +20,20 @@ class TipoTareaSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class TareaRegistradaSerializer(serializers.ModelSerializer):
+class TipoTareaCatalogoField(serializers.PrimaryKeyRelatedField):
+    """
+    Resuelve el tipo de tarea desde el catálogo en memoria. Solo consulta la
+    base de datos si el id no está en él (tipos inactivos o inexistentes).
+    """
+    def to_internal_value(self, data):
+        if not isinstance(data, bool) and str(data).isdigit():
+            tipo = catalogo_tipos.obtener(int(data))
+            if tipo is not None:
+                return tipo
+        return super().to_internal_value(data)
+
+
+class TareaRegistradaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializer para el registro de tareas ecológicas (HU04).
     """
@@ -33,6 +48,7 @@ class TareaRegistradaSerializer(serializers.ModelSerializer):
             'notas', 'foto', 'validada', 'fecha_registro'
         ]
         read_only_fields = ['id', 'co2_evitado', 'puntos_ganados', 'fecha_registro', 'usuario_info', 'tipo_tarea_info']
+        expandibles = {'usuario_info': 'usuario', 'tipo_tarea_info': 'tipo_tarea'}
     
     def validate_fecha_realizacion(self, value):
         """
@@ -48,6 +64,8 @@ class TareaRegistradaCreateSerializer(serializers.ModelSerializer):
     """
     Serializer específico para crear tareas (simplificado).
     """
+    tipo_tarea = TipoTareaCatalogoField(queryset=TipoTarea.objects.all())
+    
     class Meta:
         model = TareaRegistrada
         fields = ['tipo_tarea', 'fecha_realizacion', 'notas', 'foto']
@@ -58,4 +76,23 @@ class TareaRegistradaCreateSerializer(serializers.ModelSerializer):
         """
         # El usuario viene del contexto (request.user)
         validated_data['usuario'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class TareaLoteItemSerializer(serializers.Serializer):
+    """
+    Valida cada elemento de un registro masivo de tareas.
+    El tipo de tarea se recibe como id y se resuelve en lote en la vista
+    para no consultar la base de datos por cada elemento.
+    """
+    tipo_tarea = serializers.IntegerField(min_value=1)
+    fecha_realizacion = serializers.DateField()
+    notas = serializers.CharField(required=False, allow_blank=True, default='')
+    
+    def validate_fecha_realizacion(self, value):
+        """
+        Validar que la fecha de realización no sea futura.
+        """
+        from django.utils import timezone
+        if value > timezone.now().date():
+            raise serializers.ValidationError("La fecha de realización no puede ser futura.")
+        return value
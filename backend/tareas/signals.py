@@ -0,0 +1,62 @@
+# backend/tareas/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from usuarios.models import Usuario
+from .catalogo import invalidar_catalogo
+from .models import MovimientoPuntos, TipoTarea, TareaRegistrada, ResumenDiario, ajustar_totales
+
+
+def _elimina_usuario(origin):
+    """
+    True si el borrado viene en cascada desde un usuario: sus resúmenes
+    se eliminan con él, no hay nada que ajustar.
+    """
+    modelo = getattr(origin, 'model', type(origin))
+    return isinstance(modelo, type) and issubclass(modelo, Usuario)
+
+
+@receiver(post_save, sender=TipoTarea)
+@receiver(post_delete, sender=TipoTarea)
+def tipo_tarea_modificado(sender, **kwargs):
+    """
+    Recargar el catálogo en memoria cuando cambia un tipo de tarea (HU15).
+    Se invalida de inmediato y otra vez al confirmar la transacción, por si
+    otro proceso recargó el catálogo antes de que el cambio fuera visible.
+    """
+    invalidar_catalogo()
+    transaction.on_commit(invalidar_catalogo)
+
+
+@receiver(pre_delete, sender=TareaRegistrada)
+def bloquear_tarea_eliminada(sender, instance, origin=None, **kwargs):
+    """
+    Bloquear la fila antes del DELETE (dentro de su transacción): si otra
+    eliminación concurrente de la misma tarea se confirmó primero, la fila
+    ya no existe y no hay nada que descontar.
+    """
+    if _elimina_usuario(origin):
+        return
+    instance._ya_eliminada = not TareaRegistrada.objects.select_for_update().filter(
+        pk=instance.pk
+    ).exists()
+
+
+@receiver(post_delete, sender=TareaRegistrada)
+def tarea_eliminada(sender, instance, origin=None, **kwargs):
+    """
+    Descontar la tarea eliminada (HU10) de su resumen diario y de los
+    totales del usuario.
+    """
+    if _elimina_usuario(origin) or getattr(instance, '_ya_eliminada', False):
+        return
+    instance.usar_tipo_del_catalogo()
+    ResumenDiario.objects.acumular(
+        instance.usuario_id, instance.fecha_realizacion, instance.tipo_tarea.categoria,
+        -1, -instance.co2_evitado, -instance.puntos_ganados
+    )
+    ajustar_totales(MovimientoPuntos.TIPO_ELIMINACION, instance.pk, [(
+        instance.usuario_id, -instance.puntos_ganados, -instance.co2_evitado,
+        -1 if instance.validada else 0
+    )])
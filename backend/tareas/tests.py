@@ -1,3 +1,602 @@
-from django.test import TestCase
+# backend/tareas/tests.py
 
-# Create your tests here.
+import datetime
+import json
+import threading
+import time
+from decimal import Decimal
+
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, close_old_connections, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from core.trabajos import ejecutar, pendientes
+from gamificacion.logros import Totales, indice_logros, invalidar_logros
+from gamificacion.models import Grupo, Logro, LogroUsuario, MiembroGrupo
+from usuarios.authentication import TokenUsuario
+from usuarios.models import Usuario, nivel_para_puntos
+from .catalogo import catalogo_tipos
+from .management.commands.reconciliar_totales import Command as ReconciliarTotales
+from .models import MovimientoPuntos, SaldoPuntos, TipoTarea, TareaRegistrada, ResumenDiario
+
+
+def crear_tipo(**kwargs):
+    datos = {
+        'nombre': 'Reciclar botellas',
+        'descripcion': 'Reciclar botellas plásticas',
+        'categoria': TipoTarea.CATEGORIA_RECICLAJE,
+        'co2_evitado_por_accion': Decimal('1.25'),
+        'puntos_otorgados': 30,
+    }
+    datos.update(kwargs)
+    return TipoTarea.objects.create(**datos)
+
+
+class AcumulacionPuntosTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        self.tipo = crear_tipo()
+        # Cargar el índice de logros para no contar esa consulta
+        invalidar_logros()
+        indice_logros.cruzados(Totales(0, 0, 0), Totales(0, 0, 0))
+
+    def test_registro_actualiza_totales_con_un_update(self):
+        with self.assertNumQueries(8):
+            # SAVEPOINT, INSERT, movimiento de puntos, resumen diario, UPDATE usuario,
+            # SELECT totales, UPDATE de sus grupos, RELEASE
+            TareaRegistrada.objects.create(
+                usuario=self.usuario, tipo_tarea=self.tipo,
+                fecha_realizacion=datetime.date.today()
+            )
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.puntos_totales, 30)
+
+        for _ in range(3):
+            TareaRegistrada.objects.create(
+                usuario=self.usuario, tipo_tarea=self.tipo,
+                fecha_realizacion=datetime.date.today()
+            )
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.puntos_totales, 120)
+        self.assertEqual(self.usuario.co2_total_evitado, Decimal('5.00'))
+        self.assertEqual(self.usuario.nivel, 2)
+
+    def test_nivel_con_total_negativo(self):
+        # Un total negativo (p. ej. tras eliminar tareas) queda en el nivel 1,
+        # igual en el UPDATE y en los comandos que lo verifican
+        for puntos, nivel in [(-150, 1), (-50, 1), (250, 3)]:
+            Usuario.objects.filter(pk=self.usuario.pk).update(puntos_totales=0)
+            totales = Usuario.objects.acumular(self.usuario.pk, puntos=puntos)
+            self.assertEqual(totales['nivel'], nivel)
+            self.assertEqual(nivel_para_puntos(puntos), nivel)
+
+
+class CatalogoTiposTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        self.tipo = crear_tipo()
+        self.bici = crear_tipo(nombre='Bicicleta', categoria=TipoTarea.CATEGORIA_TRANSPORTE)
+        crear_tipo(nombre='Retirada', activa=False)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_catalogo_desde_memoria_con_etag(self):
+        response = self.client.get('/api/tipos-tarea/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t['nombre'] for t in response.data['results']], ['Reciclar botellas', 'Bicicleta'])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tipos-tarea/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/api/tipos-tarea/?categoria=transporte', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t['id'] for t in response.data['results']], [self.bici.pk])
+
+        # Editar un tipo (p. ej. desde el admin) invalida el catálogo y el ETag
+        self.tipo.puntos_otorgados = 40
+        self.tipo.save()
+        response = self.client.get('/api/tipos-tarea/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['puntos_otorgados'], 40)
+
+    def test_recarga_al_vencer_sin_invalidar(self):
+        catalogo_tipos.huella()
+        # Un cambio que no invalida este proceso (p. ej. hecho en otro worker
+        # con un cache local)
+        TipoTarea.objects.filter(pk=self.tipo.pk).update(puntos_otorgados=45)
+        self.assertEqual(catalogo_tipos.obtener(self.tipo.pk).puntos_otorgados, 30)
+        with self.settings(CATALOGO_MAX_EDAD=-1):
+            self.assertEqual(catalogo_tipos.obtener(self.tipo.pk).puntos_otorgados, 45)
+
+    def test_registro_usa_el_catalogo(self):
+        catalogo_tipos.huella()
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post('/api/tareas/', {
+                'tipo_tarea': self.tipo.pk,
+                'fecha_realizacion': datetime.date.today().isoformat()
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        tablas = ' '.join(c['sql'] for c in consultas.captured_queries)
+        self.assertNotIn(TipoTarea._meta.db_table, tablas)
+
+
+class RegistroLoteTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        self.tipo = crear_tipo()
+        self.otro_tipo = crear_tipo(nombre='Bicicleta', puntos_otorgados=50)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        invalidar_logros()
+        indice_logros.cruzados(Totales(0, 0, 0), Totales(0, 0, 0))
+
+    def test_lote_reporta_resultado_por_elemento(self):
+        hoy = datetime.date.today().isoformat()
+        items = [{'tipo_tarea': self.tipo.pk, 'fecha_realizacion': hoy}] * 90
+        items += [
+            {'tipo_tarea': self.otro_tipo.pk, 'fecha_realizacion': hoy, 'notas': 'ida y vuelta'},
+            {'tipo_tarea': 9999, 'fecha_realizacion': hoy},
+            {'tipo_tarea': self.tipo.pk, 'fecha_realizacion': '2999-01-01'},
+        ]
+
+        # Tipos desde el catálogo en memoria, un INSERT de tareas y otro de
+        # movimientos, UPDATE + SELECT del usuario, UPDATE de sus grupos y
+        # resúmenes diarios
+        catalogo_tipos.huella()
+        with self.assertNumQueries(8):
+            response = self.client.post('/api/tareas/lote/', {'tareas': items}, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['creadas'], 91)
+        self.assertEqual(response.data['errores'], 2)
+        resultados = response.data['resultados']
+        self.assertEqual(resultados[90]['estado'], 'creada')
+        self.assertEqual(resultados[90]['puntos_ganados'], 50)
+        self.assertIn('tipo_tarea', resultados[91]['errores'])
+        self.assertIn('fecha_realizacion', resultados[92]['errores'])
+
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.puntos_totales, 90 * 30 + 50)
+        self.assertEqual(self.usuario.nivel, (90 * 30 + 50) // 100 + 1)
+        self.assertEqual(TareaRegistrada.objects.filter(usuario=self.usuario).count(), 91)
+
+    def test_lote_vacio(self):
+        response = self.client.post('/api/tareas/lote/', {'tareas': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class AcumulacionConcurrenteTests(TransactionTestCase):
+    HILOS = 8
+    TAREAS_POR_HILO = 10
+
+    def setUp(self):
+        invalidar_logros()
+
+    def test_registros_concurrentes_no_pierden_incrementos(self):
+        usuario = Usuario.objects.create(username='concurrente', email='c@test.cl')
+        tipo = crear_tipo()
+        errores = []
+
+        def registrar_una():
+            # Cada hilo usa su propia instancia (y conexión), como lo
+            # harían peticiones paralelas del mismo usuario.
+            propio = Usuario.objects.get(pk=usuario.pk)
+            TareaRegistrada.objects.create(
+                usuario=propio, tipo_tarea=tipo,
+                fecha_realizacion=datetime.date.today()
+            )
+
+        def registrar():
+            try:
+                for _ in range(self.TAREAS_POR_HILO):
+                    while True:
+                        try:
+                            registrar_una()
+                            break
+                        except OperationalError as exc:
+                            # SQLite bloquea la tabla completa: reintentar la transacción
+                            if 'locked' not in str(exc):
+                                raise
+                            time.sleep(0.001)
+            except Exception as exc:  # pragma: no cover - se reporta abajo
+                errores.append(exc)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        hilos = [threading.Thread(target=registrar) for _ in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        total = self.HILOS * self.TAREAS_POR_HILO
+        usuario.refresh_from_db()
+        self.assertEqual(TareaRegistrada.objects.filter(usuario=usuario).count(), total)
+        self.assertEqual(usuario.puntos_totales, total * 30)
+        self.assertEqual(usuario.co2_total_evitado, Decimal('1.25') * total)
+        self.assertEqual(usuario.nivel, total * 30 // 100 + 1)
+
+
+class ResumenDiarioTests(TestCase):
+
+    def setUp(self):
+        invalidar_logros()
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        self.reciclaje = crear_tipo()
+        self.transporte = crear_tipo(
+            nombre='Bicicleta', categoria=TipoTarea.CATEGORIA_TRANSPORTE, puntos_otorgados=50
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def registrar(self, tipo, dias_atras=0):
+        return TareaRegistrada.objects.create(
+            usuario=self.usuario, tipo_tarea=tipo,
+            fecha_realizacion=datetime.date.today() - datetime.timedelta(days=dias_atras)
+        )
+
+    def resumenes(self):
+        return set(ResumenDiario.objects.filter(cantidad_tareas__gt=0).values_list(
+            'fecha', 'categoria', 'cantidad_tareas', 'co2_evitado', 'puntos'
+        ))
+
+    def test_resumen_sigue_creacion_edicion_y_eliminacion(self):
+        self.registrar(self.reciclaje)
+        self.registrar(self.reciclaje)
+        tarea = self.registrar(self.transporte, dias_atras=1)
+
+        tarea.fecha_realizacion = datetime.date.today()
+        tarea.save()
+        self.registrar(self.reciclaje, dias_atras=40).delete()
+
+        hoy = datetime.date.today()
+        self.assertEqual(self.resumenes(), {
+            (hoy, 'reciclaje', 2, Decimal('2.50'), 60),
+            (hoy, 'transporte', 1, Decimal('1.25'), 50),
+        })
+
+        # Los resúmenes mantenidos coinciden con una reconstrucción completa
+        ResumenDiario.objects.reconstruir()
+        self.assertEqual(self.resumenes(), {
+            (hoy, 'reciclaje', 2, Decimal('2.50'), 60),
+            (hoy, 'transporte', 1, Decimal('1.25'), 50),
+        })
+
+    def test_estadisticas_y_serie(self):
+        self.registrar(self.reciclaje)
+        self.registrar(self.transporte)
+        self.registrar(self.transporte, dias_atras=35)
+
+        response = self.client.get('/api/tareas/estadisticas/')
+        estadisticas = response.data['estadisticas']
+        self.assertEqual(estadisticas['total_tareas'], 3)
+        self.assertEqual(estadisticas['total_puntos_ganados'], 130)
+        self.assertEqual(estadisticas['tareas_por_categoria'][0], {
+            'tipo_tarea__categoria': 'transporte', 'cantidad': 2
+        })
+
+        response = self.client.get('/api/tareas/serie/?agrupacion=mes')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(p['cantidad_tareas'] for p in response.data['serie']), 3)
+
+        hoy = datetime.date.today().isoformat()
+        response = self.client.get(f'/api/tareas/serie/?agrupacion=dia&desde={hoy}')
+        self.assertEqual(response.data['serie'], [
+            {'periodo': datetime.date.today(), 'cantidad_tareas': 2, 'co2_evitado': 2.5, 'puntos': 80}
+        ])
+
+        response = self.client.get('/api/tareas/serie/?agrupacion=anio')
+        self.assertEqual(response.status_code, 400)
+
+
+class LibroPuntosTests(TestCase):
+
+    def setUp(self):
+        invalidar_logros()
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        self.otro = Usuario.objects.create(username='beto', email='beto@test.cl')
+        self.tipo = crear_tipo()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def registrar(self):
+        return TareaRegistrada.objects.create(
+            usuario=self.usuario, tipo_tarea=self.tipo, fecha_realizacion=datetime.date.today()
+        )
+
+    def test_edicion_y_eliminacion_ajustan_los_totales(self):
+        tarea = self.registrar()
+        self.registrar()
+
+        # Corrección de puntos (p. ej. desde el admin)
+        tarea.puntos_ganados = 10
+        tarea.save()
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.puntos_totales, 40)
+
+        response = self.client.delete(f'/api/tareas/{tarea.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.puntos_totales, 30)
+        self.assertEqual(self.usuario.co2_total_evitado, Decimal('1.25'))
+
+        self.assertEqual(list(MovimientoPuntos.objects.values_list('tipo', 'puntos')), [
+            ('creacion', 30), ('creacion', 30), ('edicion', -20), ('eliminacion', -10)
+        ])
+        self.assertEqual(MovimientoPuntos.objects.saldo(self.usuario.pk), (30, Decimal('1.25')))
+
+        # Cambiar la tarea de usuario mueve sus puntos
+        tarea = self.registrar()
+        tarea.usuario = self.otro
+        tarea.save()
+        self.assertEqual(MovimientoPuntos.objects.saldos([self.usuario.pk, self.otro.pk]), {
+            self.usuario.pk: (30, Decimal('1.25')),
+            self.otro.pk: (30, Decimal('1.25')),
+        })
+
+    def test_eliminar_dos_veces_descuenta_una(self):
+        tarea = self.registrar()
+        self.registrar()
+        # Dos peticiones que cargaron la misma tarea antes de eliminarla
+        copia = TareaRegistrada.objects.get(pk=tarea.pk)
+        tarea.delete()
+        copia.delete()
+
+        self.assertEqual(MovimientoPuntos.objects.filter(tipo='eliminacion').count(), 1)
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.puntos_totales, 30)
+        self.assertEqual(ResumenDiario.objects.get().cantidad_tareas, 1)
+
+    def test_consolidar_no_cambia_los_saldos(self):
+        self.registrar()
+        self.registrar()
+        consolidadas = SaldoPuntos.objects.consolidar(margen=datetime.timedelta(0))
+        self.assertEqual(consolidadas, 1)
+        self.assertEqual(SaldoPuntos.objects.get().puntos, 60)
+
+        self.registrar().delete()
+        self.registrar()
+        # Solo los movimientos posteriores a la foto
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(MovimientoPuntos.objects.saldo(self.usuario.pk), (90, Decimal('3.75')))
+        self.assertEqual(len(consultas), 2)
+
+        SaldoPuntos.objects.consolidar(margen=datetime.timedelta(0))
+        self.assertEqual(SaldoPuntos.objects.consolidar(margen=datetime.timedelta(0)), 0)
+        self.assertEqual(SaldoPuntos.objects.get().puntos, 90)
+        self.assertEqual(MovimientoPuntos.objects.saldo(self.usuario.pk), (90, Decimal('3.75')))
+
+    def test_verificar_saldos_reporta_diferencias(self):
+        self.registrar()
+        salida = StringIO()
+        call_command('verificar_saldos', stdout=salida)
+        self.assertIn('2 usuarios coinciden', salida.getvalue())
+
+        # Un cambio que no pasa por las tareas
+        Usuario.objects.filter(pk=self.usuario.pk).update(puntos_totales=500)
+        salida = StringIO()
+        with self.assertRaisesMessage(CommandError, '1 de 2 usuarios'):
+            call_command('verificar_saldos', stdout=salida)
+        self.assertIn('ana', salida.getvalue())
+
+    def test_reconciliar_totales(self):
+        self.registrar()
+        self.registrar()
+        Usuario.objects.filter(pk=self.usuario.pk).update(puntos_totales=500, nivel=6)
+
+        salida = StringIO()
+        call_command('reconciliar_totales', '--dry-run', stdout=salida)
+        self.assertIn('1 de 2 usuarios difieren', salida.getvalue())
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.puntos_totales, 500)
+
+        # Lotes de un usuario: una agregación y un bulk_update por lote con cambios
+        with CaptureQueriesContext(connection) as consultas:
+            call_command('reconciliar_totales', '--tamano-lote', '1', stdout=StringIO())
+        self.assertEqual(
+            sum(q['sql'].startswith('UPDATE "usuarios_usuario"') for q in consultas.captured_queries), 1
+        )
+        self.usuario.refresh_from_db()
+        self.assertEqual((self.usuario.puntos_totales, self.usuario.nivel), (60, 1))
+        self.assertEqual(self.usuario.co2_total_evitado, Decimal('2.50'))
+        call_command('verificar_saldos', stdout=StringIO())
+
+    def test_reconciliar_totales_actualiza_grupos_y_logros(self):
+        grupo = Grupo.objects.create(nombre='Barrio', creador=self.otro)
+        MiembroGrupo.objects.create(grupo=grupo, usuario=self.usuario)
+        Logro.objects.create(nombre='50 puntos', descripcion='50 puntos', puntos_requeridos=50)
+        self.registrar()
+        self.registrar()
+        # Totales desviados por debajo de sus tareas
+        Usuario.objects.filter(pk=self.usuario.pk).update(puntos_totales=0, nivel=1)
+        Grupo.objects.filter(pk=grupo.pk).update(puntos_totales=0)
+        LogroUsuario.objects.all().delete()
+
+        call_command('reconciliar_totales', stdout=StringIO())
+        grupo.refresh_from_db()
+        self.assertEqual(grupo.puntos_totales, 60)
+        self.assertTrue(LogroUsuario.objects.filter(usuario=self.usuario, logro__nombre='50 puntos').exists())
+
+    @override_settings(TRABAJOS_INMEDIATOS=False, TRABAJOS_HILOS=0)
+    def test_reconciliar_omite_acumulaciones_pendientes(self):
+        # Una tarea registrada durante la reconciliación: en la suma, pero
+        # aún sin acumular
+        self.registrar()
+        comando = ReconciliarTotales(stdout=StringIO())
+        revisados, diferencias, omitidos = comando.reconciliar_rango(
+            self.usuario.pk, self.otro.pk, {'dry_run': False, 'tamano_lote': 10}
+        )
+        self.assertEqual((revisados, diferencias, omitidos), (2, [], 1))
+
+        for trabajo_id in pendientes():
+            ejecutar(trabajo_id)
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.puntos_totales, 30)
+
+
+class CamposDinamicosTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        tipos = [crear_tipo(nombre=f'Tipo {i}') for i in range(3)]
+        TareaRegistrada.objects.bulk_create([
+            TareaRegistrada(
+                usuario=self.usuario, tipo_tarea=tipos[i % 3],
+                fecha_realizacion=datetime.date.today(), co2_evitado=1, puntos_ganados=10
+            )
+            for i in range(8)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_historial_sin_consultas_por_fila(self):
+        # COUNT + página con usuario y tipo de tarea unidos por JOIN
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/tareas/')
+        tarea = response.data['results'][0]
+        self.assertEqual(tarea['usuario_info']['username'], 'ana')
+        self.assertIn('nombre', tarea['tipo_tarea_info'])
+
+    def test_fields_y_expand(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get('/api/tareas/?fields=id,puntos_ganados')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'puntos_ganados'})
+        self.assertNotIn('JOIN', consultas.captured_queries[-1]['sql'])
+
+        response = self.client.get('/api/tareas/?fields=id,tipo_tarea_info.nombre')
+        self.assertEqual(response.data['results'][0]['tipo_tarea_info'].keys(), {'nombre'})
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get('/api/tareas/?expand=tipo_tarea_info')
+        tarea = response.data['results'][0]
+        self.assertNotIn('usuario_info', tarea)
+        self.assertIn('tipo_tarea_info', tarea)
+        self.assertIn('fecha_realizacion', tarea)
+        sql = consultas.captured_queries[-1]['sql']
+        self.assertIn(TipoTarea._meta.db_table, sql)
+        self.assertNotIn(Usuario._meta.db_table, sql)
+
+
+class ExportacionTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        otro = Usuario.objects.create(username='beto', email='beto@test.cl')
+        self.tipo = crear_tipo()
+        hoy = datetime.date.today()
+        for i, usuario in enumerate([self.usuario, self.usuario, otro]):
+            TareaRegistrada.objects.create(
+                usuario=usuario, tipo_tarea=self.tipo, notas='=HYPERLINK()' if i == 0 else '',
+                fecha_realizacion=hoy - datetime.timedelta(days=i)
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def descargar(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_con_las_tareas_propias(self):
+        with self.settings(EXPORTACION_TAMANO_LOTE=1):
+            contenido = self.descargar('/api/tareas/exportar/')
+        lineas = contenido.splitlines()
+        self.assertEqual(lineas[0].split(',')[:3], ['id', 'fecha_realizacion', 'fecha_registro'])
+        self.assertEqual(len(lineas), 3)
+        self.assertIn("'=HYPERLINK()", lineas[1])
+        self.assertIn('ana,', lineas[1])
+        self.assertNotIn('beto', contenido)
+
+    def test_ndjson_y_resumenes(self):
+        hoy = datetime.date.today()
+        contenido = self.descargar(f'/api/tareas/exportar/?formato=ndjson&desde={hoy.isoformat()}')
+        filas = [json.loads(linea) for linea in contenido.splitlines()]
+        self.assertEqual(len(filas), 1)
+        self.assertEqual(filas[0]['puntos_ganados'], 30)
+        self.assertEqual(filas[0]['categoria'], 'reciclaje')
+
+        self.usuario.is_staff = True
+        self.usuario.save()
+        contenido = self.descargar('/api/tareas/exportar/?formato=ndjson&datos=resumenes')
+        self.assertEqual(len(contenido.splitlines()), 3)
+
+        response = self.client.get('/api/tareas/exportar/?formato=xlsx')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_asgi_entrega_un_iterador_asincrono(self):
+        token = await sync_to_async(lambda: str(TokenUsuario.for_user(self.usuario).access_token))()
+        with self.settings(EXPORTACION_TAMANO_LOTE=1):
+            response = await self.async_client.get(
+                '/api/tareas/exportar/?formato=ndjson', headers={'Authorization': f'Bearer {token}'}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            partes = [parte async for parte in response.streaming_content]
+        self.assertEqual(len(partes), 2)
+        self.assertEqual({json.loads(parte)['usuario'] for parte in partes}, {'ana'})
+
+    def test_accion_del_admin(self):
+        admin = Usuario.objects.create_superuser(username='admin', email='admin@test.cl', password='x')
+        self.client.force_login(admin)
+        response = self.client.post('/admin/tareas/tarearegistrada/', {
+            'action': 'exportar_csv',
+            'select_across': 1,
+            '_selected_action': TareaRegistrada.objects.values_list('pk', flat=True)[:1],
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 4)
+
+
+class HistorialCursorTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl')
+        tipo = crear_tipo()
+        hoy = datetime.date.today()
+        # Varias tareas por día para ejercitar los desempates del cursor
+        TareaRegistrada.objects.bulk_create([
+            TareaRegistrada(
+                usuario=self.usuario, tipo_tarea=tipo,
+                fecha_realizacion=hoy - datetime.timedelta(days=i % 4),
+                co2_evitado=1, puntos_ganados=10
+            )
+            for i in range(25)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_recorre_todo_el_historial_sin_count(self):
+        vistos = []
+        url = '/api/tareas/?paginacion=cursor'
+        while url:
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any('COUNT(' in q['sql'] for q in consultas.captured_queries))
+            vistos += [tarea['id'] for tarea in response.data['results']]
+            url = response.data['next']
+
+        esperado = list(TareaRegistrada.objects.order_by(
+            '-fecha_realizacion', '-fecha_registro', '-id'
+        ).values_list('id', flat=True))
+        self.assertEqual(vistos, esperado)
+
+    def test_cursor_invalido(self):
+        response = self.client.get('/api/tareas/?cursor=no-es-un-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_paginacion_por_defecto_no_cambia(self):
+        response = self.client.get('/api/tareas/')
+        self.assertEqual(response.data['count'], 25)
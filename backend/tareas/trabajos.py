@@ -0,0 +1,26 @@
+# backend/tareas/trabajos.py
+
+import datetime
+from decimal import Decimal
+
+from core.trabajos import trabajo
+from usuarios.models import Usuario
+from .models import ResumenDiario
+
+
+@trabajo('tareas.acumular_registros')
+def acumular_registros(usuarios, resumenes):
+    """
+    Aplicar las tareas recién registradas a los resúmenes diarios (HU12) y
+    a los totales de cada usuario, lo que a su vez otorga logros (HU08) y
+    actualiza sus grupos (HU11) y el ranking (HU07).
+
+    usuarios: [usuario_id, puntos, co2, tareas validadas]
+    resumenes: [usuario_id, fecha, categoria, tareas, co2, puntos]
+    """
+    ResumenDiario.objects.acumular_varios([
+        (usuario_id, datetime.date.fromisoformat(fecha), categoria, cantidad, Decimal(co2), puntos)
+        for usuario_id, fecha, categoria, cantidad, co2, puntos in resumenes
+    ])
+    for usuario_id, puntos, co2, tareas in usuarios:
+        Usuario.objects.acumular(usuario_id, puntos, Decimal(co2), tareas=tareas)
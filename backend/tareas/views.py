@@ -3,15 +3,30 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Sum
-from .models import TipoTarea, TareaRegistrada
+from rest_framework.settings import api_settings
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from core.asincrono import respuesta_json, vista_api_async
+from core.serializers import CamposDinamicosViewSetMixin, seleccion_de_peticion
+from .catalogo import catalogo_tipos
+from .exportacion import COLUMNAS_RESUMENES, COLUMNAS_TAREAS, FORMATOS, respuesta_exportacion
+from .models import TipoTarea, TareaRegistrada, ResumenDiario
+from .paginacion import HistorialCursorPagination
 from .serializers import (
     TipoTareaSerializer,
     TareaRegistradaSerializer,
-    TareaRegistradaCreateSerializer
+    TareaRegistradaCreateSerializer,
+    TareaLoteItemSerializer
 )
 
-class TipoTareaViewSet(viewsets.ReadOnlyModelViewSet):
+class TipoTareaViewSet(CamposDinamicosViewSetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para el catálogo de tipos de tareas (HU15).
     Solo lectura para usuarios normales.
@@ -19,6 +34,7 @@ class TipoTareaViewSet(viewsets.ReadOnlyModelViewSet):
     Endpoints:
     - GET /api/tipos-tarea/ - Listar todos los tipos de tareas
     - GET /api/tipos-tarea/{id}/ - Ver detalle de un tipo de tarea
+    - GET /api/tipos-tarea-async/ - Listado en versión async, para ASGI
     """
     queryset = TipoTarea.objects.filter(activa=True)
     serializer_class = TipoTareaSerializer
@@ -35,19 +51,90 @@ class TipoTareaViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(categoria=categoria)
         
         return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Listar el catálogo desde la copia en memoria del proceso.
+        Responde 304 si el cliente ya tiene la versión vigente (If-None-Match).
+        """
+        etag = _etag_catalogo(catalogo_tipos.huella(), request)
+        
+        if _etag_coincide(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            datos = _proyectar(request, catalogo_tipos.listar(request.query_params.get('categoria', None)))
+            pagina = self.paginate_queryset(datos)
+            if pagina is not None:
+                response = self.get_paginated_response(pagina)
+            else:
+                response = Response(datos)
+        
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+def _etag_catalogo(huella, request):
+    # La URL completa entra en el ETag: la página y los enlaces next/previous dependen de ella
+    return quote_etag(hashlib.sha1(f'{huella}|{request.build_absolute_uri()}'.encode()).hexdigest())
+
 
+def _etag_coincide(request, etag):
+    recibidos = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in recibidos or etag in [e.removeprefix('W/') for e in recibidos]
 
-class TareaRegistradaViewSet(viewsets.ModelViewSet):
+
+def _proyectar(request, datos):
+    """
+    Aplicar ?fields= a los tipos ya serializados del catálogo.
+    """
+    seleccion = seleccion_de_peticion(request)
+    if seleccion is not None and seleccion.campos is not None:
+        return [{k: v for k, v in fila.items() if k in seleccion.campos} for fila in datos]
+    return datos
+
+
+@vista_api_async
+async def tipos_tarea_async(request):
+    """
+    Versión async de GET /api/tipos-tarea/ (HU15), con el mismo ETag y paginación.
+    GET /api/tipos-tarea-async/?categoria=reciclaje
+    """
+    etag = _etag_catalogo(await catalogo_tipos.ahuella(), request)
+    
+    if _etag_coincide(request, etag):
+        response = respuesta_json(None, status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        datos = _proyectar(request, await catalogo_tipos.alistar(request.query_params.get('categoria', None)))
+        paginador = api_settings.DEFAULT_PAGINATION_CLASS()
+        pagina = paginador.paginate_queryset(datos, request)
+        if pagina is not None:
+            response = respuesta_json(paginador.get_paginated_response(pagina).data)
+        else:
+            response = respuesta_json(datos)
+    
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class TareaRegistradaViewSet(CamposDinamicosViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar tareas registradas por usuarios.
     
     Endpoints:
     - GET /api/tareas/ - Listar mis tareas (HU12: Historial)
+    - GET /api/tareas/?paginacion=cursor - Historial paginado por cursor (sin COUNT ni OFFSET)
+    - GET /api/tareas/?fields=id,fecha_realizacion&expand=tipo_tarea_info - Elegir campos y anidados
     - GET /api/tareas/{id}/ - Ver detalle de una tarea
     - POST /api/tareas/ - Registrar nueva tarea (HU04)
     - PUT /api/tareas/{id}/ - Editar tarea (HU10)
     - DELETE /api/tareas/{id}/ - Eliminar tarea (HU10)
+    - POST /api/tareas/lote/ - Registrar varias tareas de una vez (HU04)
     - GET /api/tareas/estadisticas/ - Ver estadísticas personales (HU09)
+    - GET /api/tareas/estadisticas-async/ - Estadísticas en versión async, para ASGI
+    - GET /api/tareas/serie/ - Serie temporal para gráficos (HU09)
+    - GET /api/tareas/exportar/?formato=csv - Exportar el historial o los resúmenes (CSV o NDJSON)
     """
     serializer_class = TareaRegistradaSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -61,6 +148,21 @@ class TareaRegistradaViewSet(viewsets.ModelViewSet):
             return TareaRegistrada.objects.all()
         return TareaRegistrada.objects.filter(usuario=self.request.user)
     
+    @property
+    def paginator(self):
+        """
+        Usar paginación por cursor cuando el cliente la pide con
+        ?paginacion=cursor (o ya envía un cursor); si no, la paginación
+        por número de página configurada globalmente.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params if self.request else {}
+            if params.get('paginacion') == 'cursor' or 'cursor' in params:
+                self._paginator = HistorialCursorPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+    
     def get_serializer_class(self):
         """
         Usar serializer específico para creación.
@@ -87,38 +189,257 @@ class TareaRegistradaViewSet(viewsets.ModelViewSet):
             'co2_evitado': float(tarea.co2_evitado)
         }, status=status.HTTP_201_CREATED)
     
+    @action(detail=False, methods=['post'], url_path='lote')
+    def lote(self, request):
+        """
+        Registrar varias tareas en una sola petición (HU04).
+        Pensado para clientes que acumulan acciones sin conexión.
+        POST /api/tareas/lote/
+        Body: { "tareas": [ { "tipo_tarea": 1, "fecha_realizacion": "2025-01-01", "notas": "" }, ... ] }
+        """
+        items = request.data.get('tareas') if isinstance(request.data, dict) else request.data
+        
+        if not isinstance(items, list) or not items:
+            return Response({
+                'error': 'Debes enviar una lista de tareas'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(items) > settings.TAREAS_LOTE_MAXIMO:
+            return Response({
+                'error': f'Máximo {settings.TAREAS_LOTE_MAXIMO} tareas por lote'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Validar cada elemento por separado para reportar errores por índice
+        resultados = [None] * len(items)
+        validos = {}
+        for indice, item in enumerate(items):
+            serializer = TareaLoteItemSerializer(data=item)
+            if serializer.is_valid():
+                validos[indice] = serializer.validated_data
+            else:
+                resultados[indice] = {'indice': indice, 'estado': 'error', 'errores': serializer.errors}
+        
+        # Resolver los tipos de tarea desde el catálogo en memoria, sin consultas
+        tipos = catalogo_tipos.en_bulk(
+            {datos['tipo_tarea'] for datos in validos.values()}
+        )
+        
+        tareas = []
+        indices = []
+        for indice, datos in validos.items():
+            tipo = tipos.get(datos['tipo_tarea'])
+            if tipo is None:
+                resultados[indice] = {
+                    'indice': indice,
+                    'estado': 'error',
+                    'errores': {'tipo_tarea': ['Tipo de tarea no disponible.']}
+                }
+                continue
+            tareas.append(TareaRegistrada(
+                usuario=request.user,
+                tipo_tarea=tipo,
+                fecha_realizacion=datos['fecha_realizacion'],
+                notas=datos['notas']
+            ))
+            indices.append(indice)
+        
+        if tareas:
+            TareaRegistrada.objects.registrar_lote(tareas)
+        
+        for indice, tarea in zip(indices, tareas):
+            resultados[indice] = {
+                'indice': indice,
+                'estado': 'creada',
+                'id': tarea.pk,
+                'puntos_ganados': tarea.puntos_ganados,
+                'co2_evitado': float(tarea.co2_evitado)
+            }
+        
+        creadas = len(tareas)
+        errores = len(items) - creadas
+        if errores == 0:
+            codigo = status.HTTP_201_CREATED
+        elif creadas == 0:
+            codigo = status.HTTP_400_BAD_REQUEST
+        else:
+            codigo = status.HTTP_207_MULTI_STATUS
+        
+        return Response({
+            'message': f'{creadas} tareas registradas, {errores} con errores',
+            'creadas': creadas,
+            'errores': errores,
+            'puntos_ganados': sum(t.puntos_ganados for t in tareas),
+            'co2_evitado': float(sum(t.co2_evitado for t in tareas)),
+            'resultados': resultados
+        }, status=codigo)
+    
+    def get_resumenes(self):
+        """
+        Resúmenes diarios visibles: los propios, o todos para administradores.
+        """
+        return _resumenes_visibles(self.request.user)
+    
     @action(detail=False, methods=['get'], url_path='estadisticas')
     def estadisticas(self, request):
         """
         Obtener estadísticas del usuario (HU09).
         GET /api/tareas/estadisticas/
+        Se calculan desde los resúmenes diarios, sin recorrer el historial.
         """
-        usuario = request.user
-        tareas = self.get_queryset()
+        resumenes = self.get_resumenes()
+        totales = resumenes.aggregate(**_TOTALES_ESTADISTICAS)
+        por_categoria = list(_tareas_por_categoria(resumenes))
+        return Response(_cuerpo_estadisticas(request.user, totales, por_categoria))
+    
+    @action(detail=False, methods=['get'], url_path='serie')
+    def serie(self, request):
+        """
+        Serie temporal de actividad para gráficos semanales o mensuales (HU09).
+        GET /api/tareas/serie/?desde=2025-01-01&hasta=2025-03-31&agrupacion=semana&categoria=reciclaje
+        agrupacion: dia, semana (por defecto) o mes. Por defecto, los últimos 90 días.
+        """
+        agrupaciones = {'dia': None, 'semana': TruncWeek, 'mes': TruncMonth}
+        agrupacion = request.query_params.get('agrupacion', 'semana')
+        if agrupacion not in agrupaciones:
+            return Response({
+                'error': 'agrupacion debe ser dia, semana o mes'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Calcular estadísticas
-        total_tareas = tareas.count()
-        total_co2 = tareas.aggregate(Sum('co2_evitado'))['co2_evitado__sum'] or 0
-        total_puntos = tareas.aggregate(Sum('puntos_ganados'))['puntos_ganados__sum'] or 0
+        try:
+            hasta = _fecha_param(request, 'hasta', timezone.localdate())
+            desde = _fecha_param(request, 'desde', hasta - datetime.timedelta(days=90))
+        except ValueError:
+            return Response({
+                'error': 'Las fechas deben tener formato AAAA-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Tareas por categoría
-        from django.db.models import Count
-        por_categoria = tareas.values(
-            'tipo_tarea__categoria'
-        ).annotate(
-            cantidad=Count('id')
-        ).order_by('-cantidad')
+        if desde > hasta:
+            return Response({
+                'error': 'desde no puede ser posterior a hasta'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        resumenes = self.get_resumenes().filter(fecha__range=(desde, hasta))
+        categoria = request.query_params.get('categoria')
+        if categoria:
+            resumenes = resumenes.filter(categoria=categoria)
+        
+        truncar = agrupaciones[agrupacion]
+        periodo = truncar('fecha') if truncar else F('fecha')
+        filas = resumenes.values(periodo=periodo).annotate(
+            cantidad_tareas=Sum('cantidad_tareas'),
+            co2_evitado=Sum('co2_evitado'),
+            puntos=Sum('puntos')
+        ).order_by('periodo')
         
         return Response({
-            'usuario': {
-                'username': usuario.username,
-                'nivel': usuario.nivel,
-                'puntos_totales': usuario.puntos_totales
-            },
-            'estadisticas': {
-                'total_tareas': total_tareas,
-                'total_co2_evitado': float(total_co2),
-                'total_puntos_ganados': total_puntos,
-                'tareas_por_categoria': list(por_categoria)
-            }
-        })
\ No newline at end of file
+            'agrupacion': agrupacion,
+            'desde': desde,
+            'hasta': hasta,
+            'serie': [
+                {
+                    'periodo': fila['periodo'],
+                    'cantidad_tareas': fila['cantidad_tareas'],
+                    'co2_evitado': float(fila['co2_evitado'] or 0),
+                    'puntos': fila['puntos']
+                }
+                for fila in filas
+            ]
+        })
+    
+    @action(detail=False, methods=['get'], url_path='exportar')
+    def exportar(self, request):
+        """
+        Descargar el historial completo (HU12) o los resúmenes diarios (HU09).
+        GET /api/tareas/exportar/?formato=ndjson&datos=resumenes&desde=2025-01-01&hasta=2025-12-31
+        formato: csv (por defecto) o ndjson. datos: tareas (por defecto) o resumenes.
+        Los administradores exportan los de todos los usuarios.
+        """
+        formato = request.query_params.get('formato', 'csv')
+        datos = request.query_params.get('datos', 'tareas')
+        if formato not in FORMATOS or datos not in ('tareas', 'resumenes'):
+            return Response({
+                'error': 'formato debe ser csv o ndjson y datos, tareas o resumenes'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            desde = _fecha_param(request, 'desde', None)
+            hasta = _fecha_param(request, 'hasta', None)
+        except ValueError:
+            return Response({
+                'error': 'Las fechas deben tener formato AAAA-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if datos == 'tareas':
+            # Mismo orden que el historial, servido por su índice
+            queryset = self.get_queryset().order_by('-fecha_realizacion', '-fecha_registro', '-id')
+            campo_fecha, columnas = 'fecha_realizacion', COLUMNAS_TAREAS
+        else:
+            queryset = self.get_resumenes().filter(cantidad_tareas__gt=0).order_by('-fecha', 'usuario_id', 'categoria')
+            campo_fecha, columnas = 'fecha', COLUMNAS_RESUMENES
+        if desde:
+            queryset = queryset.filter(**{f'{campo_fecha}__gte': desde})
+        if hasta:
+            queryset = queryset.filter(**{f'{campo_fecha}__lte': hasta})
+        
+        return respuesta_exportacion(request, queryset, columnas, formato, f'ecopoints-{datos}')
+
+
+def _resumenes_visibles(usuario):
+    if usuario.is_staff:
+        return ResumenDiario.objects.order_by()
+    return ResumenDiario.objects.filter(usuario=usuario).order_by()
+
+
+_TOTALES_ESTADISTICAS = {
+    'total_tareas': Sum('cantidad_tareas'),
+    'total_co2': Sum('co2_evitado'),
+    'total_puntos': Sum('puntos'),
+}
+
+
+def _tareas_por_categoria(resumenes):
+    return resumenes.values('categoria').annotate(
+        cantidad=Sum('cantidad_tareas')
+    ).filter(cantidad__gt=0).order_by('-cantidad')
+
+
+def _cuerpo_estadisticas(usuario, totales, por_categoria):
+    return {
+        'usuario': {
+            'username': usuario.username,
+            'nivel': usuario.nivel,
+            'puntos_totales': usuario.puntos_totales
+        },
+        'estadisticas': {
+            'total_tareas': totales['total_tareas'] or 0,
+            'total_co2_evitado': float(totales['total_co2'] or 0),
+            'total_puntos_ganados': totales['total_puntos'] or 0,
+            'tareas_por_categoria': [
+                {'tipo_tarea__categoria': fila['categoria'], 'cantidad': fila['cantidad']}
+                for fila in por_categoria
+            ]
+        }
+    }
+
+
+@vista_api_async
+async def estadisticas_async(request):
+    """
+    Versión async de GET /api/tareas/estadisticas/ (HU09).
+    GET /api/tareas/estadisticas-async/
+    """
+    await request.user.acargar_totales()
+    resumenes = _resumenes_visibles(request.user)
+    totales = await resumenes.aaggregate(**_TOTALES_ESTADISTICAS)
+    por_categoria = [fila async for fila in _tareas_por_categoria(resumenes)]
+    return respuesta_json(_cuerpo_estadisticas(request.user, totales, por_categoria))
+
+
+def _fecha_param(request, nombre, por_defecto):
+    """
+    Leer una fecha AAAA-MM-DD de la query string.
+    """
+    valor = request.query_params.get(nombre)
+    if not valor:
+        return por_defecto
+    return datetime.date.fromisoformat(valor)
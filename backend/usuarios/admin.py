@@ -18,6 +18,6 @@ class UsuarioAdmin(UserAdmin):
             'fields': ('rol', 'fecha_nacimiento', 'telefono', 'avatar')
         }),
         ('Gamificación', {
-            'fields': ('puntos_totales', 'nivel', 'co2_total_evitado')
+            'fields': ('puntos_totales', 'nivel', 'co2_total_evitado', 'tareas_validadas')
         }),
     )
\ No newline at end of file
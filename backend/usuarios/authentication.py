@@ -0,0 +1,235 @@
+# backend/usuarios/authentication.py
+
+"""
+Autenticación JWT sin consultar la base de datos en cada petición (HU02).
+
+Los tokens emitidos por `TokenUsuario` llevan como claims los datos que usan
+los permisos y la mayoría de las vistas (id, username, rol, is_staff, activo)
+y una huella de las credenciales. Con ellos `ClaimsJWTAuthentication`
+construye un Usuario liviano; el resto de sus campos se completa, solo si
+la vista los usa, desde una copia en memoria del usuario.
+
+La copia en memoria de cada usuario dura como máximo
+`JWT_USUARIO_CACHE_SEGUNDOS` y se descarta antes si cambia su versión
+compartida en el cache (al guardarlo o al cambiar sus totales). Si cambian
+la contraseña, el rol, los permisos o el estado de la cuenta, la huella deja
+de coincidir y los tokens anteriores se rechazan.
+"""
+
+import hashlib
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.medicion import tramo
+
+# Campos del usuario que viajan como claims en el token
+CAMPOS_CLAIMS = ('username', 'rol', 'is_staff', 'activo')
+
+
+def _clave_version(usuario_id):
+    return f'usuario:{usuario_id}:version'
+
+
+def huella_credenciales(usuario):
+    """
+    Hash corto de los datos que, si cambian, deben invalidar los tokens emitidos.
+    """
+    datos = '|'.join(str(valor) for valor in (
+        usuario.password, usuario.is_active, usuario.is_superuser,
+        *(getattr(usuario, campo) for campo in CAMPOS_CLAIMS)
+    ))
+    return hashlib.sha256(datos.encode()).hexdigest()[:16]
+
+
+class TokenUsuario(RefreshToken):
+    """
+    Refresh token con los claims del usuario. El access token derivado
+    (y los que emite /api/token/refresh/) los copia.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for campo in CAMPOS_CLAIMS:
+            token[campo] = getattr(user, campo)
+        token['ver'] = huella_credenciales(user)
+        return token
+
+
+class UsuariosEnMemoria:
+    """
+    Copia por proceso de los usuarios que han hecho peticiones recientemente.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usuarios = {}
+
+    def obtener(self, usuario_id):
+        """
+        Retorna el Usuario completo (compartido, no debe modificarse) o
+        None si ya no existe.
+        """
+        from .models import Usuario
+
+        usuario, version = self._vigente(usuario_id)
+        if usuario is not None:
+            return usuario
+        return self._guardar(usuario_id, version, Usuario.objects.filter(pk=usuario_id).first())
+
+    async def aobtener(self, usuario_id):
+        """
+        Como `obtener`, con el ORM async si hay que cargar el usuario.
+        """
+        from .models import Usuario
+
+        usuario, version = self._vigente(usuario_id)
+        if usuario is not None:
+            return usuario
+        return self._guardar(usuario_id, version, await Usuario.objects.filter(pk=usuario_id).afirst())
+
+    def _vigente(self, usuario_id):
+        """
+        Retorna (usuario en memoria o None si hay que cargarlo, versión actual).
+        """
+        version = cache.get(_clave_version(usuario_id))
+        entrada = self._usuarios.get(usuario_id)
+        if entrada is not None:
+            expira, version_cargada, usuario = entrada
+            if version_cargada == version and time.monotonic() < expira:
+                return usuario, version
+        return None, version
+
+    def _guardar(self, usuario_id, version, usuario):
+        with self._lock:
+            if usuario is None:
+                self._usuarios.pop(usuario_id, None)
+                return None
+            if len(self._usuarios) >= settings.JWT_USUARIOS_EN_MEMORIA:
+                # Descartar el más antiguo (los dict mantienen el orden de inserción)
+                self._usuarios.pop(next(iter(self._usuarios)), None)
+            self._usuarios.pop(usuario_id, None)
+            expira = time.monotonic() + settings.JWT_USUARIO_CACHE_SEGUNDOS
+            self._usuarios[usuario_id] = (expira, version, usuario)
+        return usuario
+    
+    def descartar(self, usuario_id):
+        with self._lock:
+            self._usuarios.pop(usuario_id, None)
+
+
+def invalidar_usuario(usuario_id):
+    """
+    Forzar a todos los procesos a recargar el usuario en su próxima petición.
+    """
+    usuarios_en_memoria.descartar(usuario_id)
+    try:
+        cache.incr(_clave_version(usuario_id))
+    except ValueError:
+        cache.set(_clave_version(usuario_id), 1, timeout=None)
+
+
+def usuario_desde_claims(token, completo):
+    """
+    Usuario con solo los campos de los claims; el resto queda diferido y
+    se completa desde `completo` al primer acceso (ver Usuario.refresh_from_db).
+    """
+    from .models import Usuario
+
+    valores = {'id': completo.pk, 'is_active': True, **{campo: token[campo] for campo in CAMPOS_CLAIMS}}
+    # from_db espera los valores en el orden de los campos del modelo
+    campos = [f.attname for f in Usuario._meta.concrete_fields if f.attname in valores]
+    usuario = Usuario.from_db(router.db_for_read(Usuario), campos, [valores[campo] for campo in campos])
+    usuario.__dict__['_origen_claims'] = completo
+    return usuario
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication que construye el usuario desde los claims del token.
+    Los tokens emitidos antes de agregar los claims se resuelven como antes,
+    cargando el usuario desde la base de datos.
+    """
+
+    def authenticate(self, request):
+        # Tiempo de autenticación de la petición (ver core.medicion)
+        with tramo('autenticacion'):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if 'ver' not in validated_token:
+            return super().get_user(validated_token)
+
+        usuario_id = self._usuario_id(validated_token)
+        return self._verificar(validated_token, usuarios_en_memoria.obtener(usuario_id))
+
+    async def aauthenticate(self, request):
+        """
+        Versión de `authenticate` para vistas async (ver core.asincrono):
+        solo consulta la base de datos, con el ORM async, si el usuario no
+        está en memoria.
+        """
+        with tramo('autenticacion'):
+            return await self._aautenticar(request)
+
+    async def _aautenticar(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if 'ver' not in validated_token:
+            return await sync_to_async(super().get_user)(validated_token), validated_token
+
+        usuario_id = self._usuario_id(validated_token)
+        completo = await usuarios_en_memoria.aobtener(usuario_id)
+        return self._verificar(validated_token, completo), validated_token
+
+    def _usuario_id(self, validated_token):
+        from .models import Usuario
+
+        try:
+            return Usuario._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise AuthenticationFailed(_("Token contained no recognizable user identification"))
+
+    def _verificar(self, validated_token, completo):
+        if completo is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not completo.is_active or not completo.activo:
+            raise AuthenticationFailed('Esta cuenta está desactivada', code='user_inactive')
+        if huella_credenciales(completo) != validated_token['ver']:
+            raise AuthenticationFailed(
+                'La sesión ya no es válida, inicia sesión nuevamente', code='token_revocado'
+            )
+
+        return usuario_desde_claims(validated_token, completo)
+
+
+class TokenEnQueryAuthentication(ClaimsJWTAuthentication):
+    """
+    EventSource (el stream de eventos) no permite enviar encabezados:
+    acepta además el access token en ?token=.
+    """
+
+    def get_header(self, request):
+        header = super().get_header(request)
+        token = request.GET.get('token')
+        if header is None and token:
+            return f'{api_settings.AUTH_HEADER_TYPES[0]} {token}'.encode()
+        return header
+
+
+usuarios_en_memoria = UsuariosEnMemoria()
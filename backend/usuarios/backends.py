@@ -0,0 +1,121 @@
+# backend/usuarios/backends.py
+
+"""
+Autenticación por email o username (HU02).
+
+El usuario se busca con una sola consulta que usa los índices de username
+(único) y de email. En la ruta asíncrona la verificación de la contraseña,
+que es deliberadamente costosa (PBKDF2), se ejecuta en un pool de hilos
+acotado para no bloquear el bucle de eventos. hashlib libera el GIL mientras
+calcula el hash, por lo que los hilos sí trabajan en paralelo.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+
+
+class VerificacionSaturada(Exception):
+    """
+    El pool de verificación de contraseñas tiene la cola llena.
+    """
+
+
+def consulta_login(identificador):
+    """
+    Usuarios cuyo username o email coincide con `identificador`.
+    """
+    Usuario = get_user_model()
+    return Usuario._default_manager.filter(
+        Q(username=identificador) | Q(email=identificador)
+    ).order_by()
+
+
+def elegir_usuario(candidatos, identificador):
+    """
+    Entre los resultados de `consulta_login` prefiere el que coincide por
+    username. El email no es único: si lo comparten varias cuentas no se
+    puede saber cuál es y retorna None.
+    """
+    por_email = []
+    for usuario in candidatos:
+        if usuario.username == identificador:
+            return usuario
+        por_email.append(usuario)
+    return por_email[0] if len(por_email) == 1 else None
+
+
+class VerificadorContrasenas:
+    """
+    Pool de hilos acotado para verificar contraseñas desde código asíncrono.
+    Si ya hay `LOGIN_HASH_COLA_MAXIMA` verificaciones en curso o en espera
+    se rechaza la siguiente en lugar de acumular latencia.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._cupos = None
+
+    def _iniciar(self):
+        with self._lock:
+            if self._pool is None:
+                self._cupos = threading.BoundedSemaphore(settings.LOGIN_HASH_COLA_MAXIMA)
+                self._pool = ThreadPoolExecutor(
+                    max_workers=settings.LOGIN_HASH_HILOS,
+                    thread_name_prefix='login-hash'
+                )
+
+    async def ejecutar(self, funcion, *args):
+        if self._pool is None:
+            self._iniciar()
+        if not self._cupos.acquire(blocking=False):
+            raise VerificacionSaturada()
+        futuro = self._pool.submit(funcion, *args)
+        # El cupo se libera cuando termina el hilo, aunque se cancele la petición
+        futuro.add_done_callback(lambda _: self._cupos.release())
+        return await asyncio.wrap_future(futuro)
+
+
+verificador_contrasenas = VerificadorContrasenas()
+
+
+class EmailOUsuarioBackend(ModelBackend):
+    """
+    Acepta como identificador el email o el username, tanto en el login
+    de la API como en el del admin.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        identificador = email or username or kwargs.get(get_user_model().USERNAME_FIELD)
+        if not identificador or password is None:
+            return None
+
+        usuario = elegir_usuario(consulta_login(identificador), identificador)
+        if usuario is None:
+            # Calcular un hash igualmente para no revelar qué cuentas existen
+            get_user_model()().set_password(password)
+            return None
+        if usuario.check_password(password) and self.user_can_authenticate(usuario):
+            return usuario
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, email=None, **kwargs):
+        identificador = email or username or kwargs.get(get_user_model().USERNAME_FIELD)
+        if not identificador or password is None:
+            return None
+
+        candidatos = [usuario async for usuario in consulta_login(identificador)]
+        usuario = elegir_usuario(candidatos, identificador)
+        if usuario is None:
+            await verificador_contrasenas.ejecutar(get_user_model()().set_password, password)
+            return None
+        valida = await verificador_contrasenas.ejecutar(usuario.check_password, password)
+        if valida and self.user_can_authenticate(usuario):
+            return usuario
+        return None
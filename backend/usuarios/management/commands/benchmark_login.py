@@ -0,0 +1,122 @@
+# backend/usuarios/management/commands/benchmark_login.py
+
+import asyncio
+import queue
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+from core.benchmark import base_de_datos_temporal, tabla
+from usuarios.models import Usuario
+
+CONTRASENA = 'clave-benchmark'
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula una ráfaga de inicios de sesión y compara el login síncrono "
+        "(un worker ocupado por petición mientras se calcula el hash) con el "
+        "login asíncrono (hash en un pool de hilos acotado). Usa una base de "
+        "datos temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intentos', type=int, default=48, help="Inicios de sesión de la ráfaga")
+        parser.add_argument('--workers', type=int, default=4, help="Workers síncronos simulados")
+
+    def handle(self, *args, **options):
+        with base_de_datos_temporal():
+            cuerpos = self.poblar(options['intentos'])
+            filas = [
+                self.rafaga_sincrona(cuerpos, options['workers']),
+                self.rafaga_asincrona(cuerpos),
+            ]
+
+        self.stdout.write(
+            f"{options['intentos']} inicios de sesión simultáneos, "
+            f"{settings.LOGIN_HASH_HILOS} hilos de hash en la ruta asíncrona\n"
+        )
+        self.stdout.write(tabla(filas, [
+            'ruta', 'concurrencia', 'exitosos', 'rechazados', 'logins_s', 'mediana_ms', 'p95_ms'
+        ]))
+
+    def poblar(self, cantidad):
+        # Un solo hash para todas las cuentas: calcularlo es justo lo que se mide
+        clave = make_password(CONTRASENA)
+        Usuario.objects.bulk_create([
+            Usuario(username=f'alumno{i}', email=f'alumno{i}@colegio.cl', password=clave)
+            for i in range(cantidad)
+        ])
+        # Mitad por email y mitad por username
+        return [
+            {'email': f'alumno{i}@colegio.cl', 'password': CONTRASENA} if i % 2 else
+            {'username': f'alumno{i}', 'password': CONTRASENA}
+            for i in range(cantidad)
+        ]
+
+    def rafaga_sincrona(self, cuerpos, workers):
+        pendientes = queue.Queue()
+        for cuerpo in cuerpos:
+            pendientes.put(cuerpo)
+        resultados = []
+        inicio = time.perf_counter()
+
+        def worker():
+            cliente = APIClient()
+            try:
+                while True:
+                    try:
+                        cuerpo = pendientes.get_nowait()
+                    except queue.Empty:
+                        return
+                    response = cliente.post('/api/usuarios/login/', cuerpo, format='json')
+                    resultados.append((response.status_code, time.perf_counter() - inicio))
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=worker) for _ in range(workers)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return self.resumir('sincrona', workers, resultados, time.perf_counter() - inicio)
+
+    def rafaga_asincrona(self, cuerpos):
+        async def rafaga():
+            cliente = AsyncClient()
+            inicio = time.perf_counter()
+
+            async def login(cuerpo):
+                response = await cliente.post(
+                    '/api/usuarios/login-async/', cuerpo, content_type='application/json'
+                )
+                return response.status_code, time.perf_counter() - inicio
+
+            resultados = await asyncio.gather(*(login(cuerpo) for cuerpo in cuerpos))
+            return resultados, time.perf_counter() - inicio
+
+        resultados, duracion = asyncio.run(rafaga())
+        return self.resumir('asincrona', len(cuerpos), resultados, duracion)
+
+    def resumir(self, ruta, concurrencia, resultados, duracion):
+        """
+        Las latencias se cuentan desde el inicio de la ráfaga: incluyen el
+        tiempo que cada petición esperó a un worker o al pool.
+        """
+        latencias = sorted(t * 1000 for codigo, t in resultados if codigo == 200)
+        exitosos = len(latencias)
+        return {
+            'ruta': ruta,
+            'concurrencia': concurrencia,
+            'exitosos': exitosos,
+            'rechazados': sum(1 for codigo, _ in resultados if codigo == 503),
+            'logins_s': exitosos / duracion if duracion else 0.0,
+            'mediana_ms': statistics.median(latencias) if latencias else 0.0,
+            'p95_ms': latencias[min(exitosos - 1, int(exitosos * 0.95))] if latencias else 0.0,
+        }
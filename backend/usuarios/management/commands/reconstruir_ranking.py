@@ -0,0 +1,28 @@
+# backend/usuarios/management/commands/reconstruir_ranking.py
+
+from django.core.management.base import BaseCommand
+from usuarios.ranking import aviso_cache_local, indice_ranking, invalidar_ranking
+
+
+class Command(BaseCommand):
+    help = (
+        "Repobla el índice del ranking desde la tabla de usuarios e invalida "
+        "la versión compartida para que los demás procesos también lo reconstruyan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help="Cantidad de posiciones a mostrar al terminar"
+        )
+
+    def handle(self, *args, **options):
+        invalidar_ranking()
+        total = indice_ranking.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"Ranking reconstruido con {total} usuarios activos"))
+        aviso = aviso_cache_local()
+        if aviso:
+            self.stdout.write(self.style.WARNING(aviso))
+
+        for posicion, usuario_id, puntos in indice_ranking.top(options['top']):
+            self.stdout.write(f"  {posicion:>4}. usuario {usuario_id} - {puntos} puntos")
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('usuarios', '0002_alter_usuario_managers'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(models.OrderBy(models.F('puntos_totales'), descending=True), models.F('id'), condition=models.Q(('activo', True)), name='usuario_ranking_activos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['email'], name='usuario_email_idx'),
+        ),
+    ]
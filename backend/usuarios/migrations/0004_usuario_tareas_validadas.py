@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:23
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def contar_tareas_validadas(apps, schema_editor):
+    # Contador inicial de cada usuario, guardado por tramos de 1000 usuarios
+    TareaRegistrada = apps.get_model('tareas', 'TareaRegistrada')
+    Usuario = apps.get_model('usuarios', 'Usuario')
+    filas = TareaRegistrada.objects.filter(validada=True).order_by().values('usuario_id').annotate(
+        cantidad=Count('id')
+    )
+    lote = []
+    for fila in filas.iterator(chunk_size=1000):
+        lote.append(Usuario(pk=fila['usuario_id'], tareas_validadas=fila['cantidad']))
+        if len(lote) == 1000:
+            Usuario.objects.bulk_update(lote, ['tareas_validadas'])
+            lote = []
+    Usuario.objects.bulk_update(lote, ['tareas_validadas'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_indices_consultas'),
+        ('tareas', '0006_libro_puntos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='tareas_validadas',
+            field=models.IntegerField(default=0, help_text='Tareas validadas registradas por el usuario (para los logros)'),
+        ),
+        migrations.RunPython(contar_tareas_validadas, migrations.RunPython.noop),
+    ]
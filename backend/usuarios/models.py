@@ -1,7 +1,65 @@
 # backend/usuarios/models.py
 
-from django.contrib.auth.models import AbstractUser
+from decimal import Decimal
+
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+
+# Totales que cambian con cada acumulación, posiblemente en otro proceso
+CAMPOS_TOTALES = ('puntos_totales', 'nivel', 'co2_total_evitado', 'tareas_validadas')
+
+
+def nivel_para_puntos(puntos):
+    """
+    Nivel que corresponde a un total de puntos: cada 100 puntos = 1 nivel,
+    desde el nivel 1. Un total negativo (tras eliminar tareas) queda en 1.
+    """
+    return max(puntos, 0) // 100 + 1
+
+
+class UsuarioManager(UserManager):
+    
+    def acumular(self, usuario_id, puntos=0, co2=0, tareas=0):
+        """
+        Suma puntos y CO₂ a un usuario y recalcula su nivel en un único
+        UPDATE evaluado por la base de datos, por lo que los registros
+        concurrentes del mismo usuario no pierden incrementos.
+        `tareas` es la cantidad de tareas validadas que suma (o resta) el
+        cambio, para el contador que usan los logros (HU08).
+        Retorna los totales actualizados.
+        """
+        co2 = Decimal(str(co2))
+        nuevos_puntos = F('puntos_totales') + puntos
+        self.filter(pk=usuario_id).update(
+            puntos_totales=nuevos_puntos,
+            co2_total_evitado=F('co2_total_evitado') + co2,
+            tareas_validadas=F('tareas_validadas') + tareas,
+            # Misma fórmula que nivel_para_puntos: sin negativos, la división
+            # entera de SQL (que trunca hacia cero) coincide con //
+            nivel=Greatest(nuevos_puntos, 0) / 100 + 1,
+            ultima_actualizacion=timezone.now(),
+        )
+        totales = next(iter(self.filter(pk=usuario_id).values(
+            'puntos_totales', 'co2_total_evitado', 'nivel', 'tareas_validadas', 'activo'
+        )), None)
+        
+        if totales is not None:
+            from .signals import totales_actualizados
+            totales_actualizados.send(
+                sender=self.model,
+                usuario_id=usuario_id,
+                totales=totales,
+                puntos=puntos,
+                co2=co2,
+                tareas=tareas,
+            )
+        return totales
+
 
 class Usuario(AbstractUser):
     """
@@ -63,6 +121,11 @@ class Usuario(AbstractUser):
         help_text="Total de kg de CO₂ evitados por el usuario"
     )
     
+    tareas_validadas = models.IntegerField(
+        default=0,
+        help_text="Tareas validadas registradas por el usuario (para los logros)"
+    )
+    
     # Metadatos
     fecha_creacion = models.DateTimeField(
         auto_now_add=True,
@@ -79,10 +142,22 @@ class Usuario(AbstractUser):
         help_text="Indica si el usuario está activo en el sistema"
     )
     
+    objects = UsuarioManager()
+    
     class Meta:
         verbose_name = "Usuario"
         verbose_name_plural = "Usuarios"
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Ranking (HU07): solo usuarios activos, ordenados por puntos
+            models.Index(
+                F('puntos_totales').desc(), 'id',
+                condition=models.Q(activo=True),
+                name='usuario_ranking_activos_idx'
+            ),
+            # Login por email (HU02)
+            models.Index(fields=['email'], name='usuario_email_idx'),
+        ]
     
     def __str__(self):
         return f"{self.username} - {self.get_rol_display()}"
@@ -92,14 +167,70 @@ class Usuario(AbstractUser):
         Calcula el nivel del usuario basado en sus puntos.
         Cada 100 puntos = 1 nivel.
         """
-        self.nivel = (self.puntos_totales // 100) + 1
+        self.nivel = nivel_para_puntos(self.puntos_totales)
         self.save()
         return self.nivel
     
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        """
+        Un usuario construido desde los claims del JWT (ver
+        usuarios.authentication) solo trae algunos campos. Al acceder a
+        cualquiera de los demás se completan todos de una vez desde la
+        copia en memoria, sin consultar la base de datos, salvo los totales:
+        la copia puede tener hasta JWT_USUARIO_CACHE_SEGUNDOS y los totales
+        cambian en cualquier proceso, así que se leen de la base de datos.
+        """
+        origen = self.__dict__.get('_origen_claims')
+        diferidos = self.get_deferred_fields()
+        if origen is not None and fields is not None and set(fields) <= diferidos:
+            totales = diferidos.intersection(CAMPOS_TOTALES)
+            if totales.intersection(fields):
+                super().refresh_from_db(using=using, fields=list(totales))
+                return
+            for campo in diferidos - totales:
+                valor = origen.__dict__[campo]
+                # Los archivos quedan ligados a su instancia: copiar solo el nombre
+                self.__dict__[campo] = valor.name if isinstance(valor, FieldFile) else valor
+            return
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+    def cargar_totales(self):
+        """
+        Leer los totales de la base de datos si aún no están cargados.
+        """
+        diferidos = self.get_deferred_fields().intersection(CAMPOS_TOTALES)
+        if diferidos:
+            self.refresh_from_db(fields=list(diferidos))
+
+    async def acargar_totales(self):
+        """
+        `cargar_totales` para vistas async, con el ORM async.
+        """
+        diferidos = self.get_deferred_fields().intersection(CAMPOS_TOTALES)
+        if diferidos:
+            await self.arefresh_from_db(fields=list(diferidos))
+
+    def save(self, *args, **kwargs):
+        # Con campos diferidos (usuario de los claims) Django solo guarda los
+        # cargados: cargar la fecha para que auto_now también se guarde
+        if not self._state.adding and 'ultima_actualizacion' in self.get_deferred_fields():
+            self.ultima_actualizacion = timezone.now()
+        super().save(*args, **kwargs)
+    
     def agregar_puntos(self, puntos):
         """
         Agrega puntos al usuario y recalcula su nivel.
         """
-        self.puntos_totales += puntos
-        self.calcular_nivel()
-        return self.puntos_totales
\ No newline at end of file
+        return self.acumular_totales(puntos=puntos)
+    
+    def acumular_totales(self, puntos=0, co2=0, tareas=0):
+        """
+        Suma puntos y CO₂ de forma atómica (ver UsuarioManager.acumular)
+        y refleja los nuevos totales en esta instancia.
+        """
+        totales = Usuario.objects.acumular(self.pk, puntos=puntos, co2=co2, tareas=tareas)
+        if totales is not None:
+            self.puntos_totales = totales['puntos_totales']
+            self.co2_total_evitado = totales['co2_total_evitado']
+            self.nivel = totales['nivel']
+        return self.puntos_totales
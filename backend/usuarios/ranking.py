@@ -0,0 +1,301 @@
+# backend/usuarios/ranking.py
+
+"""
+Índice del ranking global mantenido incrementalmente (HU07).
+
+En lugar de ordenar todos los usuarios activos en cada consulta, se mantiene
+en memoria una lista de saltos indexable ordenada por (-puntos, id). Todas las
+operaciones (insertar, eliminar, obtener la posición de un usuario y acceder
+por índice) cuestan O(log n).
+
+El índice es local a cada proceso. Para que varios workers no diverjan:
+- Se reconstruye si la versión compartida en el cache cambia
+  (ver `invalidar_ranking` y el comando `reconstruir_ranking`).
+- Se reconstruye si supera `RANKING_MAX_EDAD` segundos de antigüedad.
+"""
+
+import math
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+CACHE_VERSION_KEY = 'ranking:version'
+
+# 2^24 usuarios antes de que la lista empiece a degradarse
+NIVELES_MAXIMOS = 24
+
+
+class _Nodo:
+    __slots__ = ('valor', 'siguientes', 'anchos')
+
+    def __init__(self, valor, niveles):
+        self.valor = valor
+        self.siguientes = [None] * niveles
+        # anchos[n] = cantidad de nodos del nivel 0 que se saltan al seguir siguientes[n]
+        self.anchos = [0] * niveles
+
+
+class ListaSaltosIndexada:
+    """
+    Lista de saltos ("skiplist") con anchos por enlace, lo que permite
+    calcular posiciones y acceder por índice en tiempo logarítmico.
+    Los valores deben ser comparables entre sí (aquí, tuplas).
+    """
+
+    def __init__(self):
+        self._cola = _Nodo((math.inf,), NIVELES_MAXIMOS)
+        self._cabeza = _Nodo(None, NIVELES_MAXIMOS)
+        for nivel in range(NIVELES_MAXIMOS):
+            self._cabeza.siguientes[nivel] = self._cola
+            self._cabeza.anchos[nivel] = 1
+        self._tamano = 0
+
+    def __len__(self):
+        return self._tamano
+
+    def _nodo_en(self, indice):
+        if not 0 <= indice < self._tamano:
+            raise IndexError(indice)
+        nodo = self._cabeza
+        restantes = indice + 1
+        for nivel in reversed(range(NIVELES_MAXIMOS)):
+            while nodo.anchos[nivel] <= restantes:
+                restantes -= nodo.anchos[nivel]
+                nodo = nodo.siguientes[nivel]
+        return nodo
+
+    def __getitem__(self, indice):
+        return self._nodo_en(indice).valor
+
+    def rango(self, inicio, fin):
+        """
+        Retorna los valores entre las posiciones [inicio, fin).
+        """
+        inicio = max(inicio, 0)
+        fin = min(fin, self._tamano)
+        if inicio >= fin:
+            return []
+        nodo = self._nodo_en(inicio)
+        valores = []
+        for _ in range(fin - inicio):
+            valores.append(nodo.valor)
+            nodo = nodo.siguientes[0]
+        return valores
+
+    def insertar(self, valor):
+        cadena = [None] * NIVELES_MAXIMOS
+        pasos_en_nivel = [0] * NIVELES_MAXIMOS
+        nodo = self._cabeza
+        for nivel in reversed(range(NIVELES_MAXIMOS)):
+            while nodo.siguientes[nivel].valor <= valor:
+                pasos_en_nivel[nivel] += nodo.anchos[nivel]
+                nodo = nodo.siguientes[nivel]
+            cadena[nivel] = nodo
+
+        # Altura geométrica: cada nivel adicional con probabilidad 1/2
+        altura = min(NIVELES_MAXIMOS, 1 - int(math.log(1.0 - random.random(), 2.0)))
+        nuevo = _Nodo(valor, altura)
+        pasos = 0
+        for nivel in range(altura):
+            anterior = cadena[nivel]
+            nuevo.siguientes[nivel] = anterior.siguientes[nivel]
+            anterior.siguientes[nivel] = nuevo
+            nuevo.anchos[nivel] = anterior.anchos[nivel] - pasos
+            anterior.anchos[nivel] = pasos + 1
+            pasos += pasos_en_nivel[nivel]
+        for nivel in range(altura, NIVELES_MAXIMOS):
+            cadena[nivel].anchos[nivel] += 1
+        self._tamano += 1
+
+    def eliminar(self, valor):
+        cadena = [None] * NIVELES_MAXIMOS
+        nodo = self._cabeza
+        for nivel in reversed(range(NIVELES_MAXIMOS)):
+            while nodo.siguientes[nivel].valor < valor:
+                nodo = nodo.siguientes[nivel]
+            cadena[nivel] = nodo
+
+        objetivo = cadena[0].siguientes[0]
+        if objetivo.valor != valor:
+            raise KeyError(valor)
+
+        altura = len(objetivo.siguientes)
+        for nivel in range(altura):
+            anterior = cadena[nivel]
+            anterior.anchos[nivel] += objetivo.anchos[nivel] - 1
+            anterior.siguientes[nivel] = objetivo.siguientes[nivel]
+        for nivel in range(altura, NIVELES_MAXIMOS):
+            cadena[nivel].anchos[nivel] -= 1
+        self._tamano -= 1
+
+    def posicion(self, valor):
+        """
+        Retorna la posición (base 0) de `valor`.
+        """
+        nodo = self._cabeza
+        pasos = 0
+        for nivel in reversed(range(NIVELES_MAXIMOS)):
+            while nodo.siguientes[nivel].valor < valor:
+                pasos += nodo.anchos[nivel]
+                nodo = nodo.siguientes[nivel]
+        if nodo.siguientes[0].valor != valor:
+            raise KeyError(valor)
+        return pasos
+
+
+class IndiceRanking:
+    """
+    Ranking de usuarios activos ordenado por puntos (mayor a menor).
+    Los empates se resuelven por id ascendente para que las posiciones
+    sean estables.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._lista = None
+        self._claves = {}
+        self._version = None
+        self._construido_en = 0.0
+
+    @staticmethod
+    def _clave(usuario_id, puntos):
+        return (-puntos, usuario_id)
+
+    def reconstruir(self):
+        """
+        Repoblar el índice desde la tabla de usuarios.
+        """
+        from .models import Usuario
+
+        filas = Usuario.objects.filter(activo=True).values_list('id', 'puntos_totales')
+        with self._lock:
+            lista = ListaSaltosIndexada()
+            claves = {}
+            for usuario_id, puntos in filas.iterator(chunk_size=2000):
+                clave = self._clave(usuario_id, puntos)
+                lista.insertar(clave)
+                claves[usuario_id] = clave
+            self._lista = lista
+            self._claves = claves
+            self._version = cache.get(CACHE_VERSION_KEY)
+            self._construido_en = time.monotonic()
+        return len(claves)
+
+    def _vencido(self):
+        max_edad = getattr(settings, 'RANKING_MAX_EDAD', 300)
+        return (
+            self._lista is None
+            or cache.get(CACHE_VERSION_KEY) != self._version
+            or time.monotonic() - self._construido_en > max_edad
+        )
+
+    def _asegurar_vigente(self):
+        if self._vencido():
+            self.reconstruir()
+
+    def actualizar(self, usuario_id, puntos, activo=True):
+        """
+        Reflejar el nuevo puntaje de un usuario. Si el índice aún no se ha
+        construido no hace nada: la primera consulta lo cargará completo.
+        """
+        with self._lock:
+            if self._lista is None:
+                return
+            anterior = self._claves.pop(usuario_id, None)
+            if anterior is not None:
+                self._lista.eliminar(anterior)
+            if activo:
+                clave = self._clave(usuario_id, puntos)
+                self._lista.insertar(clave)
+                self._claves[usuario_id] = clave
+
+    def eliminar(self, usuario_id):
+        self.actualizar(usuario_id, 0, activo=False)
+
+    def total(self):
+        with self._lock:
+            self._asegurar_vigente()
+            return len(self._lista)
+
+    def top(self, k):
+        """
+        Retorna [(posicion, usuario_id, puntos), ...] de los primeros k.
+        """
+        with self._lock:
+            self._asegurar_vigente()
+            return self._expandir(0, self._lista.rango(0, k))
+
+    async def atop(self, k):
+        """
+        `top` para vistas async: si hay que reconstruir el índice, se hace
+        en un hilo para no bloquear el event loop.
+        """
+        if self._vencido():
+            await sync_to_async(self.reconstruir)()
+        with self._lock:
+            return self._expandir(0, self._lista.rango(0, k))
+
+    def posicion(self, usuario_id):
+        """
+        Posición (base 1) del usuario o None si no está en el ranking.
+        """
+        with self._lock:
+            self._asegurar_vigente()
+            clave = self._claves.get(usuario_id)
+            if clave is None:
+                return None
+            return self._lista.posicion(clave) + 1
+
+    def vecindario(self, usuario_id, n):
+        """
+        Retorna la posición del usuario y los n usuarios por encima y por
+        debajo de él como [(posicion, usuario_id, puntos), ...], o
+        (None, []) si el usuario no está en el ranking.
+        """
+        with self._lock:
+            self._asegurar_vigente()
+            clave = self._claves.get(usuario_id)
+            if clave is None:
+                return None, []
+            indice = self._lista.posicion(clave)
+            inicio = max(indice - n, 0)
+            return indice + 1, self._expandir(inicio, self._lista.rango(inicio, indice + n + 1))
+
+    @staticmethod
+    def _expandir(inicio, claves):
+        return [
+            (inicio + desplazamiento + 1, usuario_id, -puntos_negativos)
+            for desplazamiento, (puntos_negativos, usuario_id) in enumerate(claves)
+        ]
+
+
+def invalidar_ranking():
+    """
+    Forzar a todos los procesos que comparten el cache a reconstruir su índice.
+    """
+    try:
+        cache.incr(CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(CACHE_VERSION_KEY, 1, timeout=None)
+
+
+def aviso_cache_local():
+    """
+    Con un cache local a cada proceso, `invalidar_ranking` desde un comando
+    no llega a los workers: retorna un aviso para mostrar, o None.
+    """
+    if not isinstance(caches['default'], LocMemCache):
+        return None
+    return (
+        "El cache es local a cada proceso: los workers reconstruirán su ranking "
+        f"en a lo más {settings.RANKING_MAX_EDAD} segundos (configura un "
+        "CACHE_BACKEND compartido para que sea inmediato)"
+    )
+
+
+indice_ranking = IndiceRanking()
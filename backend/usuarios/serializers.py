@@ -2,9 +2,10 @@
 
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
+from core.serializers import CamposDinamicosMixin
 from .models import Usuario
 
-class UsuarioSerializer(serializers.ModelSerializer):
+class UsuarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializer básico para mostrar información de usuarios.
     Se usa en listados y consultas.
@@ -20,6 +21,20 @@ class UsuarioSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'puntos_totales', 'nivel', 'co2_total_evitado', 'fecha_creacion']
 
 
+class UsuarioRankingSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    """
+    Serializer público para mostrar a otros usuarios en el ranking.
+    No expone datos de contacto.
+    """
+    class Meta:
+        model = Usuario
+        fields = [
+            'id', 'username', 'first_name', 'last_name', 'avatar',
+            'puntos_totales', 'nivel', 'co2_total_evitado'
+        ]
+        read_only_fields = fields
+
+
 class UsuarioRegistroSerializer(serializers.ModelSerializer):
     """
     Serializer para el registro de nuevos usuarios (HU01).
@@ -83,7 +98,7 @@ class UsuarioRegistroSerializer(serializers.ModelSerializer):
         return usuario
 
 
-class UsuarioPerfilSerializer(serializers.ModelSerializer):
+class UsuarioPerfilSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """
     Serializer para ver y editar el perfil completo del usuario autenticado.
     """
@@ -106,12 +121,17 @@ class UsuarioPerfilSerializer(serializers.ModelSerializer):
     
     def get_tareas_completadas(self, obj):
         """
-        Retorna el número de tareas completadas por el usuario.
+        Retorna el número de tareas completadas por el usuario
+        (o el ya calculado por la vista, ver perfil_async).
         """
+        if hasattr(obj, 'num_tareas_completadas'):
+            return obj.num_tareas_completadas
         return obj.tareas_registradas.filter(validada=True).count()
     
     def get_logros_obtenidos_count(self, obj):
         """
         Retorna el número de logros obtenidos.
         """
+        if hasattr(obj, 'num_logros_obtenidos'):
+            return obj.num_logros_obtenidos
         return obj.logros_obtenidos.count()
\ No newline at end of file
@@ -0,0 +1,96 @@
+# backend/usuarios/signals.py
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from core.eventos import canal_eventos
+from .authentication import invalidar_usuario
+from .models import Usuario
+from .ranking import indice_ranking
+
+# Se envía cada vez que cambian los puntos/CO₂ de un usuario mediante
+# UsuarioManager.acumular. Argumentos: usuario_id, totales (dict con
+# puntos_totales, co2_total_evitado, nivel, tareas_validadas y activo),
+# puntos, co2 y tareas (deltas).
+totales_actualizados = Signal()
+
+
+@receiver(post_save, sender=Usuario)
+def actualizar_ranking(sender, instance, update_fields=None, **kwargs):
+    """
+    Mantener el índice del ranking al día cuando se guarda un usuario
+    (registro, edición en el admin, desactivación, etc.), en este proceso y
+    en los demás.
+    """
+    # Si el guardado no incluyó los puntos (un usuario de los claims del JWT
+    # con los totales diferidos, o update_fields sin ellos), los de la
+    # instancia pueden no ser los de la base de datos: solo se refleja una
+    # desactivación
+    if (
+        'puntos_totales' in instance.get_deferred_fields()
+        or (update_fields is not None and 'puntos_totales' not in update_fields)
+    ):
+        if not instance.activo and (update_fields is None or 'activo' in update_fields):
+            indice_ranking.eliminar(instance.pk)
+            publicar_ranking(instance.pk, 0, False)
+        return
+    indice_ranking.actualizar(instance.pk, instance.puntos_totales, instance.activo)
+    publicar_ranking(instance.pk, instance.puntos_totales, instance.activo)
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def recargar_usuario_autenticado(sender, instance, **kwargs):
+    """
+    Descartar la copia en memoria que usa la autenticación JWT, para que la
+    desactivación o el cambio de contraseña se apliquen en la siguiente
+    petición (ver usuarios.authentication).
+    """
+    invalidar_usuario(instance.pk)
+
+
+@receiver(post_delete, sender=Usuario)
+def quitar_del_ranking(sender, instance, **kwargs):
+    indice_ranking.eliminar(instance.pk)
+    publicar_ranking(instance.pk, 0, False)
+
+
+@receiver(totales_actualizados)
+def actualizar_ranking_por_totales(sender, usuario_id, totales, **kwargs):
+    indice_ranking.actualizar(usuario_id, totales['puntos_totales'], totales['activo'])
+    invalidar_usuario(usuario_id)
+
+
+@receiver(totales_actualizados)
+def publicar_totales(sender, usuario_id, totales, puntos=0, **kwargs):
+    """
+    Avisar a los streams en vivo del usuario y, si cambió su puntaje, a los
+    del ranking (ver core.eventos).
+    """
+    canal_eventos.publicar(f'usuario:{usuario_id}', 'puntos', {
+        'puntos_totales': totales['puntos_totales'],
+        'nivel': totales['nivel'],
+        'co2_total_evitado': totales['co2_total_evitado'],
+    })
+    if puntos:
+        publicar_ranking(usuario_id, totales['puntos_totales'], totales['activo'])
+
+
+def publicar_ranking(usuario_id, puntos_totales, activo):
+    """
+    Avisar del nuevo puntaje (o de la salida del ranking, con activo=False)
+    a los streams del ranking y a los índices de todos los procesos.
+    """
+    canal_eventos.publicar('ranking', 'ranking', {
+        'usuario_id': usuario_id,
+        'puntos_totales': puntos_totales,
+        'activo': activo,
+    })
+
+
+def _actualizar_indice(evento):
+    # Los cambios publicados por otros procesos también llegan al índice de este
+    datos = evento['datos']
+    indice_ranking.actualizar(datos['usuario_id'], datos['puntos_totales'], datos['activo'])
+
+
+canal_eventos.escuchar('ranking', _actualizar_indice)
@@ -1,3 +1,280 @@
-from django.test import TestCase
+# backend/usuarios/tests.py
 
-# Create your tests here.
+import random
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, override_settings
+from rest_framework.test import APIClient, APIRequestFactory
+from core.eventos import canal_eventos
+from .authentication import ClaimsJWTAuthentication, TokenUsuario
+from .models import Usuario
+from .ranking import ListaSaltosIndexada, indice_ranking
+
+
+class ListaSaltosIndexadaTests(TestCase):
+
+    def test_mantiene_orden_y_posiciones(self):
+        lista = ListaSaltosIndexada()
+        valores = list(range(500))
+        random.shuffle(valores)
+        for valor in valores:
+            lista.insertar((valor,))
+        for valor in valores[:200]:
+            lista.eliminar((valor,))
+
+        esperado = sorted(valores[200:])
+        self.assertEqual(len(lista), len(esperado))
+        self.assertEqual(lista.rango(0, len(lista)), [(v,) for v in esperado])
+        for indice, valor in enumerate(esperado):
+            self.assertEqual(lista[indice], (valor,))
+            self.assertEqual(lista.posicion((valor,)), indice)
+
+
+class RankingTests(TestCase):
+
+    def setUp(self):
+        self.usuarios = [
+            Usuario.objects.create(
+                username=f'user{i}', email=f'user{i}@test.cl', puntos_totales=i * 10
+            )
+            for i in range(20)
+        ]
+        indice_ranking.reconstruir()
+        self.client = APIClient()
+
+    def test_posicion_y_vecinos(self):
+        usuario = self.usuarios[10]  # 100 puntos -> posición 10
+        self.client.force_authenticate(usuario)
+        response = self.client.get('/api/usuarios/ranking/mi-posicion/?vecinos=2')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['posicion'], 10)
+        self.assertEqual(response.data['total_usuarios'], 20)
+        self.assertEqual(
+            [v['username'] for v in response.data['vecinos']],
+            ['user12', 'user11', 'user10', 'user9', 'user8']
+        )
+        self.assertNotIn('email', response.data['vecinos'][0])
+
+    def test_se_actualiza_al_guardar(self):
+        usuario = self.usuarios[0]
+        usuario.puntos_totales = 1000
+        usuario.save()
+        self.assertEqual(indice_ranking.posicion(usuario.pk), 1)
+
+        usuario.activo = False
+        usuario.save()
+        self.assertIsNone(indice_ranking.posicion(usuario.pk))
+
+    def test_guardar_y_eliminar_avisan_a_los_demas_procesos(self):
+        usuario = self.usuarios[0]
+        usuario_id = usuario.pk
+        recibidos = []
+        canal_eventos.escuchar('ranking', recibidos.append)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                usuario.puntos_totales = 1000
+                usuario.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                usuario.delete()
+        finally:
+            canal_eventos._oyentes['ranking'].remove(recibidos.append)
+
+        self.assertEqual([evento['datos'] for evento in recibidos], [
+            {'usuario_id': usuario_id, 'puntos_totales': 1000, 'activo': True},
+            {'usuario_id': usuario_id, 'puntos_totales': 0, 'activo': False},
+        ])
+        self.assertIsNone(indice_ranking.posicion(usuario_id))
+
+    def test_top_para_admin(self):
+        admin = Usuario.objects.create_superuser(
+            username='admin', email='admin@test.cl', password='clave-segura-123'
+        )
+        self.client.force_authenticate(admin)
+        response = self.client.get('/api/usuarios/ranking/?limite=3')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([u['username'] for u in response.data], ['user19', 'user18', 'user17'])
+
+    def test_reconstruir_avisa_si_el_cache_es_local(self):
+        salida = StringIO()
+        call_command('reconstruir_ranking', '--top', '1', stdout=salida)
+        self.assertIn('Ranking reconstruido con 20 usuarios activos', salida.getvalue())
+        # Los tests usan el cache de memoria local por defecto
+        self.assertIn('El cache es local a cada proceso', salida.getvalue())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(
+            username='ana', email='ana@test.cl', password=make_password('clave-segura-123')
+        )
+        self.client = APIClient()
+
+    def test_login_por_email_o_username_con_una_consulta(self):
+        for cuerpo in ({'email': 'ana@test.cl'}, {'username': 'ana'}):
+            with self.assertNumQueries(1):
+                response = self.client.post(
+                    '/api/usuarios/login/', {**cuerpo, 'password': 'clave-segura-123'}, format='json'
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['usuario']['id'], self.usuario.pk)
+            self.assertIn('access', response.data['tokens'])
+
+        response = self.client.post(
+            '/api/usuarios/login/', {'email': 'ana@test.cl', 'password': 'otra'}, format='json'
+        )
+        self.assertEqual(response.status_code, 401)
+
+        self.usuario.activo = False
+        self.usuario.save()
+        response = self.client.post(
+            '/api/usuarios/login/', {'username': 'ana', 'password': 'clave-segura-123'}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+
+    async def test_login_asincrono(self):
+        cliente = AsyncClient()
+        response = await cliente.post(
+            '/api/usuarios/login-async/',
+            {'email': 'ana@test.cl', 'password': 'clave-segura-123'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['usuario']['username'], 'ana')
+
+        response = await cliente.post(
+            '/api/usuarios/login-async/',
+            {'email': 'nadie@test.cl', 'password': 'clave-segura-123'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+class ClaimsJWTTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl', puntos_totales=40)
+        self.access = TokenUsuario.for_user(self.usuario).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def test_campos_de_los_claims_en_su_lugar(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        usuario, _ = ClaimsJWTAuthentication().authenticate(request)
+        self.assertIs(usuario.is_staff, False)
+        self.assertIs(usuario.is_active, True)
+        self.assertEqual((usuario.username, usuario.rol), ('ana', Usuario.ROL_USUARIO))
+        # Un usuario común no pasa IsAdminUser
+        self.assertEqual(self.client.get('/api/usuarios/').status_code, 403)
+
+    def test_usuario_desde_claims_sin_consultas(self):
+        # La primera petición carga el usuario (y el catálogo) en memoria
+        self.assertEqual(self.client.get('/api/tipos-tarea/').status_code, 200)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/tipos-tarea/').status_code, 200)
+
+        # Los totales (siempre desde la base de datos) y los contadores del
+        # perfil (tareas y logros); el resto del usuario sale de la memoria
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/usuarios/perfil/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'ana@test.cl')
+        self.assertEqual(response.data['puntos_totales'], 40)
+
+        # Los cambios de totales se reflejan en la siguiente petición
+        Usuario.objects.acumular(self.usuario.pk, puntos=60)
+        response = self.client.get('/api/usuarios/perfil/')
+        self.assertEqual(response.data['puntos_totales'], 100)
+
+    def test_totales_no_salen_de_la_copia_en_memoria(self):
+        indice_ranking.reconstruir()
+        self.assertEqual(self.client.get('/api/usuarios/perfil/').data['puntos_totales'], 40)
+        antes = Usuario.objects.values_list('ultima_actualizacion', flat=True).get(pk=self.usuario.pk)
+
+        # Una acumulación en otro proceso: su invalidación no llega a la
+        # copia en memoria de este
+        Usuario.objects.filter(pk=self.usuario.pk).update(puntos_totales=500, nivel=6)
+        indice_ranking.actualizar(self.usuario.pk, 500, True)
+
+        response = self.client.patch('/api/usuarios/perfil/editar/', {'telefono': '+56911111111'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['usuario']['puntos_totales'], response.data['usuario']['nivel']), (500, 6))
+        self.assertEqual(indice_ranking.posicion(self.usuario.pk), 1)
+        usuario = Usuario.objects.get(pk=self.usuario.pk)
+        self.assertEqual((usuario.puntos_totales, usuario.telefono), (500, '+56911111111'))
+        self.assertGreater(usuario.ultima_actualizacion, antes)
+
+    def test_desactivar_o_cambiar_contrasena_revoca_el_token(self):
+        self.assertEqual(self.client.get('/api/usuarios/perfil/').status_code, 200)
+
+        self.usuario.activo = False
+        self.usuario.save()
+        self.assertEqual(self.client.get('/api/usuarios/perfil/').status_code, 401)
+
+        self.usuario.activo = True
+        self.usuario.set_unusable_password()
+        self.usuario.save()
+        response = self.client.get('/api/usuarios/perfil/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'token_revocado')
+
+
+class EventosTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username='ana', email='ana@test.cl', puntos_totales=40)
+        Usuario.objects.create(username='beto', email='beto@test.cl', puntos_totales=90)
+        self.url = f'/api/usuarios/eventos/?token={TokenUsuario.for_user(self.usuario).access_token}'
+        indice_ranking.reconstruir()
+
+    @override_settings(EVENTOS_DURACION_MAXIMA=0)
+    async def test_estado_inicial_y_cierre(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        contenido = b''.join([parte async for parte in response.streaming_content])
+        self.assertIn(b'event: puntos\ndata: {"puntos_totales":40,"nivel":1', contenido)
+        self.assertIn(b'event: ranking\ndata: [{"posicion":1,"id":', contenido)
+        self.assertEqual(canal_eventos.conexiones(), 0)
+
+    @override_settings(EVENTOS_DURACION_MAXIMA=0.5)
+    async def test_envia_los_eventos_publicados(self):
+        response = await self.async_client.get(self.url)
+        partes = response.streaming_content
+        for _ in range(3):
+            # retry, puntos y ranking iniciales
+            await partes.__anext__()
+
+        canal_eventos.difundir({
+            'tema': f'usuario:{self.usuario.pk}', 'tipo': 'puntos', 'clave': 'puntos',
+            'datos': {'puntos_totales': 70, 'nivel': 1, 'co2_total_evitado': '0.00'}
+        })
+        self.assertEqual(
+            await partes.__anext__(),
+            b'event: puntos\ndata: {"puntos_totales":70,"nivel":1,"co2_total_evitado":"0.00"}\n\n'
+        )
+        # Al cumplirse la duración máxima el stream termina y libera la suscripción
+        self.assertEqual([parte async for parte in partes], [b': latido\n\n'])
+        self.assertEqual(canal_eventos.conexiones(), 0)
+
+    async def test_respuesta_sin_recorrer_no_ocupa_cupo(self):
+        # Un cliente que se desconecta antes de recibir el cuerpo
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        self.assertEqual(canal_eventos.conexiones(), 0)
+
+    @override_settings(EVENTOS_CONEXIONES_POR_USUARIO=0)
+    def test_limite_de_conexiones(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 429)
+
+    def test_sin_token(self):
+        self.assertEqual(self.client.get('/api/usuarios/eventos/').status_code, 401)
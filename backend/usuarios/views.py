@@ -1,18 +1,258 @@
 # backend/usuarios/views.py
 
+import json
+import time
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
+from django.conf import settings
+from django.contrib.auth import aauthenticate, authenticate
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.utils.encoders import JSONEncoder
+from core.asincrono import respuesta_json, vista_api_async
+from core.eventos import ConexionesAgotadas, canal_eventos
+from core.renderers import JSONRapidoRenderer
+from core.serializacion import compilado
+from core.serializers import CamposDinamicosViewSetMixin
+from .authentication import TokenEnQueryAuthentication, TokenUsuario
+from .backends import VerificacionSaturada
 from .models import Usuario
+from .ranking import indice_ranking
 from .serializers import (
     UsuarioSerializer,
     UsuarioRegistroSerializer,
-    UsuarioPerfilSerializer
+    UsuarioPerfilSerializer,
+    UsuarioRankingSerializer
 )
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+def _credenciales_login(datos):
+    """
+    Extraer (identificador, password, error) del cuerpo de un login (HU02).
+    El identificador es el email o, si no viene, el username.
+    """
+    password = datos.get('password')
+    identificador = datos.get('email') or datos.get('username')
+    
+    if not password:
+        return None, None, 'Por favor proporciona la contraseña'
+    
+    if not identificador:
+        return None, None, 'Por favor proporciona email o username'
+    
+    return identificador, password, None
+
+
+def _respuesta_login(usuario):
+    """
+    Cuerpo y código HTTP de la respuesta de login para el usuario autenticado
+    (o None si las credenciales no son válidas).
+    """
+    if usuario is None:
+        return {'error': 'Credenciales inválidas'}, status.HTTP_401_UNAUTHORIZED
+    
+    if not usuario.activo:
+        return {'error': 'Esta cuenta está desactivada'}, status.HTTP_403_FORBIDDEN
+    
+    # Generar tokens JWT
+    refresh = TokenUsuario.for_user(usuario)
+    
+    return {
+        'message': 'Inicio de sesión exitoso',
+        'usuario': UsuarioSerializer(usuario).data,
+        'tokens': {
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+        }
+    }, status.HTTP_200_OK
+
+
+@csrf_exempt
+@require_POST
+async def login_async(request):
+    """
+    Iniciar sesión sin ocupar un worker mientras se verifica la contraseña (HU02).
+    POST /api/usuarios/login-async/
+    Mismo cuerpo y respuesta que /api/usuarios/login/. El hash se calcula en
+    un pool de hilos acotado; si está saturado responde 503.
+    """
+    if request.content_type == 'application/json':
+        try:
+            datos = json.loads(request.body or b'{}')
+        except ValueError:
+            datos = None
+        if not isinstance(datos, dict):
+            return JsonResponse({'error': 'JSON inválido'}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        datos = request.POST
+    
+    identificador, password, error = _credenciales_login(datos)
+    if error:
+        return JsonResponse({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        usuario = await aauthenticate(request, username=identificador, password=password)
+    except VerificacionSaturada:
+        response = JsonResponse({
+            'error': 'Demasiados inicios de sesión simultáneos, intenta de nuevo'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '1'
+        return response
+    
+    cuerpo, codigo = _respuesta_login(usuario)
+    return JsonResponse(cuerpo, status=codigo, encoder=JSONEncoder)
+
+
+@vista_api_async
+async def perfil_async(request):
+    """
+    Versión async de GET /api/usuarios/perfil/.
+    GET /api/usuarios/perfil-async/
+    """
+    usuario = request.user
+    await usuario.acargar_totales()
+    serializer = UsuarioPerfilSerializer(usuario, context={'request': request})
+    # Los contadores se consultan con el ORM async antes de serializar
+    if 'tareas_completadas' in serializer.fields:
+        usuario.num_tareas_completadas = await usuario.tareas_registradas.filter(validada=True).acount()
+    if 'logros_obtenidos_count' in serializer.fields:
+        usuario.num_logros_obtenidos = await usuario.logros_obtenidos.acount()
+    return respuesta_json(serializer.data)
+
+
+@vista_api_async(permisos=[permissions.IsAdminUser])
+async def ranking_async(request):
+    """
+    Versión async de GET /api/usuarios/ranking/.
+    GET /api/usuarios/ranking-async/?limite=100
+    """
+    limite = _entero_param(request, 'limite', 100, settings.RANKING_LIMITE_MAXIMO)
+    ids = [usuario_id for _, usuario_id, _ in await indice_ranking.atop(limite)]
+    usuarios = await compilado(UsuarioSerializer).aserializar_por_pk(Usuario.objects.filter(pk__in=ids))
+    return respuesta_json([usuarios[i] for i in ids if i in usuarios])
+
+
+@vista_api_async(autenticacion=TokenEnQueryAuthentication)
+async def eventos_async(request):
+    """
+    Stream de eventos en vivo (Server-Sent Events), en lugar de consultar
+    perfil y ranking periódicamente (HU07, HU08). Requiere ASGI.
+    GET /api/usuarios/eventos/  (Authorization: Bearer ... o ?token=...)
+    
+    Eventos:
+    - puntos: puntos_totales, nivel y co2_total_evitado del usuario (al
+      conectarse y cada vez que cambian)
+    - logro: cada logro nuevo del usuario
+    - ranking: el top del ranking cuando cambia, como máximo cada
+      EVENTOS_RANKING_INTERVALO segundos
+    - reconectar: el cliente no alcanzó a leer los eventos, o se agotó el
+      cupo de conexiones al empezar el stream; debe reconectarse
+    El stream se cierra tras EVENTOS_DURACION_MAXIMA segundos y EventSource
+    se reconecta solo.
+    """
+    usuario = request.user
+    try:
+        canal_eventos.verificar_cupo(usuario.pk)
+    except ConexionesAgotadas as exc:
+        if exc.por_usuario:
+            return respuesta_json({
+                'error': 'Tienes demasiadas conexiones de eventos abiertas'
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        return respuesta_json({
+            'error': 'Demasiadas conexiones de eventos, intenta de nuevo'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '5'})
+    
+    await usuario.acargar_totales()
+    inicial = {
+        'puntos_totales': usuario.puntos_totales,
+        'nivel': usuario.nivel,
+        'co2_total_evitado': usuario.co2_total_evitado,
+    }
+    response = StreamingHttpResponse(
+        _stream_eventos(usuario.pk, inicial), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Sin buffer en proxies como nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _sse(evento, datos):
+    return b'event: ' + evento.encode() + b'\ndata: ' + JSONRapidoRenderer().render(datos) + b'\n\n'
+
+
+async def _stream_eventos(usuario_id, inicial):
+    # La suscripción se toma al empezar a transmitir: si la respuesta se
+    # descarta sin recorrerla, nunca se toma y no queda un cupo ocupado
+    try:
+        suscripcion = canal_eventos.suscribir(usuario_id, [f'usuario:{usuario_id}', 'ranking'])
+    except ConexionesAgotadas:
+        # Otro stream tomó el último cupo después de verificar_cupo
+        yield b'retry: 5000\n\n'
+        yield _sse('reconectar', {'motivo': 'Demasiadas conexiones de eventos'})
+        return
+
+    ahora = time.monotonic
+    fin = ahora() + settings.EVENTOS_DURACION_MAXIMA
+    try:
+        yield b'retry: 5000\n\n'
+        yield _sse('puntos', inicial)
+        ultimo_top = await _top_ranking()
+        yield _sse('ranking', ultimo_top)
+        
+        ranking_pendiente = False
+        proximo_ranking = ahora() + settings.EVENTOS_RANKING_INTERVALO
+        while ahora() < fin:
+            if suscripcion.desbordada:
+                yield _sse('reconectar', {'motivo': 'Demasiados eventos pendientes'})
+                return
+            
+            # Los cambios del ranking se agrupan: a lo más un top por intervalo
+            if ranking_pendiente and ahora() >= proximo_ranking:
+                top = await _top_ranking()
+                if top != ultimo_top:
+                    ultimo_top = top
+                    yield _sse('ranking', top)
+                ranking_pendiente = False
+                proximo_ranking = ahora() + settings.EVENTOS_RANKING_INTERVALO
+            
+            espera = min(settings.EVENTOS_LATIDO_SEGUNDOS, fin - ahora())
+            if ranking_pendiente:
+                espera = min(espera, proximo_ranking - ahora())
+            eventos = await suscripcion.esperar(espera)
+            if not eventos and not ranking_pendiente:
+                yield b': latido\n\n'
+            for evento in eventos:
+                if evento['tema'] == 'ranking':
+                    ranking_pendiente = True
+                else:
+                    yield _sse(evento['tipo'], evento['datos'])
+    finally:
+        canal_eventos.cancelar(suscripcion)
+
+
+# Último top serializado, compartido por todos los streams del proceso
+_top_en_vivo = {'clave': None, 'datos': None}
+
+
+async def _top_ranking():
+    top = await indice_ranking.atop(settings.EVENTOS_RANKING_TOP)
+    clave = tuple(top)
+    if clave != _top_en_vivo['clave']:
+        usuarios = await compilado(UsuarioRankingSerializer).aserializar_por_pk(
+            Usuario.objects.filter(pk__in=[usuario_id for _, usuario_id, _ in top])
+        )
+        datos = [
+            {'posicion': posicion, **usuarios[usuario_id]}
+            for posicion, usuario_id, _ in top if usuario_id in usuarios
+        ]
+        _top_en_vivo.update(clave=clave, datos=datos)
+    return _top_en_vivo['datos']
+
+
+class UsuarioViewSet(CamposDinamicosViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar usuarios.
     
@@ -24,6 +264,11 @@ class UsuarioViewSet(viewsets.ModelViewSet):
     - GET /api/usuarios/perfil/ - Ver perfil propio
     - PUT /api/usuarios/perfil/ - Editar perfil propio
     - GET /api/usuarios/ranking/ - Ver ranking global (HU07)
+    - GET /api/usuarios/ranking/mi-posicion/ - Ver mi posición y vecinos (HU07)
+    
+    Para ASGI, perfil y ranking tienen versiones async en
+    /api/usuarios/perfil-async/ y /api/usuarios/ranking-async/, y
+    /api/usuarios/eventos/ envía sus cambios en vivo.
     """
     queryset = Usuario.objects.filter(activo=True)
     serializer_class = UsuarioSerializer
@@ -35,7 +280,7 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         if self.action in ['registro', 'login']:
             # Registro y login son públicos
             return [permissions.AllowAny()]
-        elif self.action in ['perfil', 'update_perfil']:
+        elif self.action in ['perfil', 'update_perfil', 'mi_posicion']:
             # Perfil solo para usuarios autenticados
             return [permissions.IsAuthenticated()]
         else:
@@ -63,7 +308,7 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         usuario = serializer.save()
         
         # Generar tokens JWT para login automático
-        refresh = RefreshToken.for_user(usuario)
+        refresh = TokenUsuario.for_user(usuario)
         
         return Response({
             'message': 'Usuario registrado exitosamente',
@@ -81,53 +326,14 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         POST /api/usuarios/login/
         Body: { "email": "...", "password": "..." } o { "username": "...", "password": "..." }
         """
-        email = request.data.get('email')
-        username = request.data.get('username')
-        password = request.data.get('password')
-        
-        if not password:
-            return Response({
-                'error': 'Por favor proporciona la contraseña'
-            }, status=status.HTTP_400_BAD_REQUEST)
+        identificador, password, error = _credenciales_login(request.data)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not email and not username:
-            return Response({
-                'error': 'Por favor proporciona email o username'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Buscar usuario por email o username
-        usuario = None
-        
-        if email:
-            try:
-                user_obj = Usuario.objects.get(email=email)
-                usuario = authenticate(username=user_obj.username, password=password)
-            except Usuario.DoesNotExist:
-                pass
-        elif username:
-            usuario = authenticate(username=username, password=password)
-        
-        if usuario is None:
-            return Response({
-                'error': 'Credenciales inválidas'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-        
-        if not usuario.activo:
-            return Response({
-                'error': 'Esta cuenta está desactivada'
-            }, status=status.HTTP_403_FORBIDDEN)
-        
-        # Generar tokens JWT
-        refresh = RefreshToken.for_user(usuario)
-        
-        return Response({
-            'message': 'Inicio de sesión exitoso',
-            'usuario': UsuarioSerializer(usuario).data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            }
-        })
+        # Una sola consulta por email o username (ver usuarios.backends)
+        usuario = authenticate(request, username=identificador, password=password)
+        cuerpo, codigo = _respuesta_login(usuario)
+        return Response(cuerpo, status=codigo)
     
     @action(detail=False, methods=['get'], url_path='perfil')
     def perfil(self, request):
@@ -135,6 +341,8 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         Ver el perfil del usuario autenticado.
         GET /api/usuarios/perfil/
         """
+        # Los totales, siempre desde la base de datos (ver Usuario.refresh_from_db)
+        request.user.cargar_totales()
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
     
@@ -150,7 +358,10 @@ class UsuarioViewSet(viewsets.ModelViewSet):
             partial=True  # Permite actualización parcial
         )
         serializer.is_valid(raise_exception=True)
+        # Se guarda antes de leer los totales: si siguen diferidos, el
+        # UPDATE no los incluye y no pisa una acumulación concurrente
         serializer.save()
+        request.user.cargar_totales()
         
         return Response({
             'message': 'Perfil actualizado exitosamente',
@@ -161,12 +372,53 @@ class UsuarioViewSet(viewsets.ModelViewSet):
     def ranking(self, request):
         """
         Obtener el ranking global de usuarios (HU07).
-        GET /api/usuarios/ranking/
+        GET /api/usuarios/ranking/?limite=100
+        """
+        limite = _entero_param(request, 'limite', 100, settings.RANKING_LIMITE_MAXIMO)
+        
+        # El índice ya está ordenado por puntos (mayor a menor)
+        ids = [usuario_id for _, usuario_id, _ in indice_ranking.top(limite)]
+        
+        # Serialización compilada desde .values(): misma salida que UsuarioSerializer
+        usuarios = compilado(UsuarioSerializer).serializar_por_pk(Usuario.objects.filter(pk__in=ids))
+        return Response([usuarios[i] for i in ids if i in usuarios])
+    
+    @action(detail=False, methods=['get'], url_path='ranking/mi-posicion')
+    def mi_posicion(self, request):
         """
-        # Ordenar usuarios por puntos (mayor a menor)
-        usuarios_ranking = Usuario.objects.filter(
-            activo=True
-        ).order_by('-puntos_totales')[:100]  # Top 100
+        Obtener la posición del usuario autenticado en el ranking y los
+        N usuarios por encima y por debajo de él (HU07).
+        GET /api/usuarios/ranking/mi-posicion/?vecinos=5
+        """
+        vecinos = _entero_param(request, 'vecinos', 5, settings.RANKING_VECINOS_MAXIMO)
+        posicion, ventana = indice_ranking.vecindario(request.user.pk, vecinos)
+        
+        if posicion is None:
+            return Response({
+                'error': 'No apareces en el ranking'
+            }, status=status.HTTP_404_NOT_FOUND)
         
-        serializer = UsuarioSerializer(usuarios_ranking, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        usuarios = Usuario.objects.in_bulk([usuario_id for _, usuario_id, _ in ventana])
+        vecindario = []
+        for pos, usuario_id, _ in ventana:
+            if usuario_id in usuarios:
+                datos = UsuarioRankingSerializer(usuarios[usuario_id]).data
+                datos['posicion'] = pos
+                vecindario.append(datos)
+        
+        return Response({
+            'posicion': posicion,
+            'total_usuarios': indice_ranking.total(),
+            'vecinos': vecindario
+        })
+
+
+def _entero_param(request, nombre, por_defecto, maximo):
+    """
+    Leer un parámetro entero positivo de la query string, acotado a `maximo`.
+    """
+    try:
+        valor = int(request.query_params.get(nombre, por_defecto))
+    except (TypeError, ValueError):
+        valor = por_defecto
+    return min(max(valor, 0), maximo)
\ No newline at end of file